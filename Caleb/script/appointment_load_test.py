@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Test di carico del server appuntamenti (POST /appointments).
+
+Invia appuntamenti sintetici con concorrenza e ritmo di arrivo configurabili e
+riporta latenza (p50/p95/p99), errori e throughput per fasce di appuntamenti già
+salvati: AppointmentService.saveAppointment rilegge e riscrive tutto
+appointments.json a ogni salvataggio, quindi il costo cresce con il file.
+
+Con --rate gli arrivi seguono un ritmo fisso (o di Poisson con --poisson) che non
+dipende dalle risposte, e la latenza parte dall'istante di arrivo previsto: un
+server lento non riduce il carico che riceve e l'attesa in coda viene contata.
+Senza --rate ogni worker invia la richiesta successiva appena riceve la risposta.
+
+Con --data-file (di default ~/Caleb/appointments.json, il file del server Ktor)
+conta gli appuntamenti prima e dopo il test e segnala i salvataggi persi per
+scritture concorrenti sullo stesso file. Durante il test il file viene riletto a
+intervalli (--sample-interval) e le fasce usano il numero di appuntamenti davvero
+presenti all'invio; se il file non cambia (server remoto) le fasce ricadono sui
+salvataggi confermati dal server.
+
+Uso: cd Caleb && ./gradlew run      (server Ktor locale sulla porta 8079)
+     python3 script/appointment_load_test.py -n 5000 -c 8 --rate 100
+     python3 script/appointment_load_test.py -n 3000 -c 8 --with-mock --prefill 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from groq_async_client import percentile
+from groq_python_test import post_appointment, print_status, print_success, print_error, print_warning
+
+LOCAL_SERVER_URL = "http://127.0.0.1:8079/appointments"
+DEFAULT_DATA_FILE = os.path.join(os.path.expanduser("~"), "Caleb", "appointments.json")
+
+NAMES = ["mario", "luigi", "giulia", "sara", "paolo", "anna"]
+TITLES = ["Riunione marketing", "Call con il cliente", "Colloquio", "Revisione budget", "Pranzo di lavoro"]
+
+def synthetic_appointment(index: int, run_id: str, rng: random.Random, invalid: bool = False) -> Dict[str, Any]:
+    """Appuntamento con id univoco per il test (ogni POST crea una voce nuova)"""
+    start = datetime(2025, 1, 1, 9) + timedelta(days=rng.randint(0, 364), minutes=30 * rng.randint(0, 18))
+    end = start + timedelta(minutes=rng.choice([30, 60, 90]))
+    if invalid:
+        # Rifiutato da validateAppointment: inizio dopo la fine
+        start, end = end, start
+    return {
+        "id": f"LOAD-{run_id}-{index:06d}",
+        "title": rng.choice(TITLES),
+        "description": "Appuntamento generato dal test di carico",
+        "startTime": start.isoformat(),
+        "endTime": end.isoformat(),
+        "location": "sala conferenze",
+        "participants": [f"{name}@example.com" for name in rng.sample(NAMES, 2)],
+        "status": "CONFIRMED",
+        "notes": ""
+    }
+
+def count_stored(data_file: Optional[str]) -> Optional[int]:
+    """Numero di appuntamenti nel file del server (0 se non ancora creato), o None se non leggibile"""
+    if not data_file or not os.path.isdir(os.path.dirname(data_file)):
+        return None
+    if not os.path.exists(data_file):
+        return 0
+    try:
+        with open(data_file, encoding='utf-8') as f:
+            return len(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def settled_count(data_file: Optional[str], attempts: int = 20) -> Optional[int]:
+    """count_stored a fine test: ritenta se il file è letto a metà di un'ultima riscrittura"""
+    for _ in range(attempts):
+        count = count_stored(data_file)
+        if count is not None or not data_file or not os.path.exists(data_file):
+            return count
+        time.sleep(0.05)
+    return None
+
+class StoredSampler:
+    """Rilegge il file del server a intervalli: numero di appuntamenti presenti durante il test"""
+
+    def __init__(self, data_file: str, initial: int, interval: float = 0.1):
+        self.data_file = data_file
+        self.interval = interval
+        self.value = initial
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+
+    def loop(self):
+        while not self.stop_event.wait(self.interval):
+            count = count_stored(self.data_file)
+            # None durante una riscrittura a metà: si tiene l'ultimo valore letto
+            if count is not None:
+                self.value = count
+                self.samples += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+class LoadTest:
+    """Invio concorrente degli appuntamenti e raccolta degli esiti per richiesta"""
+
+    def __init__(self, server_url: str, total: int, concurrency: int, rate: Optional[float] = None,
+                 poisson: bool = False, invalid_share: float = 0.0, timeout: float = 10.0,
+                 initial_stored: int = 0, seed: int = 0, sampler: Optional[StoredSampler] = None):
+        self.server_url = server_url
+        self.total = total
+        self.concurrency = concurrency
+        self.rate = rate
+        self.poisson = poisson
+        self.invalid_share = invalid_share
+        self.timeout = timeout
+        self.stored = initial_stored
+        self.sampler = sampler
+        self.rng = random.Random(seed)
+        self.run_id = f"{int(time.time()):x}"
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.results = []
+
+    def session(self) -> requests.Session:
+        """Una sessione keep-alive per thread (requests.Session non è thread-safe)"""
+        if not hasattr(self.local, "session"):
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.local.session = session
+        return self.local.session
+
+    def send(self, index: int, appointment: Dict[str, Any], invalid: bool, scheduled: float) -> Dict[str, Any]:
+        confirmed_before = self.stored
+        file_before = self.sampler.value if self.sampler else None
+        sent = time.perf_counter()
+        try:
+            response = post_appointment(appointment, self.server_url, self.session(), self.timeout)
+            status, error = response.status_code, None
+            if status not in (200, 201):
+                error = response.text[:200]
+        except requests.exceptions.RequestException as e:
+            status, error = None, f"{type(e).__name__}: {e}"
+        done = time.perf_counter()
+
+        ok = status in (200, 201)
+        if ok:
+            with self.lock:
+                self.stored += 1
+        result = {
+            "index": index,
+            "status": status,
+            "ok": ok,
+            # Un 400 per un appuntamento volutamente non valido è l'esito corretto
+            "expected": (status == 400) if invalid else ok,
+            "invalid": invalid,
+            # Salvataggi confermati al client e appuntamenti presenti nel file all'invio:
+            # differiscono quando il server perde scritture concorrenti
+            "stored_confirmed": confirmed_before,
+            "stored_file": file_before,
+            "latency_ms": (done - scheduled) * 1000,
+            "service_ms": (done - sent) * 1000,
+            "done": done,
+            "error": error,
+        }
+        with self.lock:
+            self.results.append(result)
+        return result
+
+    def next_request(self, index: int):
+        invalid = self.rng.random() < self.invalid_share
+        return synthetic_appointment(index, self.run_id, self.rng, invalid), invalid
+
+    def run_closed_loop(self):
+        """Ogni worker invia la richiesta successiva appena riceve la risposta"""
+        counter = iter(range(self.total))
+
+        def worker():
+            while True:
+                with self.lock:
+                    index = next(counter, None)
+                    if index is None:
+                        return
+                    appointment, invalid = self.next_request(index)
+                self.send(index, appointment, invalid, time.perf_counter())
+
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            futures = [pool.submit(worker) for _ in range(self.concurrency)]
+        for future in futures:
+            # Rilancia eventuali errori dei worker invece di perderli in silenzio
+            future.result()
+
+    def run_open_loop(self):
+        """Arrivi a ritmo prefissato; le richieste in eccesso aspettano un worker libero"""
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            start = time.perf_counter()
+            offset = 0.0
+            futures = []
+            for index in range(self.total):
+                offset += self.rng.expovariate(self.rate) if self.poisson else 1.0 / self.rate
+                scheduled = start + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                appointment, invalid = self.next_request(index)
+                futures.append(pool.submit(self.send, index, appointment, invalid, scheduled))
+        for future in futures:
+            future.result()
+
+    def run(self) -> float:
+        start = time.perf_counter()
+        if self.rate:
+            self.run_open_loop()
+        else:
+            self.run_closed_loop()
+        return time.perf_counter() - start
+
+def bucket_report(results: List[Dict[str, Any]], bucket_size: int, axis: str = "stored_file") -> List[Dict[str, Any]]:
+    """Statistiche per fascia di appuntamenti già salvati al momento dell'invio
+    (axis: "stored_file" letti dal file, "stored_confirmed" confermati dal server)"""
+    buckets = {}
+    for result in results:
+        buckets.setdefault(result[axis] // bucket_size, []).append(result)
+    report = []
+    for key in sorted(buckets):
+        group = buckets[key]
+        latencies = [r["latency_ms"] for r in group]
+        span = max(r["done"] for r in group) - min(r["done"] for r in group)
+        report.append({
+            "stored_from": key * bucket_size,
+            "stored_to": (key + 1) * bucket_size - 1,
+            "requests": len(group),
+            "error_rate": round(sum(not r["expected"] for r in group) / len(group), 4),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "service_p50_ms": round(percentile([r["service_ms"] for r in group], 50), 1),
+            "throughput_rps": round(len(group) / span, 1) if span > 0 else None,
+        })
+    return report
+
+def print_report(report: List[Dict[str, Any]], results: List[Dict[str, Any]], elapsed: float,
+                 label: str = "Nel file"):
+    print()
+    print(f"{label:>15} {'Richieste':>10} {'Errori':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'servizio p50':>13} {'req/s':>8}")
+    for row in report:
+        throughput = f"{row['throughput_rps']:.1f}" if row['throughput_rps'] else "-"
+        print(f"{row['stored_from']:>7}-{row['stored_to']:<7} {row['requests']:>10} {row['error_rate']:>8.1%} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row['service_p50_ms']:>13.1f} {throughput:>8}")
+    print()
+
+    latencies = [r["latency_ms"] for r in results]
+    unexpected = [r for r in results if not r["expected"]]
+    print_status(f"Totale: {len(results)} richieste in {elapsed:.1f}s ({len(results) / elapsed:.1f} req/s), "
+                 f"p50 {percentile(latencies, 50):.1f} ms, p99 {percentile(latencies, 99):.1f} ms")
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    print_status(f"Codici di risposta: {statuses}")
+    if unexpected:
+        print_warning(f"Esiti inattesi: {len(unexpected)} ({len(unexpected) / len(results):.1%}), "
+                      f"es. {unexpected[0]['status']}: {unexpected[0]['error']}")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_mock_server(data_file: str) -> Tuple[subprocess.Popen, str]:
+    """Avvia mock_appointment_server.py con archivio su file e attende che accetti connessioni"""
+    port = free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_appointment_server.py")
+    process = subprocess.Popen([sys.executable, script, "--port", str(port), "--storage", data_file],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}/appointments"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Il server locale non si è avviato")
+
+def prefill(data_file: str, count: int, seed: int = 1):
+    """Scrive count appuntamenti nel file prima del test, per partire da un archivio già grande"""
+    rng = random.Random(seed)
+    appointments = [synthetic_appointment(i, "prefill", rng) for i in range(count)]
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(appointments, f, indent=2, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Test di carico del server appuntamenti")
+    parser.add_argument("--server", "-s", default=LOCAL_SERVER_URL, help="URL di POST /appointments")
+    parser.add_argument("--requests", "-n", type=int, default=2000, help="Numero di appuntamenti da inviare")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Richieste in volo al massimo")
+    parser.add_argument("--rate", type=float, help="Arrivi al secondo (senza: ogni worker invia appena può)")
+    parser.add_argument("--poisson", action="store_true", help="Intervalli tra arrivi esponenziali invece che fissi")
+    parser.add_argument("--invalid-share", type=float, default=0.0,
+                        help="Frazione di appuntamenti non validi (400 atteso)")
+    parser.add_argument("--bucket", type=int, default=500, help="Ampiezza delle fasce di appuntamenti salvati")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Timeout per richiesta (s)")
+    parser.add_argument("--data-file", default=DEFAULT_DATA_FILE,
+                        help="appointments.json del server, per contare gli appuntamenti salvati")
+    parser.add_argument("--with-mock", action="store_true",
+                        help="Avvia mock_appointment_server.py con archivio su file temporaneo")
+    parser.add_argument("--prefill", type=int, default=0,
+                        help="Con --with-mock: appuntamenti già presenti nel file all'avvio")
+    parser.add_argument("--sample-interval", type=float, default=0.1,
+                        help="Intervallo (s) tra due letture del file del server durante il test")
+    parser.add_argument("--output", "-o", help="File JSON con il report per fascia")
+    parser.add_argument("--seed", type=int, default=0, help="Seme per appuntamenti e arrivi riproducibili")
+    args = parser.parse_args()
+
+    process = None
+    if args.with_mock:
+        args.data_file = os.path.join(tempfile.mkdtemp(prefix="caleb-load-"), "appointments.json")
+        if args.prefill:
+            prefill(args.data_file, args.prefill)
+        process, args.server = start_mock_server(args.data_file)
+        print_status(f"Server locale: {args.server} (archivio {args.data_file})")
+    elif args.prefill:
+        parser.error("--prefill riscrive il file del server: usalo solo con --with-mock")
+
+    initial = count_stored(args.data_file)
+    modified = os.path.getmtime(args.data_file) if initial else None
+    mode = f"{args.rate:g} arrivi/s{' (Poisson)' if args.poisson else ''}" if args.rate else "ciclo chiuso"
+    print_status(f"{args.requests} richieste, concorrenza {args.concurrency}, {mode}, "
+                 f"appuntamenti già salvati: {initial if initial is not None else 'sconosciuti'}")
+
+    sampler = StoredSampler(args.data_file, initial, args.sample_interval) if initial is not None else None
+    test = LoadTest(args.server, args.requests, args.concurrency, args.rate, args.poisson,
+                    args.invalid_share, args.timeout, initial or 0, args.seed, sampler)
+    if sampler:
+        sampler.start()
+    try:
+        elapsed = test.run()
+    finally:
+        if sampler:
+            sampler.stop()
+        final = settled_count(args.data_file)
+        if process:
+            process.terminate()
+            process.wait()
+
+    results = sorted(test.results, key=lambda r: r["index"])
+    if not results:
+        print_error("Nessuna richiesta completata")
+        return 1
+    created = sum(r["ok"] for r in results)
+    touched = final is not None and os.path.exists(args.data_file) and \
+        os.path.getmtime(args.data_file) != modified
+    # Fasce sul numero reale di appuntamenti nel file, se il test lo ha visto cambiare
+    axis = "stored_file" if touched and sampler is not None and sampler.samples else "stored_confirmed"
+    report = bucket_report(results, args.bucket, axis)
+    print_report(report, results, elapsed, "Nel file" if axis == "stored_file" else "Confermati")
+
+    if created and not touched:
+        print_status("File del server non aggiornato durante il test (server remoto?): conteggio non verificato, "
+                     "fasce per salvataggi confermati")
+    elif initial is not None and final is not None:
+        lost = initial + created - final
+        if lost > 0:
+            print_warning(f"Salvataggi persi: {lost} ({initial} + {created} confermati, {final} nel file): "
+                          f"scritture concorrenti sullo stesso file")
+            if axis == "stored_confirmed":
+                print_warning("Fasce per salvataggi confermati: con salvataggi persi non descrivono la dimensione del file")
+        else:
+            print_success(f"Archivio coerente: {final} appuntamenti ({created} aggiunti)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"buckets": report, "bucket_axis": axis, "requests": len(results), "elapsed_s": round(elapsed, 3),
+                       "created": created, "stored_before": initial, "stored_after": final}, f, indent=2)
+        print_success(f"Report salvato in '{args.output}'")
+    return 0 if all(r["expected"] for r in results) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
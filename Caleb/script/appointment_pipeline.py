@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Pipeline di estrazione in blocco: prompt JSONL -> LLM -> validazione -> server appuntamenti.
+
+Le tre fasi girano in parallelo, collegate da code asyncio limitate: se il server è
+lento la coda di invio si riempie e l'estrazione si ferma invece di accumulare
+risposte in memoria. Ogni esito viene scritto subito (results.jsonl per gli
+appuntamenti salvati, failures.jsonl con la fase che ha fallito), così un'esecuzione
+interrotta conserva il lavoro fatto. In fondo: throughput e tempo occupato per fase.
+
+Il server Ktor non ha un endpoint di inserimento multiplo: l'invio raccoglie gli
+appuntamenti pronti in lotti e li spedisce in parallelo sulla stessa sessione
+keep-alive.
+
+Formato di input: una riga JSON per prompt, {"id": "...", "prompt": "..."} oppure
+solo la stringa del prompt (l'id diventa il numero di riga). Una riga malformata
+finisce in failures.jsonl con la fase "read" e la lettura prosegue.
+
+Uso: python3 appointment_pipeline.py prompts.jsonl --api-url ... --server http://127.0.0.1:8079/appointments
+     python3 appointment_pipeline.py prompts.jsonl --with-mocks   (LLM e server locali)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from appointment_schema import validate_appointment
+from groq_async_client import AsyncGroqClient
+from groq_python_test import APPOINTMENT_SERVER_URL, GROQ_API_URL, print_status, print_success, print_error, print_warning
+from response_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, ResponseCache
+
+# Marcatore di fine flusso tra una fase e la successiva
+END = None
+
+class StageStats:
+    """Elementi elaborati, falliti e tempo occupato di una fase"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy_s = 0.0
+        self.first_start = None
+        self.last_end = None
+        self.max_queue = 0
+
+    def start(self, queue: Optional[asyncio.Queue] = None) -> float:
+        now = time.perf_counter()
+        if self.first_start is None:
+            self.first_start = now
+        if queue is not None:
+            self.max_queue = max(self.max_queue, queue.qsize())
+        return now
+
+    def end(self, started: float, items: int = 1, failed: int = 0):
+        now = time.perf_counter()
+        self.busy_s += now - started
+        self.last_end = now
+        self.processed += items
+        self.failed += failed
+
+    def summary(self) -> Dict[str, Any]:
+        wall = (self.last_end - self.first_start) if self.first_start and self.last_end else 0.0
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "wall_s": round(wall, 3),
+            "items_per_s": round(self.processed / wall, 1) if wall > 0 else 0.0,
+            "busy_s": round(self.busy_s, 3),
+            "max_queue": self.max_queue,
+        }
+
+class JsonlWriter:
+    """Scrittura riga per riga con flush, per non perdere gli esiti se il processo si interrompe"""
+
+    def __init__(self, path: str):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+def parse_prompt_line(line: str, line_number: int) -> Dict[str, Any]:
+    """{"id", "prompt"} di una riga, con "error" se la riga non è un prompt valido"""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": str(line_number), "prompt": line, "error": f"JSON non valido alla riga {line_number}: {e}"}
+    if isinstance(record, str):
+        return {"id": str(line_number), "prompt": record}
+    if not isinstance(record, dict):
+        return {"id": str(line_number), "prompt": line, "error": f"Riga {line_number}: attesa una stringa o un oggetto"}
+    item_id = str(record.get("id", line_number))
+    if not isinstance(record.get("prompt"), str):
+        return {"id": item_id, "prompt": line, "error": f"Riga {line_number}: campo 'prompt' mancante o non testuale"}
+    return {"id": item_id, "prompt": record["prompt"]}
+
+def iter_prompts(path: str):
+    """Elementi {"id", "prompt"} per ogni riga non vuota del file JSONL, letto in modo incrementale.
+    Le righe non valide non interrompono la lettura: arrivano con la chiave "error"."""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if line:
+                yield parse_prompt_line(line, line_number)
+
+class AppointmentPipeline:
+    """Estrazione, validazione e invio collegati da code limitate"""
+
+    def __init__(self, client: AsyncGroqClient, server_url: Optional[str], results: JsonlWriter,
+                 failures: JsonlWriter, queue_size: int = 64, extract_workers: int = 8,
+                 submit_workers: int = 2, batch_size: int = 8, submit_timeout: float = 10.0):
+        self.client = client
+        self.server_url = server_url
+        self.results = results
+        self.failures = failures
+        self.extract_queue = asyncio.Queue(maxsize=queue_size)
+        self.validate_queue = asyncio.Queue(maxsize=queue_size)
+        self.submit_queue = asyncio.Queue(maxsize=queue_size)
+        self.extract_workers = extract_workers
+        self.submit_workers = submit_workers
+        self.batch_size = batch_size
+        self.submit_timeout = submit_timeout
+        self.stats = {name: StageStats(name) for name in ("read", "extract", "validate", "submit")}
+
+    def fail(self, item: Dict[str, Any], stage: str, error: str):
+        self.failures.write({"id": item["id"], "prompt": item["prompt"], "stage": stage, "error": error})
+
+    async def read(self, path: str):
+        stats = self.stats["read"]
+        try:
+            for item in iter_prompts(path):
+                started = stats.start()
+                if "error" in item:
+                    # Una riga malformata finisce tra i fallimenti, le altre proseguono
+                    self.fail(item, "read", item["error"])
+                    stats.end(started, failed=1)
+                    continue
+                # put() attende se l'estrazione è indietro: il file non viene caricato tutto in memoria
+                await self.extract_queue.put(item)
+                stats.end(started)
+        finally:
+            for _ in range(self.extract_workers):
+                await self.extract_queue.put(END)
+
+    async def extract(self):
+        stats = self.stats["extract"]
+        while (item := await self.extract_queue.get()) is not END:
+            started = stats.start(self.extract_queue)
+            result = await self.client.complete(item["prompt"])
+            if result["ok"]:
+                item.update(appointment=result["appointment"], cached=result["cached"],
+                            llm_latency_ms=result["latency_ms"], usage=result["usage"])
+                await self.validate_queue.put(item)
+            else:
+                self.fail(item, "extract", result["error"])
+            stats.end(started, failed=0 if result["ok"] else 1)
+
+    async def validate(self):
+        stats = self.stats["validate"]
+        while (item := await self.validate_queue.get()) is not END:
+            started = stats.start(self.validate_queue)
+            errors = validate_appointment(item["appointment"])
+            if errors:
+                self.fail(item, "validate", "; ".join(errors))
+            elif self.server_url:
+                await self.submit_queue.put(item)
+            else:
+                self.results.write(item)
+            stats.end(started, failed=1 if errors else 0)
+
+    async def next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Primo elemento in attesa, poi quelli già pronti fino a batch_size; None a fine flusso"""
+        item = await self.submit_queue.get()
+        if item is END:
+            return None
+        batch = [item]
+        while len(batch) < self.batch_size and not self.submit_queue.empty():
+            item = self.submit_queue.get_nowait()
+            if item is END:
+                # Il marcatore va rimesso: serve anche a questo worker per terminare dopo il lotto
+                self.submit_queue.put_nowait(END)
+                break
+            batch.append(item)
+        return batch
+
+    async def submit_one(self, session, item: Dict[str, Any]) -> bool:
+        try:
+            async with session.post(self.server_url, json=item["appointment"]) as response:
+                text = await response.text()
+                if response.status in (200, 201):
+                    item["server_status"] = response.status
+                    self.results.write(item)
+                    return True
+                self.fail(item, "submit", f"HTTP {response.status}: {text[:200]}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.fail(item, "submit", f"Errore di rete: {e!r}")
+        return False
+
+    async def submit(self, session):
+        stats = self.stats["submit"]
+        while (batch := await self.next_batch()) is not None:
+            started = stats.start(self.submit_queue)
+            outcomes = await asyncio.gather(*(self.submit_one(session, item) for item in batch))
+            stats.end(started, items=len(batch), failed=outcomes.count(False))
+
+    async def run(self, path: str):
+        connector = aiohttp.TCPConnector(limit=self.submit_workers * self.batch_size)
+        timeout = aiohttp.ClientTimeout(total=self.submit_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            reader = asyncio.create_task(self.read(path))
+            extractors = [asyncio.create_task(self.extract()) for _ in range(self.extract_workers)]
+            validator = asyncio.create_task(self.validate())
+            submitters = [asyncio.create_task(self.submit(session)) for _ in range(self.submit_workers)]
+
+            # Ogni fase chiude la successiva quando tutti i suoi worker hanno finito; se la lettura
+            # si interrompe (es. errore di I/O) gli elementi già in coda vengono comunque completati
+            try:
+                await reader
+            finally:
+                await asyncio.gather(*extractors)
+                await self.validate_queue.put(END)
+                await validator
+                for _ in range(self.submit_workers):
+                    await self.submit_queue.put(END)
+                await asyncio.gather(*submitters)
+
+def print_stage_summary(stats: Dict[str, StageStats], elapsed: float):
+    print()
+    print_status("=" * 60)
+    print(f"{'Fase':<10} {'Elementi':>9} {'Falliti':>8} {'Elem./s':>9} {'Occupato (s)':>13} {'Coda max':>9}")
+    for name, stage in stats.items():
+        s = stage.summary()
+        print(f"{name:<10} {s['processed']:>9} {s['failed']:>8} {s['items_per_s']:>9.1f} "
+              f"{s['busy_s']:>13.2f} {s['max_queue']:>9}")
+    print_status(f"Tempo totale: {elapsed:.2f}s")
+
+async def start_mocks(args):
+    """Avvia in questo processo il mock di Groq e il server appuntamenti locale su porte libere"""
+    from mock_appointment_server import MockAppointmentServer, start_app
+    from mock_groq_server import MockGroqServer
+
+    groq_runner, groq_port = await start_app(
+        MockGroqServer(args.mock_latency_ms, args.mock_latency_ms / 4, args.mock_error_rate, seed=42).create_app())
+    server_runner, server_port = await start_app(MockAppointmentServer(latency_ms=5).create_app())
+    args.api_url = f"http://127.0.0.1:{groq_port}/openai/v1/chat/completions"
+    args.server = f"http://127.0.0.1:{server_port}/appointments"
+    print_status(f"Mock LLM: {args.api_url}")
+    print_status(f"Server appuntamenti locale: {args.server}")
+    return [groq_runner, server_runner]
+
+async def run(args) -> int:
+    runners = await start_mocks(args) if args.with_mocks else []
+    cache = None if args.no_cache else ResponseCache(args.cache, args.cache_ttl)
+    results = JsonlWriter(args.results)
+    failures = JsonlWriter(args.failures)
+    start = time.perf_counter()
+    try:
+        async with AsyncGroqClient(args.api_key, args.api_url, args.concurrency, args.rps,
+                                   args.max_retries, cache=cache) as client:
+            pipeline = AppointmentPipeline(
+                client, None if args.no_submit else args.server, results, failures,
+                args.queue_size, args.concurrency, args.submit_workers, args.batch_size
+            )
+            await pipeline.run(args.prompts)
+            llm_summary = client.stats.summary()
+    finally:
+        results.close()
+        failures.close()
+        if cache:
+            cache.close()
+        for runner in runners:
+            await runner.cleanup()
+
+    print_stage_summary(pipeline.stats, time.perf_counter() - start)
+    print_status(f"LLM: {llm_summary['cache_hits']} risposte dalla cache, {llm_summary['retries']} retry, "
+                 f"{llm_summary['total_tokens']} token")
+    print_success(f"Appuntamenti completati: {results.count} -> {args.results}")
+    if failures.count:
+        print_warning(f"Prompt falliti: {failures.count} -> {args.failures}")
+    return 0 if failures.count == 0 else 2
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrazione in blocco di appuntamenti da un file JSONL di prompt")
+    parser.add_argument("prompts", help="File JSONL: {\"id\": ..., \"prompt\": ...} o una stringa per riga")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY", "mock"),
+                        help="Groq API key (default: variabile GROQ_API_KEY)")
+    parser.add_argument("--api-url", default=GROQ_API_URL, help="Endpoint chat/completions")
+    parser.add_argument("--server", "-s", default=APPOINTMENT_SERVER_URL, help="URL del server appuntamenti")
+    parser.add_argument("--no-submit", action="store_true", help="Solo estrazione e validazione, senza invio")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Richieste LLM in volo (worker di estrazione)")
+    parser.add_argument("--rps", type=float, help="Richieste LLM al secondo al massimo")
+    parser.add_argument("--max-retries", type=int, default=5, help="Tentativi aggiuntivi su 429/5xx")
+    parser.add_argument("--queue-size", type=int, default=64, help="Capienza di ogni coda tra le fasi")
+    parser.add_argument("--submit-workers", type=int, default=2, help="Worker di invio al server")
+    parser.add_argument("--batch-size", type=int, default=8, help="Appuntamenti inviati in parallelo per lotto")
+    parser.add_argument("--results", default="pipeline_results.jsonl", help="File JSONL degli appuntamenti salvati")
+    parser.add_argument("--failures", default="pipeline_failures.jsonl", help="File JSONL dei prompt falliti")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="File SQLite della cache delle risposte")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_SECONDS, help="Durata delle risposte in cache (s)")
+    parser.add_argument("--no-cache", action="store_true", help="Chiama sempre l'LLM, senza cache")
+    parser.add_argument("--with-mocks", action="store_true",
+                        help="Avvia mock LLM e server appuntamenti locali e usa quelli")
+    parser.add_argument("--mock-latency-ms", type=float, default=100, help="Latenza del mock LLM")
+    parser.add_argument("--mock-error-rate", type=float, default=0.02, help="Errori 5xx del mock LLM")
+    args = parser.parse_args()
+
+    if not AIOHTTP_AVAILABLE:
+        print_error("aiohttp non installato: pip install aiohttp")
+        return 1
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
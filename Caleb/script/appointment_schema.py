@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Validatore compilato dello schema degli appuntamenti, lato client.
+
+Lo schema descrive i campi dell'appuntamento (Appointment.kt) con le regole del
+prompt di sistema e di AppointmentService.validateAppointment: tipi dei campi,
+date nel formato accettato dal server (ISO_DATE_TIME, con la 'T'), inizio non
+successivo alla fine, partecipanti come lista non vuota di email, stato ammesso.
+
+compile_validator() genera una volta sola il codice Python di una funzione
+specifica per lo schema (un controllo in linea per campo, senza interpretare lo
+schema a ogni record), così la validazione in blocco supera i 100k record/s e
+gli appuntamenti non validi vengono scartati senza una richiesta al server.
+
+Uso: python3 appointment_schema.py pipeline_results.jsonl   (record o {"appointment": ...} per riga)
+     python3 appointment_schema.py --benchmark 200000
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+# LocalDateTime.parse con ISO_DATE_TIME: data e ora separate da 'T', secondi e frazioni
+# facoltativi, offset facoltativo (ignorato dal server)
+DATETIME_RE = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)(?:Z|[+-]\d{2}:\d{2})?")
+EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+APPOINTMENT_SCHEMA = {
+    "id": {"type": "string"},
+    "title": {"type": "string", "required": True, "non_empty": True},
+    "description": {"type": "string"},
+    "startTime": {"type": "datetime", "required": True},
+    "endTime": {"type": "datetime", "required": True},
+    "location": {"type": "string"},
+    "participants": {"type": "email_list"},
+    "status": {"type": "enum", "values": ("CONFIRMED", "UNCONFIRMED")},
+    "notes": {"type": "string"},
+}
+# Coppie di date (inizio, fine) in cui l'inizio non può essere successivo alla fine
+APPOINTMENT_ORDER = (("startTime", "endTime"),)
+
+NOT_OBJECT = "l'appuntamento non è un oggetto JSON"
+
+def parse_local_datetime(value: str) -> Optional[datetime]:
+    """Data e ora locali come le legge il server, o None se il formato non è accettato"""
+    match = DATETIME_RE.fullmatch(value)
+    if match is None:
+        return None
+    try:
+        return datetime.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+
+def _field_code(name: str, rule: Dict[str, Any]) -> List[str]:
+    """Righe del validatore generato per un campo"""
+    value = f"v_{name}"
+    kind = rule["type"]
+    missing = f"campo '{name}' mancante"
+    code = [f"    {value} = get({name!r})",
+            f"    if {value} is None:",
+            f"        errors.append({missing!r})" if rule.get("required") else "        pass"]
+
+    if kind == "string":
+        code += [f"    elif type({value}) is not str:",
+                 f"        errors.append({name + ' deve essere una stringa'!r})"]
+        if rule.get("non_empty"):
+            code += [f"    elif not {value}.strip():",
+                     f"        errors.append({name + ' non può essere vuoto'!r})"]
+    elif kind == "datetime":
+        message = f"{name} non è una data ISO (YYYY-MM-DDTHH:MM:SS): "
+        code += [f"    elif type({value}) is not str or (t_{name} := parse_local_datetime({value})) is None:",
+                 f"        errors.append({message!r} + repr({value}))"]
+    elif kind == "email_list":
+        message = f"{name} contiene un valore che non è un'email: "
+        code += [f"    elif type({value}) is not list:",
+                 f"        errors.append({name + ' deve essere una lista'!r})",
+                 f"    elif not {value}:",
+                 "        errors.append('La lista dei partecipanti non può essere vuota')",
+                 "    else:",
+                 f"        for item in {value}:",
+                 "            if type(item) is not str or not email_match(item):",
+                 f"                errors.append({message!r} + repr(item))",
+                 "                break"]
+    elif kind == "enum":
+        values = tuple(rule["values"])
+        message = f"{name} deve essere uno tra {', '.join(values)}: "
+        code += [f"    elif {value} not in {values!r}:",
+                 f"        errors.append({message!r} + repr({value}))"]
+    else:
+        raise ValueError(f"Tipo di campo sconosciuto nello schema: {kind}")
+    return code
+
+def validator_source(schema: Dict[str, Dict[str, Any]] = APPOINTMENT_SCHEMA, order=APPOINTMENT_ORDER) -> str:
+    """Codice della funzione di validazione generata per lo schema"""
+    code = ["def validate(record):",
+            "    if type(record) is not dict:",
+            "        return [NOT_OBJECT]",
+            "    errors = []",
+            "    get = record.get"]
+    for name, rule in schema.items():
+        if rule["type"] == "datetime":
+            code.append(f"    t_{name} = None")
+    for name, rule in schema.items():
+        code += _field_code(name, rule)
+    for start, end in order:
+        code += [f"    if t_{start} is not None and t_{end} is not None and t_{start} > t_{end}:",
+                 "        errors.append('La data di inizio non può essere successiva alla data di fine')"]
+    code.append("    return errors")
+    return "\n".join(code) + "\n"
+
+def compile_validator(schema: Dict[str, Dict[str, Any]] = APPOINTMENT_SCHEMA,
+                      order=APPOINTMENT_ORDER) -> Callable[[Any], List[str]]:
+    """Funzione record -> lista di errori (vuota se valido), generata per lo schema"""
+    namespace = {"NOT_OBJECT": NOT_OBJECT, "parse_local_datetime": parse_local_datetime,
+                 "email_match": EMAIL_RE.fullmatch}
+    exec(compile(validator_source(schema, order), "<appointment_schema>", "exec"), namespace)
+    return namespace["validate"]
+
+validate_appointment = compile_validator()
+
+def validate_records(records: Iterable[Any], validate: Callable[[Any], List[str]] = validate_appointment
+                     ) -> Dict[int, List[str]]:
+    """Errori per indice dei soli record non validi"""
+    invalid = {}
+    for index, record in enumerate(records):
+        errors = validate(record)
+        if errors:
+            invalid[index] = errors
+    return invalid
+
+def sample_records(count: int, invalid_share: float = 0.2, seed: int = 0) -> List[Dict[str, Any]]:
+    """Appuntamenti sintetici per il benchmark, una parte con un errore ciascuno"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        hour = rng.randint(8, 17)
+        record = {
+            "id": f"APP-{i % 1000:03d}",
+            "title": "Riunione marketing",
+            "description": "Discutere la campagna estiva",
+            "startTime": f"2025-06-{rng.randint(10, 28)}T{hour:02d}:30:00",
+            "endTime": f"2025-06-28T{hour + 1:02d}:30:00",
+            "location": "sala conferenze",
+            "participants": ["mario@example.com", "luigi@example.com"],
+            "status": "CONFIRMED",
+            "notes": ""
+        }
+        if rng.random() < invalid_share:
+            record.update(rng.choice([
+                {"startTime": "2025-06-10 14:30"},
+                {"endTime": "2025-06-09T08:00:00"},
+                {"participants": []},
+                {"participants": ["Mario"]},
+                {"title": ""},
+                {"status": "MAYBE"},
+            ]))
+        records.append(record)
+    return records
+
+def main():
+    from groq_python_test import print_error, print_status, print_success, print_warning
+
+    parser = argparse.ArgumentParser(description="Validazione degli appuntamenti con lo schema compilato")
+    parser.add_argument("file", nargs='?', help="JSONL di appuntamenti o di risultati con chiave 'appointment'")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Valida N record sintetici e misura i record/s")
+    parser.add_argument("--show-source", action="store_true", help="Stampa il codice del validatore generato")
+    args = parser.parse_args()
+
+    if args.show_source:
+        print(validator_source())
+        return 0
+
+    if args.benchmark:
+        records = sample_records(args.benchmark)
+        start = time.perf_counter()
+        invalid = validate_records(records)
+        elapsed = time.perf_counter() - start
+        print_success(f"{len(records)} record in {elapsed * 1000:.0f} ms: {len(records) / elapsed:,.0f} record/s")
+        print_status(f"Non validi: {len(invalid)} ({len(invalid) / len(records):.1%})")
+        return 0
+
+    if not args.file:
+        parser.error("serve un file JSONL oppure --benchmark")
+    with open(args.file, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records = [r["appointment"] if isinstance(r, dict) and "appointment" in r else r for r in records]
+    invalid = validate_records(records)
+    for index, errors in invalid.items():
+        print_warning(f"Riga {index + 1}: {'; '.join(errors)}")
+    if invalid:
+        print_error(f"{len(invalid)} appuntamenti non validi su {len(records)}")
+        return 2
+    print_success(f"Tutti i {len(records)} appuntamenti sono validi")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Client asincrono per Groq: elabora in parallelo un file di prompt di appuntamenti.
+
+- Una sola aiohttp.ClientSession con pool di connessioni keep-alive per tutte le richieste
+- Semaforo che limita le richieste in volo e token bucket per le richieste al secondo
+- Retry con backoff esponenziale (e jitter) su 429 e 5xx, rispettando Retry-After
+- Per ogni prompt: latenza, tentativi e token dal blocco "usage"; in fondo le statistiche
+- Cache SQLite delle risposte (response_cache.py): i prompt già visti non vanno in rete
+  e i duplicati nello stesso file attendono la prima richiesta invece di ripeterla
+
+Il file di input ha un prompt per riga (righe vuote e commenti '#' ignorati); i
+risultati vengono scritti in JSONL nello stesso ordine.
+
+Uso: python3 groq_async_client.py prompts.txt --api-key gsk-... --concurrency 8 --rps 5 -o risultati.jsonl
+     python3 groq_async_client.py prompts.txt --api-url http://127.0.0.1:8089/openai/v1/chat/completions
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from appointment_schema import validate_appointment
+from groq_python_test import (GROQ_API_URL, GROQ_MODEL, build_headers, build_payload, cache_key,
+                              parse_appointment_content, print_status, print_success, print_error,
+                              print_warning, Colors)
+from response_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, ResponseCache
+
+# Codici per cui ha senso ritentare: rate limit e errori temporanei del server
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Token bucket asincrono: al massimo `rate` acquisizioni al secondo, con raffiche fino a `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+class UsageStats:
+    """Aggregato di latenze, tentativi e token di tutte le richieste"""
+
+    def __init__(self):
+        self.latencies_ms = []
+        self.queue_ms = []
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.cache_hits = 0
+        self.tokens_saved = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started = time.perf_counter()
+
+    def record(self, result: Dict[str, Any]):
+        usage = result.get('usage') or {}
+        if result.get('cached'):
+            # Token che la richiesta originale aveva consumato e che stavolta non si pagano
+            self.ok += 1
+            self.cache_hits += 1
+            self.tokens_saved += usage.get('total_tokens', 0)
+            return
+        self.latencies_ms.append(result['latency_ms'])
+        self.queue_ms.append(result['queue_ms'])
+        self.retries += result['attempts'] - 1
+        self.rate_limited += result['rate_limited']
+        if result['ok']:
+            self.ok += 1
+        else:
+            self.failed += 1
+        self.prompt_tokens += usage.get('prompt_tokens', 0)
+        self.completion_tokens += usage.get('completion_tokens', 0)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        total = self.ok + self.failed
+        return {
+            "requests": total,
+            "ok": self.ok,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "cache_hits": self.cache_hits,
+            "tokens_saved": self.tokens_saved,
+            "elapsed_s": round(elapsed, 3),
+            "requests_per_s": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(self.latencies_ms, 50), 1),
+                "p95": round(percentile(self.latencies_ms, 95), 1),
+                "p99": round(percentile(self.latencies_ms, 99), 1),
+                "max": round(max(self.latencies_ms, default=0.0), 1),
+            },
+            "queue_ms_p50": round(percentile(self.queue_ms, 50), 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "tokens_per_s": round((self.prompt_tokens + self.completion_tokens) / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+class AsyncGroqClient:
+    """Client chat/completions con sessione condivisa, limiti di concorrenza e retry"""
+
+    def __init__(self, api_key: str, api_url: str = GROQ_API_URL, concurrency: int = 8,
+                 requests_per_second: Optional[float] = None, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0, timeout: float = 30.0,
+                 cache: Optional[ResponseCache] = None):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.concurrency = concurrency
+        self.semaphore = asyncio.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(requests_per_second) if requests_per_second else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.session = None
+        self.stats = UsageStats()
+        self.cache = cache
+        # Richieste in corso per chiave di cache: i duplicati attendono la stessa risposta
+        self.in_flight = {}
+
+    async def __aenter__(self):
+        # Il pool ha tante connessioni quante le richieste in volo: nessuna resta in coda nel connettore
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=build_headers(self.api_key),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Attesa prima del tentativo successivo: Retry-After se presente, altrimenti esponenziale con jitter"""
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def complete(self, user_prompt: str) -> Dict[str, Any]:
+        """Estrae l'appuntamento da un prompt; non solleva eccezioni, l'esito è nel risultato"""
+        if self.cache is None:
+            result = await self._request(user_prompt)
+            result.pop("content", None)
+            return result
+
+        key = cache_key(user_prompt)
+        while key in self.in_flight:
+            # Stesso prompt già in volo: si aspetta quella risposta invece di pagarne un'altra.
+            # Se è fallita, un altro duplicato può averla già ritentata: si ricontrolla prima di inviare
+            await asyncio.shield(self.in_flight[key])
+        cached = self.cache.get(key)
+        if cached is not None:
+            result = {"prompt": user_prompt, "ok": True, "cached": True, "status": None, "attempts": 0,
+                      "rate_limited": 0, "queue_ms": 0.0, "latency_ms": 0.0, "usage": cached["usage"],
+                      "appointment": cached["appointment"], "error": None}
+            self.stats.record(result)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await self._request(user_prompt)
+            # In cache solo appuntamenti validi per lo schema: uno non valido verrebbe riproposto a ogni run
+            if result["ok"] and not validate_appointment(result["appointment"]):
+                self.cache.put(key, GROQ_MODEL, user_prompt, result["content"],
+                               result["appointment"], result["usage"])
+            result.pop("content", None)
+            return result
+        finally:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+            future.set_result(None)
+
+    async def _request(self, user_prompt: str) -> Dict[str, Any]:
+        result = {"prompt": user_prompt, "ok": False, "cached": False, "status": None, "attempts": 0,
+                  "rate_limited": 0, "queue_ms": 0.0, "latency_ms": 0.0, "usage": None, "appointment": None,
+                  "error": None}
+        queued = time.perf_counter()
+        payload = build_payload(user_prompt)
+
+        async with self.semaphore:
+            # La latenza parte quando la richiesta ottiene uno slot e include retry e attese del rate limit
+            start = time.perf_counter()
+            result["queue_ms"] = round((start - queued) * 1000, 1)
+            for attempt in range(self.max_retries + 1):
+                if self.bucket:
+                    await self.bucket.acquire()
+                result["attempts"] = attempt + 1
+                retry_after = None
+                try:
+                    async with self.session.post(self.api_url, json=payload) as response:
+                        result["status"] = response.status
+                        if response.status == 200:
+                            data = await response.json()
+                            result["usage"] = data.get("usage")
+                            content = data["choices"][0]["message"]["content"]
+                            result["appointment"] = parse_appointment_content(content)
+                            result["content"] = content
+                            result["ok"] = True
+                            break
+                        result["error"] = f"HTTP {response.status}: {(await response.text())[:200]}"
+                        if response.status not in RETRY_STATUSES:
+                            break
+                        if response.status == 429:
+                            result["rate_limited"] += 1
+                        retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result["error"] = f"Errore di rete: {e!r}"
+                except (KeyError, IndexError, json.JSONDecodeError) as e:
+                    # Risposta 200 ma contenuto non utilizzabile: ritentare non cambierebbe l'esito
+                    result["error"] = f"Risposta non valida: {e}"
+                    break
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff_delay(attempt, retry_after))
+
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if result["ok"]:
+            result["error"] = None
+        self.stats.record(result)
+        return result
+
+    async def complete_all(self, prompts: List[str], output_path: Optional[str] = None,
+                           verbose: bool = True) -> List[Dict[str, Any]]:
+        """Elabora tutti i prompt in parallelo; i risultati restano nell'ordine di input"""
+        tasks = [asyncio.create_task(self.complete(prompt)) for prompt in prompts]
+        if verbose:
+            for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                result = await task
+                esito = f"{Colors.GREEN}OK{Colors.NC}" if result["ok"] else f"{Colors.RED}KO{Colors.NC}"
+                if result["cached"]:
+                    esito += " (cache)"
+                print(f"  [{done}/{len(prompts)}] {esito} {result['latency_ms']:.0f} ms, "
+                      f"{result['attempts']} tentativi: {result['prompt'][:60]}")
+        results = await asyncio.gather(*tasks)
+
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return results
+
+def read_prompts(path: str) -> List[str]:
+    """Un prompt per riga; righe vuote e commenti '#' ignorati"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def print_summary(summary: Dict[str, Any]):
+    latency = summary["latency_ms"]
+    print()
+    print_status("=" * 60)
+    print_success(f"Richieste riuscite: {summary['ok']}/{summary['requests']} "
+                  f"in {summary['elapsed_s']:.2f}s ({summary['requests_per_s']:.2f} req/s)")
+    if summary["failed"]:
+        print_warning(f"Richieste fallite: {summary['failed']}")
+    print_status(f"Retry: {summary['retries']}, risposte 429 (rate limit): {summary['rate_limited']}")
+    if summary["cache_hits"]:
+        print_status(f"Cache: {summary['cache_hits']} risposte senza chiamata di rete, "
+                     f"{summary['tokens_saved']} token risparmiati")
+    print_status(f"Latenza ms: p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']}, max {latency['max']} "
+                 f"(attesa in coda p50 {summary['queue_ms_p50']})")
+    print_status(f"Token: {summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion "
+                 f"= {summary['total_tokens']} ({summary['tokens_per_s']} token/s)")
+
+async def run(args) -> int:
+    prompts = read_prompts(args.prompts)
+    if not prompts:
+        print_error(f"Nessun prompt in '{args.prompts}'")
+        return 1
+
+    print_status(f"🚀 {len(prompts)} prompt, {args.concurrency} in parallelo, "
+                 f"{args.rps or 'nessun'} limite req/s -> {args.api_url}")
+    cache = None if args.no_cache else ResponseCache(args.cache, args.cache_ttl)
+    async with AsyncGroqClient(args.api_key, args.api_url, args.concurrency, args.rps,
+                               args.max_retries, timeout=args.timeout, cache=cache) as client:
+        await client.complete_all(prompts, args.output, verbose=not args.quiet)
+        summary = client.stats.summary()
+    if cache:
+        cache.close()
+
+    print_summary(summary)
+    if args.output:
+        print_success(f"Risultati salvati in '{args.output}'")
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    return 0 if summary["failed"] == 0 else 2
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrazione asincrona di appuntamenti da un file di prompt")
+    parser.add_argument("prompts", help="File con un prompt per riga")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY", "mock"),
+                        help="Groq API key (default: variabile GROQ_API_KEY)")
+    parser.add_argument("--api-url", default=GROQ_API_URL, help="Endpoint chat/completions (es. server mock locale)")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Richieste in volo al massimo")
+    parser.add_argument("--rps", type=float, help="Richieste al secondo al massimo (token bucket)")
+    parser.add_argument("--max-retries", type=int, default=5, help="Tentativi aggiuntivi su 429/5xx")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout per richiesta in secondi")
+    parser.add_argument("--output", "-o", default="groq_results.jsonl", help="File JSONL dei risultati")
+    parser.add_argument("--stats", help="File JSON in cui salvare le statistiche aggregate")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="File SQLite della cache delle risposte")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_SECONDS, help="Durata delle risposte in cache (s)")
+    parser.add_argument("--no-cache", action="store_true", help="Chiama sempre l'API, senza cache")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Non stampare una riga per prompt")
+    args = parser.parse_args()
+
+    if not AIOHTTP_AVAILABLE:
+        print_error("aiohttp non installato: pip install aiohttp")
+        return 1
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
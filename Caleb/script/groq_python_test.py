@@ -6,10 +6,31 @@ Uso: python3 test_groq.py <API_KEY> [prompt_personalizzato]
 
 import requests
 import json
+import re
 import sys
 import argparse
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+from appointment_schema import validate_appointment
+from incremental_json import IncrementalJsonParser
+from local_extractor import DEFAULT_THRESHOLD, extract_appointment
+from response_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, ResponseCache, make_key
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama3-8b-8192"
+GROQ_TEMPERATURE = 0.1
+APPOINTMENT_SERVER_URL = "http://192.168.168.93:8079/appointments"
+# Dopo la chiusura del JSON si leggono ancora gli eventi per al massimo questo tempo,
+# in attesa del chunk finale con l'usage (Groq lo invia subito prima di [DONE])
+STREAM_USAGE_DRAIN_S = 0.5
+
+# Blocco markdown attorno al JSON, con o senza "json" e a capo
+MARKDOWN_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE)
 
 class Colors:
     """Colori per output terminale"""
@@ -38,8 +59,9 @@ def print_json(data: Dict[Any, Any], title: str = "JSON"):
     print(f"{Colors.CYAN}{title}:{Colors.NC}")
     print(json.dumps(data, indent=2, ensure_ascii=False))
 
+@lru_cache(maxsize=1)
 def create_system_prompt() -> str:
-    """Crea il prompt di sistema per l'AI"""
+    """Crea il prompt di sistema per l'AI (costruito una volta sola)"""
     return """Sei un assistente che estrae informazioni da testi in linguaggio naturale e le converte in formato JSON per appuntamenti.
 
 Estrai dal testo dell'utente i seguenti campi e restituisci SOLO un JSON valido:
@@ -60,17 +82,15 @@ Regole per le date:
 
 Rispondi ESCLUSIVAMENTE con il JSON valido, senza markdown, backticks o altre spiegazioni."""
 
-def call_groq_api(api_key: str, user_prompt: str) -> Dict[Any, Any]:
-    """Effettua la chiamata all'API Groq"""
-    
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    
-    headers = {
+def build_headers(api_key: str) -> Dict[str, str]:
+    return {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
-    
-    payload = {
+
+def build_payload(user_prompt: str, model: str = GROQ_MODEL, stream: bool = False) -> Dict[str, Any]:
+    """Corpo della richiesta chat/completions (condiviso dal client sincrono e da quello asincrono)"""
+    return {
         "messages": [
             {
                 "role": "system",
@@ -81,12 +101,22 @@ def call_groq_api(api_key: str, user_prompt: str) -> Dict[Any, Any]:
                 "content": user_prompt
             }
         ],
-        "model": "llama3-8b-8192",
-        "temperature": 0.1,
+        "model": model,
+        "temperature": GROQ_TEMPERATURE,
         "max_tokens": 1000,
         "top_p": 1,
-        "stream": False
+        "stream": stream
     }
+
+def cache_key(user_prompt: str, model: str = GROQ_MODEL) -> str:
+    """Chiave della cache delle risposte per il prompt con i parametri correnti della richiesta"""
+    return make_key(user_prompt, model, GROQ_TEMPERATURE, create_system_prompt())
+
+def call_groq_api(api_key: str, user_prompt: str, url: str = GROQ_API_URL) -> Dict[Any, Any]:
+    """Effettua la chiamata all'API Groq"""
+    
+    headers = build_headers(api_key)
+    payload = build_payload(user_prompt)
     
     print_status("Inviando richiesta a Groq API...")
     print_status(f"Prompt: {user_prompt}")
@@ -118,38 +148,197 @@ def call_groq_api(api_key: str, user_prompt: str) -> Dict[Any, Any]:
         print_error(f"Errore generico: {e}")
         return None
 
+def iter_sse_data(response):
+    """Campo data di ogni evento Server-Sent Events, fino a [DONE]"""
+    response.encoding = 'utf-8'
+    # chunk_size=None: le righe arrivano appena il server le invia, senza attendere un buffer pieno
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        yield data
+
+SSE_END = object()
+
+def sse_queue(response: requests.Response) -> "queue.Queue":
+    """Eventi SSE letti in un thread e consegnati su una coda.
+    
+    Chi consuma la coda può smettere di attendere a una scadenza propria, anche se
+    il server non invia più nulla; la coda termina con SSE_END, preceduto
+    dall'eventuale eccezione di lettura.
+    """
+    events = queue.Queue()
+    
+    def reader():
+        try:
+            for data in iter_sse_data(response):
+                events.put(data)
+        except Exception as e:
+            events.put(e)
+        finally:
+            events.put(SSE_END)
+    
+    threading.Thread(target=reader, daemon=True).start()
+    return events
+
+def call_groq_api_stream(api_key: str, user_prompt: str, url: str = GROQ_API_URL) -> Optional[Dict[str, Any]]:
+    """Chiamata in streaming: il JSON viene parsato mentre arrivano i token.
+    
+    L'appuntamento è disponibile appena l'oggetto è completo; poi si leggono ancora
+    gli eventi per al massimo STREAM_USAGE_DRAIN_S secondi, per ricevere l'usage del
+    chunk finale (altrimenti usage è None). Se il testo non può più essere JSON valido
+    la connessione si chiude subito. Restituisce appuntamento, contenuto, usage e i
+    tempi ttft_s (primo token), json_s (JSON completo) e total_s, oppure None.
+    """
+    
+    headers = build_headers(api_key)
+    payload = build_payload(user_prompt, stream=True)
+    
+    print_status("Inviando richiesta in streaming a Groq API...")
+    print_status(f"Prompt: {user_prompt}")
+    print()
+    
+    parser = IncrementalJsonParser()
+    appointment = None
+    usage = None
+    ttft = json_time = None
+    start = time.perf_counter()
+    
+    try:
+        with requests.post(url, headers=headers, json=payload, timeout=30, stream=True) as response:
+            print_status(f"Status HTTP: {response.status_code}")
+            
+            if response.status_code != 200:
+                print_error(f"Errore API: {response.status_code}")
+                print_error(f"Risposta raw: {response.text}")
+                return None
+            
+            events = sse_queue(response)
+            while True:
+                wait = None
+                if appointment is not None:
+                    # JSON già completo: si attende solo l'usage, entro il tempo massimo
+                    wait = STREAM_USAGE_DRAIN_S - (time.perf_counter() - start - json_time)
+                try:
+                    if wait is not None and wait <= 0:
+                        raise queue.Empty
+                    data = events.get(timeout=wait)
+                except queue.Empty:
+                    print_warning("Usage non ricevuto entro il tempo massimo")
+                    break
+                if data is SSE_END:
+                    break
+                if isinstance(data, Exception):
+                    raise data
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError as e:
+                    print_error(f"Evento SSE non valido: {e}")
+                    return None
+                # Groq mette l'usage in x_groq nell'ultimo chunk, OpenAI direttamente in usage
+                usage = chunk.get('usage') or chunk.get('x_groq', {}).get('usage') or usage
+                if appointment is not None:
+                    if usage is not None:
+                        break
+                    continue
+                choices = chunk.get('choices') or [{}]
+                token = choices[0].get('delta', {}).get('content')
+                if not token:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                try:
+                    appointment = parser.feed(token)
+                except json.JSONDecodeError as e:
+                    print_error(f"✗ JSON non valido dopo {parser.length} caratteri, stream interrotto: {e.msg}")
+                    print_warning("Risposta AI ricevuta finora:")
+                    print(parser.text())
+                    return None
+                if appointment is not None:
+                    json_time = time.perf_counter() - start
+                    
+    except requests.exceptions.RequestException as e:
+        # Dopo la chiusura del JSON l'appuntamento resta valido, manca solo l'usage
+        if appointment is None:
+            print_error("Timeout della richiesta" if isinstance(e, requests.exceptions.Timeout)
+                        else f"Errore di rete: {e}")
+            return None
+        print_warning(f"Usage non ricevuto: {e}")
+    
+    if appointment is None:
+        print_error("Stream terminato prima della chiusura del JSON")
+        print_warning("Risposta AI ricevuta:")
+        print(parser.text())
+        return None
+    
+    return {
+        "appointment": appointment,
+        "content": parser.text(),
+        "usage": usage,
+        "ttft_s": ttft,
+        "json_s": json_time,
+        "total_s": time.perf_counter() - start,
+    }
+
+def clean_ai_response(ai_response: str) -> str:
+    """Rimuove spazi e l'eventuale blocco markdown attorno al JSON"""
+    cleaned_response = ai_response.strip()
+    
+    # Rimuovi eventuali backticks markdown
+    fence = MARKDOWN_FENCE_RE.match(cleaned_response)
+    if fence:
+        cleaned_response = fence.group(1)
+    
+    return cleaned_response
+
+def parse_appointment_content(ai_response: str) -> Dict[Any, Any]:
+    """Parsa la risposta dell'AI senza stampare nulla; solleva json.JSONDecodeError se non valida"""
+    return json.loads(clean_ai_response(ai_response))
+
 def validate_and_parse_json(ai_response: str) -> Dict[Any, Any]:
     """Valida e parsa la risposta JSON dell'AI"""
     
     print_status("Validando la risposta dell'AI...")
     
     # Pulisci la risposta da eventuali caratteri extra
-    cleaned_response = ai_response.strip()
-    
-    # Rimuovi eventuali backticks markdown
-    if cleaned_response.startswith('```'):
-        lines = cleaned_response.split('\n')
-        cleaned_response = '\n'.join(lines[1:-1])
+    cleaned_response = clean_ai_response(ai_response)
     
     try:
         parsed_json = json.loads(cleaned_response)
-        print_success("✓ JSON valido!")
-        return parsed_json
-        
     except json.JSONDecodeError as e:
         print_error(f"✗ JSON non valido: {e}")
         print_warning("Risposta AI raw:")
         print(cleaned_response)
         return None
+    
+    if not report_schema_errors(parsed_json):
+        return None
+    print_success("✓ JSON valido!")
+    return parsed_json
+
+def report_schema_errors(appointment: Any) -> bool:
+    """Controlla l'appuntamento con lo schema compilato; stampa gli errori e restituisce False se non valido"""
+    errors = validate_appointment(appointment)
+    for error in errors:
+        print_error(f"✗ {error}")
+    if errors:
+        print_warning("Appuntamento scartato senza inviarlo al server")
+    return not errors
+
+def post_appointment(json_data: Dict[Any, Any], server_url: str = APPOINTMENT_SERVER_URL,
+                     session: Optional[requests.Session] = None, timeout: float = 10) -> requests.Response:
+    """POST dell'appuntamento al server; le eccezioni di rete passano al chiamante"""
+    return (session or requests).post(server_url, json=json_data, timeout=timeout)
 
-def test_with_appointment_server(json_data: Dict[Any, Any], server_url: str = "http://192.168.168.93:8079/appointments") -> bool:
+def test_with_appointment_server(json_data: Dict[Any, Any], server_url: str = APPOINTMENT_SERVER_URL) -> bool:
     """Testa il JSON generato con il server degli appuntamenti"""
     
     print_status(f"Testando con server appuntamenti: {server_url}")
     
     try:
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(server_url, json=json_data, timeout=10)
+        response = post_appointment(json_data, server_url)
         
         print_status(f"Server response status: {response.status_code}")
         
@@ -181,9 +370,23 @@ def main():
                        default="Riunione marketing domani alle 14:30 con Mario e Luigi in sala conferenze per discutere la campagna estiva")
     parser.add_argument("--server", "-s", 
                        help="URL del server appuntamenti",
-                       default="http://192.168.168.93:8079/appointments")
+                       default=APPOINTMENT_SERVER_URL)
     parser.add_argument("--no-server-test", action="store_true",
                        help="Salta il test con il server")
+    parser.add_argument("--api-url", default=GROQ_API_URL,
+                       help="Endpoint chat/completions (es. il server mock locale)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                       help="File SQLite della cache delle risposte")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_SECONDS,
+                       help="Durata delle risposte in cache (secondi)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Chiama sempre l'API, senza leggere né scrivere la cache")
+    parser.add_argument("--local-threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="Confidenza minima per usare l'estrattore locale invece dell'API")
+    parser.add_argument("--no-local", action="store_true",
+                       help="Manda sempre il prompt all'API, senza estrattore locale")
+    parser.add_argument("--stream", action="store_true",
+                       help="Risposta in streaming: parsing incrementale e tempi al primo token e al JSON completo")
     
     args = parser.parse_args()
     
@@ -191,8 +394,66 @@ def main():
     print_status("=" * 60)
     print()
     
+    appointment_data = None
+    cache = None
+    local = None if args.no_local else extract_appointment(args.prompt)
+    
+    if local and local['confidence'] >= args.local_threshold:
+        # Prompt semplice: le regole locali bastano, niente cache né chiamata API
+        print_success(f"Estratto in locale (confidenza {local['confidence']:.2f}), nessuna chiamata API")
+        appointment_data = local['appointment']
+    else:
+        if local:
+            motivi = ", ".join(local['reasons'])
+            print_status(f"Confidenza locale {local['confidence']:.2f} sotto la soglia {args.local_threshold}: {motivi}")
+        cache = None if args.no_cache else ResponseCache(args.cache, args.cache_ttl)
+        key = cache_key(args.prompt)
+        cached = cache.get(key) if cache else None
+        
+        if cached:
+            # Hit: nessuna chiamata di rete, si riusa l'appuntamento già validato
+            print_success(f"Risposta dalla cache (generata {cached['age_s']:.0f}s fa), nessuna chiamata API")
+            appointment_data = cached['appointment']
+        else:
+            appointment_data, ai_content, usage = request_appointment(args.api_key, args.prompt, args.api_url, args.stream)
+            if cache:
+                cache.put(key, GROQ_MODEL, args.prompt, ai_content, appointment_data, usage)
+    
+    if cache:
+        stats = cache.stats()
+        print_status(f"Cache: {stats['hits']} hit, {stats['misses']} miss, {stats['entries']} voci")
+        cache.close()
+    
+    print()
+    print_json(appointment_data, "JSON appuntamento generato")
+    print()
+    
+    # Salva risultato
+    output_file = "groq_appointment.json"
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(appointment_data, f, indent=2, ensure_ascii=False)
+        print_success(f"Risultato salvato in '{output_file}'")
+    except Exception as e:
+        print_warning(f"Impossibile salvare file: {e}")
+    
+    # Test con server (opzionale)
+    if not args.no_server_test:
+        print()
+        print_status("=" * 60)
+        test_with_appointment_server(appointment_data, args.server)
+    
+    print()
+    print_success("🎉 Test completato!")
+
+def request_appointment(api_key: str, prompt: str, api_url: str = GROQ_API_URL, stream: bool = False):
+    """Chiama l'API e valida la risposta; restituisce (appuntamento, contenuto AI, usage) o esce"""
+    
+    if stream:
+        return request_appointment_stream(api_key, prompt, api_url)
+    
     # Chiamata API
-    response_data = call_groq_api(args.api_key, args.prompt)
+    response_data = call_groq_api(api_key, prompt, api_url)
     
     if not response_data:
         print_error("Chiamata API fallita!")
@@ -228,27 +489,30 @@ def main():
         print_error("Impossibile parsare la risposta dell'AI")
         sys.exit(1)
     
-    print()
-    print_json(appointment_data, "JSON appuntamento generato")
-    print()
+    return appointment_data, ai_content, usage
+
+def request_appointment_stream(api_key: str, prompt: str, api_url: str = GROQ_API_URL):
+    """Come request_appointment, ma con la risposta in streaming"""
     
-    # Salva risultato
-    output_file = "groq_appointment.json"
-    try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(appointment_data, f, indent=2, ensure_ascii=False)
-        print_success(f"Risultato salvato in '{output_file}'")
-    except Exception as e:
-        print_warning(f"Impossibile salvare file: {e}")
+    result = call_groq_api_stream(api_key, prompt, api_url)
     
-    # Test con server (opzionale)
-    if not args.no_server_test:
-        print()
-        print_status("=" * 60)
-        test_with_appointment_server(appointment_data, args.server)
+    if not result:
+        print_error("Chiamata API in streaming fallita!")
+        sys.exit(1)
     
+    if not report_schema_errors(result['appointment']):
+        print_error("Impossibile usare la risposta dell'AI")
+        sys.exit(1)
+    print_success("✓ JSON valido!")
+    print_status(f"Primo token: {result['ttft_s'] * 1000:.0f} ms, "
+                 f"JSON completo: {result['json_s'] * 1000:.0f} ms, "
+                 f"totale: {result['total_s'] * 1000:.0f} ms")
+    if result['usage']:
+        print_status("Statistiche utilizzo:")
+        print_json(result['usage'])
     print()
-    print_success("🎉 Test completato!")
+    
+    return result['appointment'], result['content'], result['usage']
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
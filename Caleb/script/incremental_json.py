@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Parser JSON incrementale per le risposte in streaming dell'AI.
+
+Riceve il testo a pezzi (i token dello stream SSE) e controlla la grammatica JSON
+carattere per carattere: appena l'oggetto di primo livello si chiude restituisce il
+dizionario, senza aspettare la fine dello stream; al primo carattere che non può
+far parte di un JSON valido solleva json.JSONDecodeError, così la richiesta si può
+interrompere invece di attendere fino a max_tokens.
+
+Prima dell'oggetto sono ammessi solo spazi e l'apertura di un blocco markdown
+(```json), che alcuni modelli aggiungono nonostante il prompt di sistema.
+"""
+
+import json
+import re
+from typing import Dict, Any, Optional
+
+NUMBER_RE = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$')
+LITERALS = ("true", "false", "null")
+LITERAL_CHARS = set("0123456789+-.eE" + "truefalsn")
+ESCAPES = set('"\\/bfnrtu')
+MARKDOWN_FENCES = ("```json", "```")
+
+class IncrementalJsonParser:
+    """Riconoscitore JSON a stati per un singolo oggetto, alimentato con feed()"""
+
+    def __init__(self, max_chars: int = 20_000):
+        self.max_chars = max_chars
+        self.buffer = []
+        self.length = 0
+        self.prelude = ""
+        self.start = None        # posizione di '{' nel testo ricevuto
+        self.stack = []          # '{' o '[' dei contenitori aperti
+        self.expect = "start"    # cosa può comparire dopo: value, key, key_or_end, colon, comma_or_end, value_or_end
+        self.in_string = False
+        self.escape = 0          # 1 dopo '\', 2-5 durante le cifre di \uXXXX
+        self.literal = ""        # numero o true/false/null in corso
+        self.result = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def text(self) -> str:
+        return "".join(self.buffer)
+
+    def fail(self, message: str, offset: int):
+        raise json.JSONDecodeError(message, self.text(), offset)
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Aggiunge un pezzo di testo; restituisce l'oggetto appena è completo, altrimenti None"""
+        if self.done:
+            return self.result
+        base = self.length
+        self.buffer.append(chunk)
+        self.length += len(chunk)
+        if self.length > self.max_chars:
+            self.fail(f"Risposta oltre {self.max_chars} caratteri senza un oggetto completo", base)
+
+        for i, char in enumerate(chunk):
+            position = base + i
+            if self.expect == "start":
+                self.feed_prelude(char, position)
+            elif self.in_string:
+                self.feed_string(char, position)
+            elif self.literal and char in LITERAL_CHARS:
+                self.literal += char
+            else:
+                if self.literal:
+                    self.end_literal(position)
+                self.feed_structure(char, position)
+            if not self.stack and self.expect == "end":
+                # Parsing completo del testo già validato: json costruisce il dizionario
+                self.result = json.loads(self.text()[self.start:position + 1])
+                return self.result
+        return None
+
+    def feed_prelude(self, char: str, position: int):
+        if char == '{':
+            self.start = position
+            self.stack.append('{')
+            self.expect = "key_or_end"
+            return
+        self.prelude += char
+        stripped = self.prelude.strip()
+        if not any(fence.startswith(stripped) or stripped == fence for fence in MARKDOWN_FENCES):
+            self.fail("Testo prima dell'oggetto JSON", position)
+
+    def feed_string(self, char: str, position: int):
+        if self.escape == 1:
+            if char not in ESCAPES:
+                self.fail(f"Sequenza di escape non valida: \\{char}", position)
+            self.escape = 2 if char == 'u' else 0
+        elif self.escape:
+            if char not in "0123456789abcdefABCDEF":
+                self.fail("Escape \\u non valido", position)
+            self.escape = self.escape + 1 if self.escape < 5 else 0
+        elif char == '\\':
+            self.escape = 1
+        elif char == '"':
+            self.in_string = False
+            self.expect = "colon" if self.expect == "key" else "comma_or_end"
+        elif char < ' ':
+            self.fail("Carattere di controllo in una stringa", position)
+
+    def end_literal(self, position: int):
+        if self.literal not in LITERALS and not NUMBER_RE.match(self.literal):
+            self.fail(f"Valore non valido: {self.literal}", position - len(self.literal))
+        self.literal = ""
+        self.expect = "comma_or_end"
+
+    def close(self, char: str, position: int):
+        opener = '{' if char == '}' else '['
+        if not self.stack or self.stack[-1] != opener:
+            self.fail(f"'{char}' inatteso", position)
+        self.stack.pop()
+        self.expect = "comma_or_end" if self.stack else "end"
+
+    def feed_structure(self, char: str, position: int):
+        if char in ' \t\r\n':
+            return
+        expect = self.expect
+        if expect in ("key", "key_or_end"):
+            if char == '"':
+                self.in_string = True
+                self.expect = "key"
+            elif char == '}' and expect == "key_or_end":
+                self.close(char, position)
+            else:
+                self.fail("Attesa una chiave tra virgolette", position)
+        elif expect == "colon":
+            if char != ':':
+                self.fail("Atteso ':'", position)
+            self.expect = "value"
+        elif expect == "comma_or_end":
+            if char == ',':
+                self.expect = "key" if self.stack[-1] == '{' else "value"
+            elif char in '}]':
+                self.close(char, position)
+            else:
+                self.fail("Atteso ',' o la chiusura del contenitore", position)
+        elif expect in ("value", "value_or_end"):
+            if char == ']' and expect == "value_or_end":
+                self.close(char, position)
+            elif char == '"':
+                self.in_string = True
+                self.expect = "value"
+            elif char in '{[':
+                self.stack.append(char)
+                self.expect = "key_or_end" if char == '{' else "value_or_end"
+            elif char == '-' or char.isdigit() or char in "tfn":
+                self.literal = char
+            else:
+                self.fail(f"Valore inatteso: '{char}'", position)
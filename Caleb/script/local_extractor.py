@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Estrattore locale di appuntamenti, senza LLM, per i prompt con struttura semplice.
+
+Applica le stesse regole del prompt di sistema (create_system_prompt): giorno
+mancante = domani, ora mancante = orario lavorativo, durata stimata dal tipo di
+riunione, luogo mancante = "Da definire". Oltre all'appuntamento restituisce una
+confidenza tra 0 e 1: ogni parola del prompt non spiegata dalle regole, ogni valore
+di default e ogni segnale di ambiguità ("forse", "oppure", ricorrenze, domande,
+negazioni e correzioni come "non" o "invece") la abbassano. Il titolo deve
+cominciare con un tipo di appuntamento noto e può contenere solo parole di argomento:
+nomi propri e complementi come "da Mario" contano come parole non spiegate. Solo i prompt sotto la
+soglia vanno all'LLM: basta una parola non spiegata per mandarci il prompt.
+
+Ogni regola, quando trova una corrispondenza, maschera il tratto di testo usato:
+le regole successive non lo rivedono e le parole rimaste alla fine sono quelle
+che l'estrattore non ha capito.
+
+Uso: python3 local_extractor.py "Riunione domani alle 14:30 con Mario in sala conferenze"
+     python3 local_extractor.py --benchmark appointment_corpus.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from appointment_schema import validate_appointment
+
+DEFAULT_THRESHOLD = 0.8
+# Una sola parola non interpretata basta a scendere sotto la soglia: può essere una
+# negazione, una correzione o un nome che cambiano l'appuntamento
+LEFTOVER_PENALTY = 0.25
+WORKDAY_START = 9
+AFTERNOON_START = 14
+DEFAULT_DURATION_MIN = 60
+MASK = "\x00"
+
+MONTHS = {name: number for number, name in enumerate(
+    ["gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno", "luglio",
+     "agosto", "settembre", "ottobre", "novembre", "dicembre"], start=1)}
+WEEKDAYS = {"lunedì": 0, "lunedi": 0, "martedì": 1, "martedi": 1, "mercoledì": 2, "mercoledi": 2,
+            "giovedì": 3, "giovedi": 3, "venerdì": 4, "venerdi": 4, "sabato": 5, "domenica": 6}
+RELATIVE_DAYS = {"oggi": 0, "stamattina": 0, "stasera": 0, "domani": 1, "dopodomani": 2}
+
+# Durata stimata per tipo di riunione (minuti): vale la prima corrispondenza
+MEETING_DURATIONS = [(re.compile(pattern, re.IGNORECASE), minutes) for pattern, minutes in [
+    (r"\bstand-?up\b", 15),
+    (r"\b(?:call|chiamata|telefonata|videochiamata)\b", 30),
+    (r"\b(?:caff[eè]|visita|dentista|medico)\b", 30),
+    (r"\b(?:pranzo|cena)\b", 90),
+    (r"\b(?:workshop|formazione|corso|seminario)\b", 180),
+    (r"\b(?:aperitivo|colloquio|revisione|riunione|meeting|incontro|appuntamento)\b", 60),
+]]
+ONLINE_TYPE_RE = re.compile(r"\bvideochiamata\b", re.IGNORECASE)
+
+NAME = r"[A-ZÀ-Ý][a-zà-ÿ']+(?:\s+[A-ZÀ-Ý][a-zà-ÿ']+)?"
+EMAIL = r"[\w.+-]+@[\w-]+\.[\w.]+"
+HOUR = r"(\d{1,2})(?:[:.](\d{2}))?"
+
+AMBIGUOUS_RE = re.compile(
+    r"\?|\b(?:forse|oppure|magari|circa|verso|quando|se|ogni|tutti i|settimana prossima|prossima settimana|"
+    r"mese prossimo|sposta(?:re)?|annulla(?:re)?|cancella(?:re)?|rimanda(?:re)?|qualcosa|"
+    r"ieri|non|invece|anzich[eé]|al posto d[ie])\b",
+    re.IGNORECASE)
+PARTICIPANTS_RE = re.compile(rf"\bcon\s+((?:{NAME}|{EMAIL})(?:(?:\s*,\s*|\s+e\s+)(?:{NAME}|{EMAIL}))*)")
+TIME_RANGE_RE = re.compile(rf"\bdalle\s+{HOUR}\s+alle\s+{HOUR}\b", re.IGNORECASE)
+TIME_RE = re.compile(rf"\b(?:alle|ore)\s+{HOUR}(?:\s+e\s+(mezza|mezzo|un quarto))?(?![\d/])", re.IGNORECASE)
+EVENING_EVENT_RE = re.compile(r"\b(?:cena|cenetta|aperitivo|apericena)\b", re.IGNORECASE)
+SPECIAL_TIME_RE = re.compile(r"\b(?:all'una|a\s+mezzogiorno|mezzogiorno)\b", re.IGNORECASE)
+PERIOD_RE = re.compile(r"\b(?:(?:di|del|della|in|nel|nella)\s+)?(mattina|mattinata|mattino|pomeriggio|sera|serata)\b",
+                       re.IGNORECASE)
+DATE_NAME_RE = re.compile(rf"\b(?:il\s+|l')?(\d{{1,2}})\s+({'|'.join(MONTHS)})(?:\s+(\d{{4}}))?\b", re.IGNORECASE)
+DATE_NUM_RE = re.compile(r"\b(?:il\s+)?(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?\b")
+IN_DAYS_RE = re.compile(r"\b(?:tra|fra)\s+(\d{1,2})\s+giorni\b", re.IGNORECASE)
+WEEKDAY_RE = re.compile(rf"\b({'|'.join(WEEKDAYS)})(\s+prossim[oa])?\b", re.IGNORECASE)
+RELATIVE_DAY_RE = re.compile(rf"\b({'|'.join(RELATIVE_DAYS)})\b", re.IGNORECASE)
+NUMBER_WORDS = {"due": 2, "tre": 3, "quattro": 4, "cinque": 5, "sei": 6, "sette": 7, "otto": 8, "dieci": 10,
+                "quindici": 15, "venti": 20, "trenta": 30, "quaranta": 40, "quarantacinque": 45, "novanta": 90}
+DURATION_RE = re.compile(rf"\b(?:per|di|della durata di)\s+(un'ora e mezza|un'ora|mezz'ora|"
+                         rf"(?:\d+|{'|'.join(NUMBER_WORDS)})\s+(?:ore|ora|minuti))\b", re.IGNORECASE)
+# Uno scopo fatto solo di quantità di tempo è quasi sempre una durata non riconosciuta
+DURATION_LIKE_RE = re.compile(r"^\S+\s+(?:ore|ora|minuti|minuto|giorni|giorno|settimane)$", re.IGNORECASE)
+ONLINE_RE = re.compile(r"\b(?:online|on-line|in\s+videochiamata|su\s+(zoom|teams|meet|google meet))\b", re.IGNORECASE)
+LOCATION_RE = re.compile(
+    rf"(?:\b(?:in|presso|nella|nello|nel|al|alla|allo)\s+|\ball'(?!una\b))(?:(?:il|lo|la)\s+|l')?([^{MASK},.;]+?)"
+    rf"(?=\s*(?:{MASK}|[,.;]|$|\b(?:per|con)\b))")
+CITY_RE = re.compile(r"\ba\s+([A-ZÀ-Ý][a-zà-ÿ]+(?:\s+[A-ZÀ-Ý][a-zà-ÿ]+)?)\b")
+PURPOSE_RE = re.compile(rf"\bper\s+([^{MASK},.;]+)")
+COMMAND_RE = re.compile(r"^(?:fissa|fissare|organizza|organizzare|prenota|prenotare|programma|metti|"
+                        r"aggiungi|crea|segna)\s+(?:(?:una|uno|un'|un)\s*)?", re.IGNORECASE)
+# Il titolo deve cominciare con un tipo di appuntamento noto
+TITLE_TYPE_RE = re.compile(
+    r"^(?:stand-?up|call|chiamata|telefonata|videochiamata|caff[eè]|visita|dentista|medico|pranzo|cena|"
+    r"workshop|formazione|corso|seminario|aperitivo|colloquio|revisione|riunione|meeting|incontro|"
+    r"appuntamento|assemblea|allenamento|turno|lezione|esame)\b", re.IGNORECASE)
+# Parole del titolo che cambiano l'appuntamento senza che una regola le interpreti:
+# giorni passati e complementi ("da Mario", "dal dottore") che non sono partecipanti né luoghi
+TITLE_UNEXPLAINED_WORDS = {"ieri", "stanotte", "scorso", "scorsa", "fa", "da", "dal", "dallo", "dalla", "dai",
+                           "dagli", "dalle", "col", "coi", "cogli"}
+# Parole che possono restare fuori dalle regole senza cambiare il significato
+FILLER_WORDS = {"e", "il", "lo", "la", "i", "gli", "le", "l'", "di", "del", "della", "a", "un", "una",
+                "ci", "da", "ed", "poi", "anche"}
+
+def email_for(name: str) -> str:
+    """nome.cognome@example.com senza accenti, come le email generate dal modello"""
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    return ".".join(part.lower().replace("'", "") for part in ascii_name.split()) + "@example.com"
+
+def parse_hour(hour: str, minutes: Optional[str]) -> Optional[Tuple[int, int]]:
+    h, m = int(hour), int(minutes or 0)
+    if h > 23 or m > 59:
+        return None
+    return h, m
+
+class LocalExtraction:
+    """Stato di un'estrazione: testo mascherato, campi trovati, confidenza e motivi"""
+
+    def __init__(self, prompt: str):
+        self.text = prompt
+        self.confidence = 1.0
+        self.reasons = []
+
+    def penalize(self, amount: float, reason: str):
+        self.confidence -= amount
+        self.reasons.append(reason)
+
+    def take(self, pattern: re.Pattern) -> Optional[re.Match]:
+        """Prima corrispondenza del pattern nel testo non ancora usato, poi mascherata"""
+        match = pattern.search(self.text)
+        if match:
+            start, end = match.span()
+            self.text = self.text[:start] + MASK * (end - start) + self.text[end:]
+        return match
+
+    def take_all(self, pattern: re.Pattern) -> List[re.Match]:
+        matches = []
+        while (match := self.take(pattern)) is not None:
+            matches.append(match)
+        return matches
+
+    def segments(self) -> List[str]:
+        return [segment.strip(" ,;.-") for segment in self.text.split(MASK) if segment.strip(" ,;.-")]
+
+def extract_day(state: LocalExtraction, now: datetime) -> datetime:
+    try:
+        return extract_date(state, now)
+    except ValueError:
+        state.penalize(1.0, "data non valida")
+        return now + timedelta(days=1)
+
+def extract_date(state: LocalExtraction, now: datetime) -> datetime:
+    if match := state.take(DATE_NAME_RE):
+        year = int(match.group(3)) if match.group(3) else now.year
+        day = datetime(year, MONTHS[match.group(2).lower()], int(match.group(1)))
+        return day if match.group(3) or day.date() >= now.date() else day.replace(year=year + 1)
+    if match := state.take(DATE_NUM_RE):
+        year = int(match.group(3)) if match.group(3) else now.year
+        year = year + 2000 if year < 100 else year
+        day = datetime(year, int(match.group(2)), int(match.group(1)))
+        return day if match.group(3) or day.date() >= now.date() else day.replace(year=year + 1)
+    if match := state.take(IN_DAYS_RE):
+        return now + timedelta(days=int(match.group(1)))
+    if match := state.take(WEEKDAY_RE):
+        # Lo stesso giorno della settimana di oggi indica la settimana successiva
+        ahead = (WEEKDAYS[match.group(1).lower()] - now.weekday()) % 7 or 7
+        return now + timedelta(days=ahead)
+    if match := state.take(RELATIVE_DAY_RE):
+        return now + timedelta(days=RELATIVE_DAYS[match.group(1).lower()])
+    state.penalize(0.05, "giorno non indicato: domani")
+    return now + timedelta(days=1)
+
+def adjust_hour(time: Tuple[int, int], period: Optional[str]) -> Tuple[Tuple[int, int], bool]:
+    """Ora sulle 24 ore secondo il periodo del giorno; True se è stata dedotta (ora ambigua)"""
+    hour, minutes = time
+    if period in ("pomeriggio", "sera", "serata") and hour < 12:
+        return (hour + 12, minutes), False
+    if period is None and 1 <= hour <= 7:
+        # Orari lavorativi: "alle 3" è nel pomeriggio
+        return (hour + 12, minutes), True
+    return (hour, minutes), False
+
+def extract_times(state: LocalExtraction, prompt: str) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+    """(ora di inizio, ora di fine esplicita) come coppie (ore, minuti)"""
+    period_match = state.take(PERIOD_RE)
+    period = period_match.group(1).lower() if period_match else None
+    if re.search(r"\bstasera\b", prompt, re.IGNORECASE):
+        period = "sera"
+    elif period is None and EVENING_EVENT_RE.search(prompt):
+        # "cena alle 8" è alle 20, non alle 8 del mattino
+        period = "sera"
+
+    if match := state.take(TIME_RANGE_RE):
+        start, end = parse_hour(match.group(1), match.group(2)), parse_hour(match.group(3), match.group(4))
+        if start is None or end is None:
+            state.penalize(1.0, "orario non valido")
+            return None, None
+        (start, start_ambiguous), (end, end_ambiguous) = adjust_hour(start, period), adjust_hour(end, period)
+        if start_ambiguous or end_ambiguous:
+            state.penalize(0.1, f"ore ambigue: {start[0]}:{start[1]:02d}-{end[0]}:{end[1]:02d}")
+        return start, end
+
+    matches = state.take_all(TIME_RE)
+    if len(matches) > 1:
+        state.penalize(0.7, "più orari nello stesso prompt")
+    if matches:
+        match = matches[0]
+        start = parse_hour(match.group(1), match.group(2))
+        if start is None:
+            state.penalize(1.0, "orario non valido")
+            return None, None
+        hour, minutes = start
+        minutes += {"mezza": 30, "mezzo": 30, "un quarto": 15}.get((match.group(3) or "").lower(), 0)
+        (hour, minutes), ambiguous = adjust_hour((hour, minutes), period)
+        if ambiguous:
+            state.penalize(0.1, f"ora ambigua: {hour}:{minutes:02d}")
+        return (hour, minutes), None
+
+    if match := state.take(SPECIAL_TIME_RE):
+        return (13 if "una" in match.group(0).lower() else 12, 0), None
+    if period in ("pomeriggio", "sera", "serata"):
+        state.penalize(0.1, f"ora non indicata: {AFTERNOON_START}:00")
+        return (AFTERNOON_START, 0), None
+    if period is not None:
+        state.penalize(0.1, f"ora non indicata: {WORKDAY_START}:00")
+        return (WORKDAY_START, 0), None
+    state.penalize(0.15, f"ora non indicata: {WORKDAY_START}:00")
+    return (WORKDAY_START, 0), None
+
+def extract_duration(state: LocalExtraction, prompt: str) -> int:
+    if match := state.take(DURATION_RE):
+        value = match.group(1).lower()
+        if value == "un'ora e mezza":
+            return 90
+        if value == "un'ora":
+            return 60
+        if value == "mezz'ora":
+            return 30
+        amount, unit = value.split()
+        amount = NUMBER_WORDS.get(amount, amount)
+        return int(amount) * (1 if unit.startswith("min") else 60)
+    for pattern, minutes in MEETING_DURATIONS:
+        if pattern.search(prompt):
+            return minutes
+    state.penalize(0.1, "tipo di riunione non riconosciuto: durata 1 ora")
+    return DEFAULT_DURATION_MIN
+
+def extract_participants(state: LocalExtraction) -> Optional[List[str]]:
+    participants = []
+    for match in state.take_all(PARTICIPANTS_RE):
+        for piece in re.split(r"\s*,\s*|\s+e\s+", match.group(1)):
+            email = piece if "@" in piece else email_for(piece)
+            if email not in participants:
+                participants.append(email)
+    # Nessun partecipante: campo assente (il server rifiuta una lista vuota)
+    return participants or None
+
+def extract_location(state: LocalExtraction) -> Optional[str]:
+    if match := state.take(ONLINE_RE):
+        return match.group(1).title() if match.group(1) else "Online"
+    if match := state.take(LOCATION_RE):
+        return match.group(1).strip()
+    if match := state.take(CITY_RE):
+        return match.group(1)
+    return None
+
+def extract_appointment(prompt: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Appuntamento estratto con le regole locali, con confidenza e motivi delle penalità"""
+    now = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    state = LocalExtraction(prompt)
+
+    if AMBIGUOUS_RE.search(prompt):
+        state.penalize(0.7, "richiesta ambigua o non di creazione")
+
+    participants = extract_participants(state)
+    start_time, end_time = extract_times(state, prompt)
+    day = extract_day(state, now)
+    duration = extract_duration(state, prompt)
+    location = extract_location(state)
+    purpose = state.take(PURPOSE_RE)
+
+    if start_time is None:
+        return {"appointment": None, "confidence": 0.0, "reasons": state.reasons}
+
+    start = day.replace(hour=start_time[0], minute=0) + timedelta(minutes=start_time[1])
+    end = day.replace(hour=end_time[0], minute=end_time[1]) if end_time else start + timedelta(minutes=duration)
+    if end <= start:
+        state.penalize(1.0, "fine non successiva all'inizio")
+
+    segments = state.segments()
+    title = COMMAND_RE.sub("", segments[0]) if segments else ""
+    if title and not TITLE_TYPE_RE.match(title):
+        state.penalize(LEFTOVER_PENALTY, f"tipo di appuntamento non riconosciuto: {title.split()[0]}")
+    # Nel titolo sono ammesse parole di argomento ("marketing", "di lavoro"), ma non nomi
+    # propri o parole che spostano il giorno o introducono persone e luoghi non estratti
+    unexplained = [word for word in title.split()[1:]
+                   if word.lower() in TITLE_UNEXPLAINED_WORDS or word[:1].isupper()]
+    leftover = unexplained + [word for segment in segments[1:] for word in segment.split()
+                              if word.lower() not in FILLER_WORDS]
+    if leftover:
+        state.penalize(LEFTOVER_PENALTY * len(leftover), f"parole non interpretate: {' '.join(leftover)}")
+    title = title[:1].upper() + title[1:] if title else "Appuntamento"
+    if len(title.split()) > 5:
+        state.penalize(0.1 * (len(title.split()) - 5), "titolo lungo")
+    if location is None:
+        location = "Online" if ONLINE_TYPE_RE.search(prompt) else "Da definire"
+
+    purpose_text = purpose.group(1).strip() if purpose else ""
+    if DURATION_LIKE_RE.match(purpose_text):
+        state.penalize(LEFTOVER_PENALTY, f"durata non interpretata: {purpose_text}")
+    appointment = {
+        "id": f"APP-{int(hashlib.sha1(prompt.encode()).hexdigest(), 16) % 1000:03d}",
+        "title": title,
+        "description": purpose_text[:1].upper() + purpose_text[1:] if purpose_text else prompt,
+        "startTime": start.isoformat(timespec='seconds'),
+        "endTime": end.isoformat(timespec='seconds'),
+        "location": location,
+        "status": "CONFIRMED",
+        "notes": ""
+    }
+    if participants:
+        appointment["participants"] = participants
+    if validate_appointment(appointment):
+        state.penalize(1.0, "appuntamento non valido per lo schema")
+    return {"appointment": appointment, "confidence": round(max(0.0, state.confidence), 2),
+            "reasons": state.reasons}
+
+COMPARED_FIELDS = ("startTime", "endTime", "location", "participants")
+
+def benchmark(corpus_path: str, threshold: float, llm_ms: float, repeat: int = 200) -> Dict[str, Any]:
+    """Quota servita in locale, correttezza sui campi etichettati e latenza risparmiata"""
+    from groq_async_client import percentile
+
+    records = [json.loads(line) for line in open(corpus_path, encoding='utf-8') if line.strip()]
+    latencies_us, errors = [], []
+    served = correct = 0
+    for record in records:
+        now = datetime.fromisoformat(record["now"])
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = extract_appointment(record["prompt"], now)
+        latencies_us.append((time.perf_counter() - start) / repeat * 1e6)
+
+        if result["confidence"] < threshold:
+            continue
+        served += 1
+        expected = record["expected"]
+        got = {field: result["appointment"].get(field) for field in COMPARED_FIELDS}
+        if expected is not None and got == {field: expected.get(field) for field in COMPARED_FIELDS}:
+            correct += 1
+        else:
+            errors.append({"prompt": record["prompt"], "expected": expected, "got": got,
+                           "confidence": result["confidence"]})
+
+    local_ms = sum(latencies_us) / 1000
+    fallthrough = len(records) - served
+    return {
+        "prompts": len(records),
+        "served_locally": served,
+        "served_share": round(served / len(records), 3),
+        "local_correct": correct,
+        "local_wrong": len(errors),
+        "to_llm": fallthrough,
+        "local_us_p50": round(percentile(latencies_us, 50), 1),
+        "local_us_p99": round(percentile(latencies_us, 99), 1),
+        "llm_ms": llm_ms,
+        "saved_s": round((served * llm_ms - local_ms) / 1000, 2),
+        "mean_ms_before": llm_ms,
+        "mean_ms_after": round((fallthrough * llm_ms + local_ms) / len(records), 1),
+        "errors": errors,
+    }
+
+def median_llm_latency(results_path: str) -> Optional[float]:
+    """Latenza mediana (ms) delle risposte non in cache di un'esecuzione di groq_async_client.py,
+    None se nessuna risposta riuscita è stata servita dall'LLM"""
+    from groq_async_client import percentile
+
+    latencies = []
+    with open(results_path, encoding='utf-8') as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get("ok") and not result.get("cached"):
+                latencies.append(result["latency_ms"])
+    return percentile(latencies, 50) if latencies else None
+
+def main():
+    from groq_python_test import print_json, print_status, print_success, print_warning
+
+    parser = argparse.ArgumentParser(description="Estrazione locale degli appuntamenti senza LLM")
+    parser.add_argument("prompt", nargs='?', help="Prompt da estrarre")
+    parser.add_argument("--benchmark", metavar="CORPUS", help="Corpus JSONL etichettato da valutare")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Confidenza minima per servire il prompt in locale")
+    parser.add_argument("--llm-ms", type=float, default=500, help="Latenza stimata di una chiamata LLM (ms)")
+    parser.add_argument("--llm-results", help="JSONL di groq_async_client.py da cui misurare la latenza LLM")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        llm_ms = args.llm_ms
+        if args.llm_results:
+            measured = median_llm_latency(args.llm_results)
+            if measured is None:
+                print_warning(f"Nessuna risposta LLM non in cache in {args.llm_results}: uso --llm-ms {args.llm_ms}")
+            else:
+                llm_ms = measured
+        report = benchmark(args.benchmark, args.threshold, llm_ms)
+        errors = report.pop("errors")
+        print_json(report, "Benchmark estrattore locale")
+        for error in errors:
+            print_warning(f"Servito in locale ma errato ({error['confidence']}): {error['prompt']}")
+            print(f"  atteso:  {json.dumps(error['expected'], ensure_ascii=False)}")
+            print(f"  ottenuto: {json.dumps(error['got'], ensure_ascii=False)}")
+        return 0 if not errors else 2
+
+    if not args.prompt:
+        parser.error("serve un prompt oppure --benchmark")
+    result = extract_appointment(args.prompt)
+    if result["confidence"] >= args.threshold:
+        print_success(f"Estratto in locale, confidenza {result['confidence']:.2f}")
+    else:
+        print_warning(f"Confidenza {result['confidence']:.2f} sotto la soglia {args.threshold}: andrebbe all'LLM")
+    for reason in result["reasons"]:
+        print_status(reason)
+    if result["appointment"]:
+        print_json(result["appointment"], "JSON appuntamento locale")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
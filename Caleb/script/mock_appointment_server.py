@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Sostituto locale del server Ktor degli appuntamenti (POST /appointments).
+
+Replica il comportamento di AppointmentService.kt: stessa validazione (inizio non
+successivo alla fine, lista partecipanti non vuota), id generato se assente,
+aggiornamento se l'id esiste già, risposta 201 con l'appuntamento salvato e 400
+con il messaggio di errore. Gli appuntamenti restano in memoria; latenza ed errori
+5xx si possono simulare come nel mock di Groq.
+
+Con --storage il salvataggio fa come saveAppointment: rilegge tutto il file JSON,
+aggiorna la lista e lo riscrive per intero, senza lock tra richieste concorrenti.
+Il costo di ogni salvataggio cresce quindi con il numero di appuntamenti salvati.
+
+Uso: python3 mock_appointment_server.py --port 8079 --latency-ms 20
+     python3 mock_appointment_server.py --port 8079 --storage /tmp/appointments.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from groq_python_test import print_status, print_error, print_success
+
+def validation_errors(appointment: Dict[str, Any]) -> List[str]:
+    """Stessi controlli di AppointmentService.validateAppointment"""
+    errors = []
+    start, end = appointment.get("startTime"), appointment.get("endTime")
+    if start is not None and end is not None:
+        if datetime.fromisoformat(start) > datetime.fromisoformat(end):
+            errors.append("La data di inizio non può essere successiva alla data di fine")
+    participants = appointment.get("participants")
+    if participants is not None and len(participants) == 0:
+        errors.append("La lista dei partecipanti non può essere vuota")
+    return errors
+
+class MockAppointmentServer:
+    """Archivio in memoria con la stessa semantica di salvataggio del server Ktor"""
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None,
+                 storage: Optional[str] = None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.storage = storage
+        self.random = random.Random(seed)
+        self.appointments = {}
+        self.stats = {"requests": 0, "created": 0, "updated": 0, "rejected": 0, "server_errors": 0}
+
+    async def save_appointment(self, request):
+        self.stats["requests"] += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if self.random.random() < self.error_rate:
+            self.stats["server_errors"] += 1
+            return web.Response(status=503, text="Errore simulato")
+
+        try:
+            appointment = await request.json()
+            if not isinstance(appointment, dict):
+                raise ValueError("atteso un oggetto JSON")
+            errors = validation_errors(appointment)
+            if errors:
+                raise ValueError(f"Errori di validazione: {', '.join(errors)}")
+        except (json.JSONDecodeError, ValueError, TypeError) as e:
+            self.stats["rejected"] += 1
+            return web.Response(status=400, text=f"Errore nella gestione della richiesta: {e}")
+
+        if appointment.get("id") is None:
+            appointment["id"] = str(uuid.uuid4())
+        if self.storage:
+            await self.save_to_file(appointment)
+        else:
+            self.stats["updated" if appointment["id"] in self.appointments else "created"] += 1
+            self.appointments[appointment["id"]] = appointment
+        return web.json_response(appointment, status=201)
+
+    def load_file(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.storage):
+            return []
+        try:
+            with open(self.storage, encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            # Come loadAppointments: un file illeggibile (es. a metà di una riscrittura) vale una lista vuota
+            return []
+
+    def write_file(self, appointments: List[Dict[str, Any]]):
+        with open(self.storage, 'w', encoding='utf-8') as f:
+            json.dump(appointments, f, indent=2, ensure_ascii=False)
+
+    async def save_to_file(self, appointment: Dict[str, Any]):
+        """Rilettura e riscrittura completa del file, come AppointmentService.saveAppointment"""
+        appointments = await asyncio.to_thread(self.load_file)
+        index = next((i for i, a in enumerate(appointments) if a.get("id") == appointment["id"]), None)
+        if index is None:
+            appointments.append(appointment)
+            self.stats["created"] += 1
+        else:
+            appointments[index] = appointment
+            self.stats["updated"] += 1
+        await asyncio.to_thread(self.write_file, appointments)
+
+    async def all_appointments(self) -> List[Dict[str, Any]]:
+        if self.storage:
+            return await asyncio.to_thread(self.load_file)
+        return list(self.appointments.values())
+
+    async def list_appointments(self, request):
+        return web.json_response(await self.all_appointments())
+
+    async def get_stats(self, request):
+        return web.json_response({**self.stats, "stored": len(await self.all_appointments())})
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post('/appointments', self.save_appointment)
+        app.router.add_get('/appointments', self.list_appointments)
+        app.router.add_get('/stats', self.get_stats)
+        return app
+
+async def start_app(app, host: str = "127.0.0.1", port: int = 0):
+    """Avvia un'app aiohttp nel loop corrente; restituisce (runner, porta effettiva)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Server appuntamenti locale compatibile con il server Ktor")
+    parser.add_argument("--host", default="127.0.0.1", help="Indirizzo di ascolto")
+    parser.add_argument("--port", "-p", type=int, default=8079, help="Porta di ascolto")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latenza simulata per richiesta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Frazione di risposte 503 simulate")
+    parser.add_argument("--seed", type=int, help="Seme per errori riproducibili")
+    parser.add_argument("--storage", help="File JSON riscritto a ogni salvataggio, come il server Ktor")
+    args = parser.parse_args()
+
+    if not AIOHTTP_AVAILABLE:
+        print_error("aiohttp non installato: pip install aiohttp")
+        return 1
+
+    server = MockAppointmentServer(args.latency_ms, args.error_rate, args.seed, args.storage)
+    print_success(f"Server appuntamenti locale su http://{args.host}:{args.port}/appointments")
+    print_status(f"Latenza {args.latency_ms:.0f} ms, errori {args.error_rate:.0%}, "
+                 f"archivio {args.storage or 'in memoria'}")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Server mock dell'endpoint OpenAI-compatibile /chat/completions di Groq.
+
+Risponde con un appuntamento JSON plausibile ricavato dal prompt (giorno, ora,
+partecipanti, luogo) e con il blocco "usage", simulando latenza, errori 5xx casuali
+e un limite di richieste al secondo (429 con Retry-After). Con "stream": true
+risponde in Server-Sent Events un token alla volta, come Groq. Serve a provare i
+client senza API key e senza consumare quota.
+
+Uso: python3 mock_groq_server.py --port 8089 --latency-ms 300 --error-rate 0.05 --rps 20
+     python3 groq_async_client.py prompts.txt --api-url http://127.0.0.1:8089/openai/v1/chat/completions
+     python3 groq_python_test.py mock --stream --api-url http://127.0.0.1:8089/openai/v1/chat/completions
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from groq_python_test import print_status, print_error, print_success
+
+def estimate_tokens(text: str) -> int:
+    """Stima grossolana dei token (circa 4 caratteri per token)"""
+    return max(1, (len(text) + 3) // 4)
+
+def fake_appointment(prompt: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Appuntamento deterministico per il prompt, con le regole del prompt di sistema"""
+    now = now or datetime.now()
+    testo = prompt.lower()
+
+    giorni = 2 if 'dopodomani' in testo else 0 if 'oggi' in testo else 1
+    orario = re.search(r'\b(\d{1,2})[:.](\d{2})\b', testo) or re.search(r'\balle (\d{1,2})\b', testo)
+    ora = int(orario.group(1)) if orario else 9
+    minuti = int(orario.group(2)) if orario and orario.lastindex == 2 else 0
+    inizio = (now + timedelta(days=giorni)).replace(hour=min(ora, 23), minute=min(minuti, 59),
+                                                    second=0, microsecond=0)
+
+    dopo_con = prompt.split(' con ', 1)[1] if ' con ' in prompt else ''
+    nomi = re.findall(r'\b[A-ZÀ-Ù][a-zà-ù]+\b', dopo_con.split(' per ')[0].split(' in ')[0])
+    luogo = re.search(r'\b(?:in|presso) ([^,.]+?)(?: per |,|\.|$)', prompt)
+
+    return {
+        "id": f"APP-{int(hashlib.sha1(prompt.encode()).hexdigest(), 16) % 1000:03d}",
+        "title": prompt.split(' con ')[0].split(' domani')[0].strip()[:60] or "Appuntamento",
+        "description": prompt,
+        "startTime": inizio.isoformat(),
+        "endTime": (inizio + timedelta(hours=1)).isoformat(),
+        "location": luogo.group(1).strip() if luogo else "Da definire",
+        "participants": [f"{nome.lower()}@example.com" for nome in nomi],
+        "status": "CONFIRMED",
+        "notes": ""
+    }
+
+def split_tokens(text: str, size: int = 4):
+    """Pezzi di circa un token, come arrivano nei chunk dello stream"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def usage_block(payload: Dict[str, Any], content: str) -> Dict[str, int]:
+    prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in payload.get('messages', []))
+    completion_tokens = estimate_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+def chunk_event(completion_id: str, model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None,
+                usage: Optional[Dict[str, int]] = None) -> bytes:
+    """Un evento SSE chat.completion.chunk; l'usage finale sta in x_groq come nell'API di Groq"""
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    if usage:
+        chunk["x_groq"] = {"id": completion_id, "usage": usage}
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+
+def completion_response(payload: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """Risposta chat/completions non in streaming, con lo stesso formato di Groq"""
+    return {
+        "id": f"chatcmpl-mock-{random.getrandbits(48):012x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get('model', 'mock'),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": usage_block(payload, content)
+    }
+
+class MockGroqServer:
+    """Stato del mock: configurazione dei guasti, finestra del rate limit e contatori"""
+
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 50, error_rate: float = 0.0,
+                 rps: Optional[float] = None, seed: Optional[int] = None, token_ms: float = 10,
+                 bad_output_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rps = rps
+        self.token_ms = token_ms
+        self.bad_output_rate = bad_output_rate
+        self.random = random.Random(seed)
+        self.recent_requests = deque()
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "server_errors": 0, "bad_requests": 0,
+                      "streams_aborted": 0}
+
+    def retry_after(self) -> Optional[float]:
+        """Secondi da attendere se la richiesta supera il limite per secondo, altrimenti None"""
+        if not self.rps:
+            return None
+        now = time.monotonic()
+        while self.recent_requests and now - self.recent_requests[0] >= 1.0:
+            self.recent_requests.popleft()
+        if len(self.recent_requests) >= self.rps:
+            return 1.0 - (now - self.recent_requests[0])
+        self.recent_requests.append(now)
+        return None
+
+    async def simulate_latency(self):
+        ritardo = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms))
+        await asyncio.sleep(ritardo / 1000)
+
+    async def chat_completions(self, request):
+        self.stats["requests"] += 1
+
+        attesa = self.retry_after()
+        if attesa is not None:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                status=429, headers={"Retry-After": f"{attesa:.3f}"}
+            )
+
+        try:
+            payload = await request.json()
+            user_prompt = next(m['content'] for m in reversed(payload['messages']) if m['role'] == 'user')
+        except (json.JSONDecodeError, KeyError, StopIteration, TypeError):
+            self.stats["bad_requests"] += 1
+            return web.json_response({"error": {"message": "Richiesta non valida"}}, status=400)
+
+        await self.simulate_latency()
+
+        if self.random.random() < self.error_rate:
+            self.stats["server_errors"] += 1
+            status = self.random.choice([500, 502, 503])
+            return web.json_response({"error": {"message": "Errore simulato"}}, status=status)
+
+        content = json.dumps(fake_appointment(user_prompt), ensure_ascii=False)
+        if self.random.random() < self.bad_output_rate:
+            # Risposta che ignora il prompt di sistema: testo libero prima del JSON
+            content = f"Certo! Ecco l'appuntamento estratto dal testo:\n\n{content}\n\nFammi sapere se serve altro."
+        self.stats["ok"] += 1
+        if payload.get('stream'):
+            return await self.stream_completion(request, payload, content)
+        return web.json_response(completion_response(payload, content))
+
+    async def stream_completion(self, request, payload: Dict[str, Any], content: str):
+        """Stream SSE: un chunk per token a token_ms di distanza, poi usage e [DONE]"""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        completion_id = f"chatcmpl-mock-{self.random.getrandbits(48):012x}"
+        model = payload.get('model', 'mock')
+        try:
+            await response.write(chunk_event(completion_id, model, {"role": "assistant", "content": ""}))
+            for token in split_tokens(content):
+                await asyncio.sleep(self.token_ms / 1000)
+                await response.write(chunk_event(completion_id, model, {"content": token}))
+            await response.write(chunk_event(completion_id, model, {}, "stop", usage_block(payload, content)))
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            # Il client ha chiuso lo stream (JSON completo o risposta non valida): niente altro da inviare
+            self.stats["streams_aborted"] += 1
+        return response
+
+    async def get_stats(self, request):
+        return web.json_response(self.stats)
+
+    def create_app(self):
+        app = web.Application()
+        # Sia il percorso di Groq sia quello OpenAI standard
+        app.router.add_post('/openai/v1/chat/completions', self.chat_completions)
+        app.router.add_post('/v1/chat/completions', self.chat_completions)
+        app.router.add_get('/stats', self.get_stats)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Server mock OpenAI-compatibile per i test del client Groq")
+    parser.add_argument("--host", default="127.0.0.1", help="Indirizzo di ascolto")
+    parser.add_argument("--port", "-p", type=int, default=8089, help="Porta di ascolto")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Latenza media simulata")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Variazione massima della latenza")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Frazione di risposte 5xx simulate")
+    parser.add_argument("--rps", type=float, help="Richieste al secondo oltre le quali risponde 429")
+    parser.add_argument("--seed", type=int, help="Seme per latenze ed errori riproducibili")
+    parser.add_argument("--token-ms", type=float, default=10, help="Intervallo tra i token in streaming")
+    parser.add_argument("--bad-output-rate", type=float, default=0.0,
+                        help="Frazione di risposte con testo libero attorno al JSON")
+    args = parser.parse_args()
+
+    if not AIOHTTP_AVAILABLE:
+        print_error("aiohttp non installato: pip install aiohttp")
+        return 1
+
+    server = MockGroqServer(args.latency_ms, args.jitter_ms, args.error_rate, args.rps, args.seed,
+                            args.token_ms, args.bad_output_rate)
+    print_success(f"Mock Groq in ascolto su http://{args.host}:{args.port}/openai/v1/chat/completions")
+    print_status(f"Latenza {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, errori {args.error_rate:.0%}, "
+                 f"limite {args.rps or 'nessuno'} req/s")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Cache persistente (SQLite) delle risposte dell'AI per l'estrazione degli appuntamenti.
+
+La chiave è l'hash di modello, temperatura, prompt di sistema, prompt utente
+normalizzato (spazi compattati, maiuscole ignorate) e data di riferimento: i
+prompt con date relative ("domani alle 15") danno appuntamenti diversi in giorni
+diversi, quindi una risposta vale al massimo per il giorno in cui è stata generata.
+
+Le voci scadono dopo un TTL; oltre il numero massimo di voci o di byte vengono
+rimosse le meno usate di recente. Hit, miss ed evizioni sono salvati nel database
+insieme alle risposte.
+
+Uso: python3 response_cache.py [--cache groq_cache.sqlite] stats | evict | clear
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from datetime import date
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_PATH = "groq_cache.sqlite"
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    content TEXT NOT NULL,
+    appointment TEXT NOT NULL,
+    usage TEXT,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def normalize_prompt(prompt: str) -> str:
+    """Forma canonica del prompt: Unicode NFC, spazi compattati, maiuscole ignorate"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', prompt)).strip().casefold()
+
+def make_key(user_prompt: str, model: str, temperature: float, system_prompt: str,
+             reference_date: Optional[date] = None) -> str:
+    parts = {
+        "model": model,
+        "temperature": temperature,
+        "system": hashlib.sha256(system_prompt.encode('utf-8')).hexdigest(),
+        "prompt": normalize_prompt(user_prompt),
+        "date": (reference_date or date.today()).isoformat(),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Cache delle risposte con TTL ed evizione LRU per numero di voci e dimensione"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES, max_bytes: Optional[int] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        # WAL: letture e scritture da più processi senza bloccarsi a vicenda
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _increment(self, name: str, amount: int = 1):
+        self.conn.execute(
+            "INSERT INTO counters(name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Appuntamento, contenuto e usage della risposta in cache, o None (voce assente o scaduta)"""
+        now = time.time()
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT content, appointment, usage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[3] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._increment("expired")
+                row = None
+            if row is None:
+                self._increment("misses")
+                return None
+            self.conn.execute("UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._increment("hits")
+        return {
+            "content": row[0],
+            "appointment": json.loads(row[1]),
+            "usage": json.loads(row[2]) if row[2] else None,
+            "age_s": now - row[3],
+        }
+
+    def put(self, key: str, model: str, prompt: str, content: str, appointment: Dict[str, Any],
+            usage: Optional[Dict[str, Any]] = None):
+        """Salva una risposta valida e applica i limiti di dimensione"""
+        now = time.time()
+        appointment_json = json.dumps(appointment, ensure_ascii=False)
+        usage_json = json.dumps(usage) if usage else None
+        size = len(prompt.encode()) + len(content.encode()) + len(appointment_json.encode())
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses(key, model, prompt, content, appointment, usage, "
+                "created, last_access, hits, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                (key, model, prompt, content, appointment_json, usage_json, now, now, size)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        removed = self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+        if removed:
+            self._increment("expired", removed)
+
+        evicted = 0
+        if self.max_entries is not None:
+            evicted += self.conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,)
+            ).rowcount
+        if self.max_bytes is not None:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Le voci più recenti che stanno nel limite restano, le altre vengono rimosse
+                keep, kept_bytes = [], 0
+                for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access DESC"):
+                    if kept_bytes + size > self.max_bytes:
+                        break
+                    keep.append(key)
+                    kept_bytes += size
+                evicted += self.conn.execute(
+                    f"DELETE FROM responses WHERE key NOT IN ({','.join('?' * len(keep))})", keep
+                ).rowcount
+        if evicted:
+            self._increment("evictions", evicted)
+
+    def evict(self):
+        with self.conn:
+            self._evict(time.time())
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("DELETE FROM counters")
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self.conn.execute("SELECT name, value FROM counters"))
+        entries, total_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "expired": counters.get("expired", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestione della cache delle risposte Groq")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="File SQLite della cache")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL_SECONDS, help="Durata delle voci in secondi")
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="Numero massimo di voci")
+    parser.add_argument("--max-bytes", type=int, help="Dimensione massima delle voci in byte")
+    parser.add_argument("command", choices=["stats", "evict", "clear"], help="Operazione da eseguire")
+    args = parser.parse_args()
+
+    with ResponseCache(args.cache, args.ttl, args.max_entries, args.max_bytes) as cache:
+        if args.command == "evict":
+            cache.evict()
+        elif args.command == "clear":
+            cache.clear()
+        print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Addestramento out-of-core per dataset che non entrano in RAM.
+
+Il CSV viene letto a blocchi in due passate:
+1. aggiorna PreprocessoreQuestionario e StandardScaler (partial_fit su tutti i
+   blocchi), raccoglie le classi ed estrae un campione di holdout a dimensione
+   fissa con reservoir sampling. Le risposte Yes/No mancanti restano NaN (lo
+   scaler le ignora) e nel campione vengono imputate con la moda finale;
+2. addestra un classificatore online (SGD logistico o Naive Bayes) con partial_fit,
+   escludendo le righe finite nel campione di holdout.
+
+La memoria occupata dipende solo dalla dimensione del blocco e del campione,
+non dalla dimensione del file.
+
+Uso: python addestramento_incrementale.py dati.csv --modello sgd --onnx modello.onnx
+"""
+
+import argparse
+import resource
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.naive_bayes import GaussianNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from caricamento_dati import leggi_csv_tipizzato
+from personality_predictor import esporta_modello_onnx, salva_info_modello
+from preprocessamento import PreprocessoreQuestionario
+
+def crea_classificatore_online(tipo):
+    """Crea un classificatore che supporta partial_fit"""
+    if tipo == 'sgd':
+        return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+    if tipo == 'nb':
+        return GaussianNB()
+    raise ValueError(f"Tipo di modello non supportato: {tipo}")
+
+def leggi_blocchi(percorso_file, dimensione_blocco):
+    """Legge il CSV a blocchi restituendo le feature grezze e il target, senza righe prive di etichetta"""
+    for blocco in leggi_csv_tipizzato(percorso_file, chunksize=dimensione_blocco):
+        blocco = blocco.dropna(subset=['Personality'])
+        y = blocco.pop('Personality').to_numpy()
+        yield blocco, y
+
+def codifica_blocco(preprocessore, X, y, imputa_mancanti=True):
+    """Applica il preprocessore e scarta le righe con feature numeriche mancanti"""
+    X = preprocessore.codifica(X, imputa_mancanti)
+    numeriche = np.ones(X.shape[1], dtype=bool)
+    numeriche[preprocessore.colonne_si_no()] = False
+    valide = ~np.isnan(X[:, numeriche]).any(axis=1)
+    return X[valide], y[valide]
+
+def picco_memoria_mb():
+    """Picco di memoria residente del processo (ru_maxrss è in KB su Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class CampioneReservoir:
+    """Campione uniforme di dimensione fissa su uno stream di righe (algoritmo R)"""
+
+    def __init__(self, dimensione, n_features, random_state=42):
+        self.dimensione = dimensione
+        self.X = np.empty((dimensione, n_features), dtype=np.float64)
+        self.y = np.empty(dimensione, dtype=object)
+        self.indici = np.full(dimensione, -1, dtype=np.int64)
+        self.visti = 0
+        self.rng = np.random.default_rng(random_state)
+
+    def aggiorna(self, X, y):
+        n = len(X)
+        posizioni = np.arange(self.visti, self.visti + n)
+
+        # Riempimento iniziale
+        n_liberi = max(0, min(n, self.dimensione - self.visti))
+        if n_liberi:
+            self.X[self.visti:self.visti + n_liberi] = X[:n_liberi]
+            self.y[self.visti:self.visti + n_liberi] = y[:n_liberi]
+            self.indici[self.visti:self.visti + n_liberi] = posizioni[:n_liberi]
+
+        # Sostituzioni: la riga i entra con probabilità dimensione / (i + 1)
+        if n_liberi < n:
+            slot = self.rng.integers(0, posizioni[n_liberi:] + 1)
+            for k in np.flatnonzero(slot < self.dimensione):
+                riga = n_liberi + k
+                self.X[slot[k]] = X[riga]
+                self.y[slot[k]] = y[riga]
+                self.indici[slot[k]] = posizioni[riga]
+
+        self.visti += n
+
+    def campione(self):
+        n = min(self.visti, self.dimensione)
+        return self.X[:n], self.y[:n], self.indici[:n]
+
+def addestra_incrementale(percorso_file, tipo='sgd', dimensione_blocco=100_000,
+                          dimensione_holdout=50_000, epoche=1):
+    """Addestra un modello online sul CSV senza caricarlo interamente in memoria"""
+    inizio = time.perf_counter()
+    preprocessore = None
+    scaler = StandardScaler()
+    classi = set()
+    reservoir = None
+    colonne = None
+
+    print("\n=== PASSATA 1: statistiche e campione di holdout ===")
+    for X, y in leggi_blocchi(percorso_file, dimensione_blocco):
+        if len(X) == 0:
+            continue
+        if preprocessore is None:
+            preprocessore = PreprocessoreQuestionario()
+            colonne = list(X.columns)
+            reservoir = CampioneReservoir(dimensione_holdout, len(colonne))
+        preprocessore.partial_fit(X)
+        X, y = codifica_blocco(preprocessore, X, y, imputa_mancanti=False)
+        if len(X) == 0:
+            continue
+        scaler.partial_fit(X)
+        classi.update(np.unique(y))
+        reservoir.aggiorna(X, y)
+
+    if reservoir is None or reservoir.visti == 0:
+        raise ValueError(f"Nessuna riga valida in '{percorso_file}'")
+
+    classi = np.array(sorted(classi), dtype=object)
+    X_holdout, y_holdout, indici_holdout = reservoir.campione()
+    for i in preprocessore.colonne_si_no():
+        colonna = X_holdout[:, i]
+        colonna[np.isnan(colonna)] = preprocessore.moda_[preprocessore.feature_names_in_[i]]
+    indici_holdout = np.sort(indici_holdout)
+    print(f"Righe valide: {reservoir.visti}, holdout: {len(y_holdout)}, classi: {[str(c) for c in classi]}")
+
+    classificatore = crea_classificatore_online(tipo)
+
+    for epoca in range(1, epoche + 1):
+        print(f"\n=== PASSATA {epoca + 1}: addestramento ({type(classificatore).__name__}) ===")
+        riga_corrente = 0
+        for X, y in leggi_blocchi(percorso_file, dimensione_blocco):
+            X, y = codifica_blocco(preprocessore, X, y)
+            if len(X) == 0:
+                continue
+            posizioni = np.arange(riga_corrente, riga_corrente + len(X))
+            riga_corrente += len(X)
+
+            # Escludi le righe del campione di holdout
+            mask = ~np.isin(posizioni, indici_holdout, assume_unique=True)
+            if mask.any():
+                classificatore.partial_fit(scaler.transform(X[mask]), y[mask], classes=classi)
+        print(f"Picco memoria: {picco_memoria_mb():.1f} MB")
+
+    modello = Pipeline([
+        ('preprocessore', preprocessore),
+        ('scaler', scaler),
+        ('classificatore', classificatore)
+    ])
+    # Il campione di holdout è già codificato: si salta il preprocessore
+    y_pred = modello[1:].predict(X_holdout)
+    accuratezza = accuracy_score(y_holdout, y_pred)
+    tempo = time.perf_counter() - inizio
+
+    print(f"\nAccuratezza holdout: {accuratezza:.4f}")
+    print("Classification Report:")
+    print(classification_report(y_holdout, y_pred))
+    print(f"Tempo totale: {tempo:.2f}s, picco memoria: {picco_memoria_mb():.1f} MB")
+
+    return modello, colonne, {
+        'accuratezza': accuratezza,
+        'righe': reservoir.visti,
+        'tempo': tempo,
+        'memoria_picco_mb': picco_memoria_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Addestramento out-of-core del modello di personalità")
+    parser.add_argument("dati", help="File CSV di training con colonna 'Personality'")
+    parser.add_argument("--modello", choices=['sgd', 'nb'], default='sgd',
+                        help="Classificatore online: regressione logistica SGD o Naive Bayes")
+    parser.add_argument("--blocco", "-b", type=int, default=100_000, help="Numero di righe per blocco")
+    parser.add_argument("--holdout", type=int, default=50_000, help="Dimensione del campione di holdout")
+    parser.add_argument("--epoche", type=int, default=1, help="Numero di passate di addestramento")
+    parser.add_argument("--output", "-o", default="modello_personalita.pkl", help="File joblib di output")
+    parser.add_argument("--onnx", help="Esporta anche il modello ONNX in questo file")
+    args = parser.parse_args()
+
+    modello, colonne, _ = addestra_incrementale(args.dati, args.modello, args.blocco,
+                                                args.holdout, args.epoche)
+
+    joblib.dump(modello, args.output)
+    print(f"\n💾 Modello salvato come '{args.output}'")
+
+    if args.onnx:
+        # Per l'esportazione serve solo il numero di feature
+        X_vuoto = np.empty((0, len(colonne)), dtype=np.float32)
+        onnx_success, _ = esporta_modello_onnx(modello, X_vuoto, args.onnx)
+        if not onnx_success:
+            return 5
+
+    salva_info_modello(modello, modello.classes_)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+"""
+Benchmark del tempo di avvio (import) dei moduli di predizione.
+
+Ogni modulo viene importato in un interprete nuovo con `python -X importtime`; del
+risultato si tiene il tempo cumulativo dell'import del modulo (minimo su più
+ripetizioni) e i pacchetti più pesanti che trascina con sé. Il comando fallisce se
+un modulo supera la propria soglia o, con --baseline, se peggiora oltre la tolleranza
+rispetto a una misura salvata.
+
+Uso:
+  python benchmark_avvio.py
+  python benchmark_avvio.py --salva-baseline avvio.json
+  python benchmark_avvio.py --baseline avvio.json --tolleranza 0.25
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Soglie assolute in millisecondi per il tempo cumulativo di import
+SOGLIE_MS = {
+    'punteggio': 250,
+    'personality_predictor': 800,
+}
+
+# Pacchetti che il percorso di predizione leggero non deve mai importare
+VIETATI_PUNTEGGIO = ('pandas', 'sklearn', 'skl2onnx', 'scipy')
+
+CARTELLA_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+
+def misura_import(modulo):
+    """Importa il modulo in un processo nuovo; restituisce {pacchetto: (self_us, cumulativo_us)}"""
+    ambiente = dict(os.environ, PYTHONPATH=CARTELLA_SCRIPT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        capture_output=True, text=True, env=ambiente, cwd=CARTELLA_SCRIPT
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Import di '{modulo}' fallito:\n{processo.stderr[-2000:]}")
+
+    tempi = {}
+    for riga in processo.stderr.splitlines():
+        if not riga.startswith('import time:') or 'self [us]' in riga:
+            continue
+        self_us, cumulativo_us, nome = riga[len('import time:'):].split('|')
+        tempi[nome.strip()] = (int(self_us), int(cumulativo_us))
+    return tempi
+
+def misura_modulo(modulo, ripetizioni=5, n_pesanti=5):
+    misure = [misura_import(modulo) for _ in range(ripetizioni)]
+    migliore = min(misure, key=lambda t: t[modulo][1])
+    # Pacchetti di primo livello con il tempo proprio più alto (il modulo stesso escluso)
+    radici = {}
+    for nome, (self_us, _) in migliore.items():
+        radice = nome.split('.')[0]
+        if radice != modulo:
+            radici[radice] = radici.get(radice, 0) + self_us
+    pesanti = sorted(radici.items(), key=lambda x: x[1], reverse=True)[:n_pesanti]
+    return {
+        'import_ms': round(migliore[modulo][1] / 1000, 1),
+        'pacchetti': sorted(radici),
+        'piu_pesanti_ms': {nome: round(us / 1000, 1) for nome, us in pesanti},
+    }
+
+def controlla(risultati, baseline=None, tolleranza=0.2):
+    """Elenco delle regressioni rispetto a soglie, pacchetti vietati e baseline"""
+    problemi = []
+    for modulo, r in risultati.items():
+        soglia = SOGLIE_MS.get(modulo)
+        if soglia is not None and r['import_ms'] > soglia:
+            problemi.append(f"{modulo}: {r['import_ms']} ms oltre la soglia di {soglia} ms")
+        if baseline and modulo in baseline:
+            limite = baseline[modulo]['import_ms'] * (1 + tolleranza)
+            if r['import_ms'] > limite:
+                problemi.append(f"{modulo}: {r['import_ms']} ms contro {baseline[modulo]['import_ms']} ms "
+                                f"della baseline (+{tolleranza:.0%} ammesso)")
+    if 'punteggio' in risultati:
+        vietati = [p for p in VIETATI_PUNTEGGIO if p in risultati['punteggio']['pacchetti']]
+        if vietati:
+            problemi.append(f"punteggio importa pacchetti di addestramento: {', '.join(vietati)}")
+    return problemi
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tempo di import dei moduli di predizione")
+    parser.add_argument("moduli", nargs='*', default=list(SOGLIE_MS), help="Moduli da misurare")
+    parser.add_argument("--ripetizioni", "-n", type=int, default=5, help="Ripetizioni per modulo (si tiene il minimo)")
+    parser.add_argument("--baseline", help="File JSON di una misura precedente da non peggiorare")
+    parser.add_argument("--tolleranza", type=float, default=0.2, help="Peggioramento ammesso rispetto alla baseline")
+    parser.add_argument("--salva-baseline", metavar="FILE", help="Salva le misure come nuova baseline")
+    args = parser.parse_args()
+
+    risultati = {modulo: misura_modulo(modulo, args.ripetizioni) for modulo in args.moduli}
+
+    print(f"{'Modulo':<24} {'Import (ms)':<12} {'Soglia (ms)':<12} Pacchetti più pesanti")
+    for modulo, r in risultati.items():
+        soglia = SOGLIE_MS.get(modulo, '-')
+        pesanti = ', '.join(f"{nome} {ms}" for nome, ms in r['piu_pesanti_ms'].items())
+        print(f"{modulo:<24} {r['import_ms']:<12} {soglia:<12} {pesanti}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.salva_baseline:
+        with open(args.salva_baseline, 'w', encoding='utf-8') as f:
+            json.dump(risultati, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Baseline salvata in: {args.salva_baseline}")
+
+    problemi = controlla(risultati, baseline, args.tolleranza)
+    if problemi:
+        print("\n❌ Regressioni del tempo di avvio:")
+        for problema in problemi:
+            print(f"  - {problema}")
+        return 1
+    print("\n✅ Tempi di avvio entro le soglie")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Confronto tra il Gradient Boosting a istogrammi e il miglior altro candidato.
+
+Tutti i modelli di crea_modelli vengono valutati in cross-validation sullo stesso
+training set di addestra_modelli; il vincitore tra i candidati già esistenti viene
+poi confrontato con HistGradientBoostingClassifier su tempo di addestramento,
+accuratezza sull'holdout, dimensione del file ONNX e latenza per riga. Ogni modello
+viene esportato con esporta_modello_onnx e verificato contro sklearn sull'intero
+holdout.
+
+Uso: python benchmark_gbdt.py dati.csv --cartella onnx_candidati --json confronto.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from ottimizzazione_onnx import misura_variante
+from personality_predictor import (carica_dati_da_file, crea_modelli, dividi_train_test,
+                                   esporta_modello_onnx, preprocessa_dati)
+
+CANDIDATO = 'Gradient Boosting'
+
+def misura_candidato(nome, modello, X_train, y_train, X_test, y_test, cartella, n_fold=5, righe_latenza=1000):
+    """Cross-validation, addestramento ed esportazione ONNX di un candidato"""
+    cv = StratifiedKFold(n_splits=n_fold, shuffle=True, random_state=42)
+    punteggi_cv = cross_val_score(modello, X_train, y_train, cv=cv, scoring='accuracy')
+
+    inizio = time.perf_counter()
+    modello.fit(X_train, y_train)
+    tempo_fit = time.perf_counter() - inizio
+
+    risultato = {
+        'cv_media': float(punteggi_cv.mean()),
+        'accuratezza': float(accuracy_score(y_test, modello.predict(X_test))),
+        'tempo_fit': tempo_fit,
+        'onnx': None,
+    }
+
+    percorso = os.path.join(cartella, nome.lower().replace(' ', '_').replace('(', '').replace(')', '') + '.onnx')
+    esportato, _ = esporta_modello_onnx(modello, X_train, percorso)
+    if esportato:
+        risultato['onnx'] = misura_variante(modello, nome, percorso, X_test, righe_latenza)
+    return risultato
+
+def confronta_candidati(X, y, cartella, n_fold=5, righe_latenza=1000):
+    X_train, X_test, y_train, y_test = dividi_train_test(X, y)
+    modelli = crea_modelli(n_jobs=os.cpu_count() or 1, n_righe=len(X_train))
+    os.makedirs(cartella, exist_ok=True)
+
+    risultati = {}
+    for nome, modello in modelli.items():
+        print(f"\n=== {nome} ===")
+        risultati[nome] = misura_candidato(nome, modello, X_train, y_train, X_test, y_test,
+                                           cartella, n_fold, righe_latenza)
+    return risultati
+
+def stampa_confronto(risultati):
+    print(f"\n{'Modello':<24} {'CV':<8} {'Test':<8} {'Fit (s)':<9} {'ONNX KB':<10} {'Riga (ms)':<10} {'Parità':<7}")
+    print("-" * 80)
+    for nome, r in risultati.items():
+        onnx = r['onnx']
+        if onnx:
+            colonne_onnx = (f"{onnx['dimensione_kb']:<10.1f} {onnx['latenza_riga_ms']:<10.4f} "
+                            f"{'sì' if onnx['corrispondente'] else 'no':<7}")
+        else:
+            colonne_onnx = f"{'-':<10} {'-':<10} {'-':<7}"
+        print(f"{nome:<24} {r['cv_media']:<8.4f} {r['accuratezza']:<8.4f} {r['tempo_fit']:<9.2f} {colonne_onnx}")
+
+    altri = {nome: r for nome, r in risultati.items() if nome != CANDIDATO}
+    if CANDIDATO not in risultati or not altri:
+        return
+    vincitore = max(altri, key=lambda nome: altri[nome]['cv_media'])
+    gbdt, rif = risultati[CANDIDATO], risultati[vincitore]
+
+    # Rapporti Gradient Boosting / vincitore: sotto 1 il Gradient Boosting è più veloce o più piccolo
+    print(f"\n🏆 {CANDIDATO} contro il vincitore attuale ({vincitore}):")
+    print(f"  - Accuratezza CV: {gbdt['cv_media'] - rif['cv_media']:+.4f}, "
+          f"test: {gbdt['accuratezza'] - rif['accuratezza']:+.4f}")
+    print(f"  - Tempo di addestramento: {gbdt['tempo_fit']:.2f}s contro {rif['tempo_fit']:.2f}s "
+          f"(rapporto {gbdt['tempo_fit'] / rif['tempo_fit']:.2f})")
+    if gbdt['onnx'] and rif['onnx']:
+        print(f"  - File ONNX: {gbdt['onnx']['dimensione_kb']:.1f} KB contro {rif['onnx']['dimensione_kb']:.1f} KB "
+              f"(rapporto {gbdt['onnx']['dimensione_kb'] / rif['onnx']['dimensione_kb']:.2f})")
+        print(f"  - Latenza per riga: {gbdt['onnx']['latenza_riga_ms']:.4f} ms contro "
+              f"{rif['onnx']['latenza_riga_ms']:.4f} ms "
+              f"(rapporto {gbdt['onnx']['latenza_riga_ms'] / rif['onnx']['latenza_riga_ms']:.2f})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Gradient Boosting a istogrammi vs modello vincente")
+    parser.add_argument("dati", help="File CSV di training con colonna 'Personality'")
+    parser.add_argument("--fold", "-k", type=int, default=5, help="Fold di cross-validation")
+    parser.add_argument("--cartella", default="onnx_candidati", help="Cartella in cui esportare i modelli ONNX")
+    parser.add_argument("--righe-latenza", type=int, default=1000, help="Chiamate singole per misurare la latenza")
+    parser.add_argument("--json", help="File in cui salvare i risultati")
+    args = parser.parse_args()
+
+    df = carica_dati_da_file(args.dati)
+    if df is None:
+        return 1
+    X, y = preprocessa_dati(df)
+
+    risultati = confronta_candidati(X, y, args.cartella, args.fold, args.righe_latenza)
+    stampa_confronto(risultati)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(risultati, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Risultati salvati in: {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
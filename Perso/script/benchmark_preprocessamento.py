@@ -0,0 +1,82 @@
+"""
+Confronto di throughput tra il vecchio preprocessa_dati e PreprocessoreQuestionario.
+
+Genera un dataset sintetico con le sette feature del questionario (Yes/No come
+stringhe) e misura righe/secondo e memoria di picco delle due implementazioni.
+
+Uso: python benchmark_preprocessamento.py --righe 10000000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from preprocessamento import COLONNE_SI_NO, MAPPA_SI_NO, PreprocessoreQuestionario
+
+def genera_dati(n_righe, seed=42):
+    """Dataset sintetico con gli stessi range del questionario"""
+    rng = np.random.default_rng(seed)
+    si_no = np.array(['Yes', 'No'], dtype=object)
+    return pd.DataFrame({
+        'Time_spent_Alone': rng.integers(0, 12, n_righe).astype(np.float64),
+        'Stage_fear': si_no[rng.integers(0, 2, n_righe)],
+        'Social_event_attendance': rng.integers(0, 11, n_righe).astype(np.float64),
+        'Going_outside': rng.integers(0, 8, n_righe).astype(np.float64),
+        'Drained_after_socializing': si_no[rng.integers(0, 2, n_righe)],
+        'Friends_circle_size': rng.integers(0, 16, n_righe).astype(np.float64),
+        'Post_frequency': rng.integers(0, 11, n_righe).astype(np.float64),
+    })
+
+def preprocessa_dati_originale(df):
+    """Implementazione precedente (copia del frame e conversioni di stringa riga per riga)"""
+    df_processed = df.copy()
+    le = LabelEncoder()
+    for col in COLONNE_SI_NO:
+        if col in df_processed.columns:
+            df_processed[col] = df_processed[col].astype(str).str.lower()
+            df_processed[col] = df_processed[col].map(MAPPA_SI_NO)
+            if df_processed[col].isnull().any():
+                df_processed[col] = le.fit_transform(df_processed[col].fillna('no'))
+    return df_processed
+
+def misura(funzione, df):
+    """Restituisce (secondi, picco memoria MB) di una chiamata"""
+    tracemalloc.start()
+    inizio = time.perf_counter()
+    funzione(df)
+    durata = time.perf_counter() - inizio
+    _, picco = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return durata, picco / 1024 ** 2
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del preprocessamento")
+    parser.add_argument("--righe", type=int, default=10_000_000, help="Numero di righe sintetiche")
+    args = parser.parse_args()
+
+    print(f"Generazione di {args.righe:,} righe...")
+    df = genera_dati(args.righe)
+
+    preprocessore = PreprocessoreQuestionario().fit(df.head(1000))
+
+    implementazioni = {
+        'preprocessa_dati (originale)': preprocessa_dati_originale,
+        'PreprocessoreQuestionario': preprocessore.transform,
+    }
+
+    print(f"\n{'Implementazione':<32} {'Tempo (s)':<11} {'Righe/s':<14} {'Picco memoria (MB)':<18}")
+    tempi = {}
+    for nome, funzione in implementazioni.items():
+        durata, picco = misura(funzione, df)
+        tempi[nome] = durata
+        print(f"{nome:<32} {durata:<11.2f} {args.righe / durata:<14,.0f} {picco:<18.1f}")
+
+    originale, nuovo = tempi.values()
+    print(f"\nSpeedup: {originale / nuovo:.1f}x")
+
+if __name__ == "__main__":
+    main()
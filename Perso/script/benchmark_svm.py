@@ -0,0 +1,107 @@
+"""
+Confronto tra SVC (kernel RBF esatto, probability=True) e SVM con kernel approssimato.
+
+Per ogni dimensione del campione misura tempo di addestramento e accuratezza sul
+test set (al più il 20% dei dati originali, senza righe ricampionate). La SVC
+esatta viene saltata oltre --max-svc righe, dove diventa impraticabile.
+
+Uso: python benchmark_svm.py dati.csv --righe 1000 10000 100000 --json risultati.json
+"""
+
+import argparse
+import json
+import time
+
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.svm import SVC
+
+from personality_predictor import carica_dati_da_file, preprocessa_dati, crea_svm_approssimata, con_preprocessore
+
+def misura_modello(modello, X_train, y_train, X_test, y_test):
+    """Addestra il modello e restituisce tempo di fit, tempo di predizione e accuratezza"""
+    inizio = time.perf_counter()
+    modello.fit(X_train, y_train)
+    tempo_fit = time.perf_counter() - inizio
+
+    inizio = time.perf_counter()
+    y_pred = modello.predict(X_test)
+    tempo_predizione = time.perf_counter() - inizio
+
+    return {
+        'tempo_fit': tempo_fit,
+        'tempo_predizione': tempo_predizione,
+        'accuratezza': accuracy_score(y_test, y_pred)
+    }
+
+def confronta_svm(X, y, dimensioni, max_svc=20_000, n_componenti=500):
+    """Esegue il confronto per ogni dimensione.
+
+    La divisione training/test avviene una volta sola sui dati originali: solo il
+    training viene ricampionato con ripetizione quando servono più righe, così
+    nessuna riga duplicata finisce sia nel training sia nel test set.
+    """
+    X_train_tot, X_test_tot, y_train_tot, y_test_tot = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    risultati = []
+
+    for n_righe in dimensioni:
+        n_train = int(n_righe * 0.8)
+        n_test = min(n_righe - n_train, len(X_test_tot))
+        X_train = X_train_tot.sample(n=n_train, replace=n_train > len(X_train_tot), random_state=42)
+        y_train = y_train_tot.loc[X_train.index]
+        X_test = X_test_tot.sample(n=n_test, random_state=42)
+        y_test = y_test_tot.loc[X_test.index]
+
+        riga = {'righe': n_righe}
+        print(f"\n=== {n_righe} righe ===")
+
+        riga['svm_approssimata'] = misura_modello(
+            con_preprocessore(crea_svm_approssimata(n_componenti)), X_train, y_train, X_test, y_test
+        )
+        print(f"SVM approssimata: fit {riga['svm_approssimata']['tempo_fit']:.2f}s, "
+              f"accuratezza {riga['svm_approssimata']['accuratezza']:.4f}")
+
+        if n_righe <= max_svc:
+            riga['svc'] = misura_modello(
+                con_preprocessore(SVC(random_state=42, probability=True)), X_train, y_train, X_test, y_test
+            )
+            print(f"SVC esatta:       fit {riga['svc']['tempo_fit']:.2f}s, "
+                  f"accuratezza {riga['svc']['accuratezza']:.4f}")
+            print(f"Speedup fit: {riga['svc']['tempo_fit'] / riga['svm_approssimata']['tempo_fit']:.1f}x")
+        else:
+            riga['svc'] = None
+            print(f"SVC esatta:       saltata (oltre {max_svc} righe)")
+
+        risultati.append(riga)
+
+    return risultati
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SVC esatta vs SVM con kernel approssimato")
+    parser.add_argument("dati", help="File CSV di training con colonna 'Personality'")
+    parser.add_argument("--righe", type=int, nargs='+', default=[1_000, 5_000, 20_000, 100_000],
+                        help="Dimensioni del campione da confrontare")
+    parser.add_argument("--max-svc", type=int, default=20_000,
+                        help="Numero massimo di righe per cui addestrare la SVC esatta")
+    parser.add_argument("--componenti", type=int, default=500, help="Numero di random Fourier features")
+    parser.add_argument("--json", help="File in cui salvare i risultati")
+    args = parser.parse_args()
+
+    df = carica_dati_da_file(args.dati)
+    if df is None:
+        return 1
+    X, y = preprocessa_dati(df)
+
+    risultati = confronta_svm(X, y, args.righe, args.max_svc, args.componenti)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(risultati, f, indent=2)
+        print(f"\n💾 Risultati salvati in: {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""
+Caricamento tipizzato del dataset di personalità con cache colonnare.
+
+Lo schema dichiara i tipi delle sette feature e di 'Personality' (float32 per le
+numeriche, category per Yes/No e classe), evitando l'inferenza dei tipi e le
+stringhe Python per riga. Dopo la prima lettura il CSV viene salvato in formato
+Arrow IPC non compresso, che le esecuzioni successive aprono in memory-map invece
+di rieseguire il parsing. La cache risparmia solo il tempo di parsing: la
+conversione in DataFrame copia comunque i dati (categorie e valori mancanti non
+sono rappresentabili a copia zero), quindi la memoria occupata resta quella del
+DataFrame. La cache è legata a percorso, dimensione, mtime e a un hash del
+contenuto del file sorgente.
+
+Uso: python caricamento_dati.py dati.csv   (confronta i tempi di caricamento)
+"""
+
+import hashlib
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Tipi dichiarati per le colonne del dataset
+SCHEMA = {
+    'Time_spent_Alone': 'float32',
+    'Stage_fear': 'category',
+    'Social_event_attendance': 'float32',
+    'Going_outside': 'float32',
+    'Drained_after_socializing': 'category',
+    'Friends_circle_size': 'float32',
+    'Post_frequency': 'float32',
+    'Personality': 'category',
+}
+
+CARTELLA_CACHE = '.perso_cache'
+VERSIONE_CACHE = 1
+
+# Byte letti all'inizio e alla fine del file per l'hash del contenuto
+BYTE_HASH = 1024 * 1024
+
+def hash_sorgente(percorso_file):
+    """Hash di dimensione, mtime, inizio e fine del file (non richiede di leggerlo tutto)"""
+    stat = os.stat(percorso_file)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{VERSIONE_CACHE}|{os.path.abspath(percorso_file)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    with open(percorso_file, 'rb') as f:
+        h.update(f.read(BYTE_HASH))
+        if stat.st_size > BYTE_HASH:
+            f.seek(max(BYTE_HASH, stat.st_size - BYTE_HASH))
+            h.update(f.read(BYTE_HASH))
+    return h.hexdigest()
+
+def percorso_cache(percorso_file):
+    """File di cache per la versione corrente del CSV (il nome comprende l'estensione del sorgente)"""
+    cartella = os.path.join(os.path.dirname(os.path.abspath(percorso_file)), CARTELLA_CACHE)
+    return os.path.join(cartella, f"{os.path.basename(percorso_file)}-{hash_sorgente(percorso_file)}.arrow")
+
+def leggi_csv_tipizzato(percorso_file, **kwargs):
+    """pd.read_csv con i tipi dello schema (le colonne assenti vengono ignorate)"""
+    return pd.read_csv(percorso_file, dtype=SCHEMA, **kwargs)
+
+def salva_cache(df, percorso):
+    """Scrive il DataFrame in Arrow IPC non compresso (memory-mappabile), in modo atomico"""
+    os.makedirs(os.path.dirname(percorso), exist_ok=True)
+    temporaneo = f"{percorso}.tmp"
+    feather.write_feather(df, temporaneo, compression='uncompressed')
+    os.replace(temporaneo, percorso)
+
+def pulisci_cache_obsolete(percorso_file, percorso_valido):
+    """Rimuove le cache di versioni precedenti dello stesso CSV"""
+    cartella = os.path.dirname(percorso_valido)
+    # Nome esatto: un prefisso cancellerebbe anche le cache di dati-2.csv o dati.tsv
+    formato = re.compile(re.escape(os.path.basename(percorso_file)) + r'-[0-9a-f]{32}\.arrow')
+    for nome in os.listdir(cartella):
+        percorso = os.path.join(cartella, nome)
+        if formato.fullmatch(nome) and percorso != percorso_valido:
+            os.remove(percorso)
+
+def carica_dataset(percorso_file, usa_cache=True):
+    """Carica il CSV con i tipi dello schema, usando la cache colonnare se disponibile"""
+    if not (usa_cache and ARROW_AVAILABLE):
+        return leggi_csv_tipizzato(percorso_file)
+
+    cache = percorso_cache(percorso_file)
+    if os.path.exists(cache):
+        try:
+            # Una colonna per blocco (niente consolidamento) e buffer Arrow liberati durante la conversione
+            return feather.read_table(cache, memory_map=True).to_pandas(self_destruct=True, split_blocks=True)
+        except (OSError, pa.ArrowInvalid) as e:
+            print(f"[ATTENZIONE] Cache non leggibile, rileggo il CSV: {e}")
+
+    df = leggi_csv_tipizzato(percorso_file)
+    try:
+        salva_cache(df, cache)
+        pulisci_cache_obsolete(percorso_file, cache)
+    except OSError as e:
+        print(f"[ATTENZIONE] Impossibile scrivere la cache: {e}")
+    return df
+
+def leggi_blocchi_dataset(percorso_file, dimensione_blocco=1_000_000):
+    """Itera sul dataset a blocchi di DataFrame, dalla cache memory-mappata se esiste o dal CSV"""
+    if ARROW_AVAILABLE:
+        cache = percorso_cache(percorso_file)
+        if os.path.exists(cache):
+            tabella = feather.read_table(cache, memory_map=True)
+            for batch in tabella.to_batches(max_chunksize=dimensione_blocco):
+                yield batch.to_pandas(split_blocks=True)
+            return
+
+    yield from leggi_csv_tipizzato(percorso_file, chunksize=dimensione_blocco)
+
+def memoria_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+def main():
+    if len(sys.argv) != 2:
+        print("Uso: python caricamento_dati.py <file.csv>")
+        return 1
+    percorso_file = sys.argv[1]
+
+    misure = []
+
+    inizio = time.perf_counter()
+    df = pd.read_csv(percorso_file)
+    misure.append(('pd.read_csv', time.perf_counter() - inizio, memoria_mb(df)))
+
+    inizio = time.perf_counter()
+    df = leggi_csv_tipizzato(percorso_file)
+    misure.append(('CSV con schema', time.perf_counter() - inizio, memoria_mb(df)))
+
+    if ARROW_AVAILABLE:
+        carica_dataset(percorso_file)  # crea la cache se manca
+        inizio = time.perf_counter()
+        df = carica_dataset(percorso_file)
+        misure.append(('Cache Arrow (mmap)', time.perf_counter() - inizio, memoria_mb(df)))
+    else:
+        print("[ATTENZIONE] pyarrow non installato: cache non disponibile")
+
+    print(f"{'Metodo':<22} {'Tempo (s)':<11} {'Memoria (MB)':<13} {'Speedup':<8}")
+    base = misure[0][1]
+    for nome, tempo, memoria in misure:
+        print(f"{nome:<22} {tempo:<11.3f} {memoria:<13.1f} {base / tempo:<8.1f}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,27 @@
 import csv
+import io
+import json
 import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from schema_questionario import COLONNE_SI_NO, MAPPA_SI_NO
+
+# Range ammessi, gli stessi imposti da personality_questionnaire
+RANGE_VALIDI = {
+    'Time_spent_Alone': (0, 11),
+    'Social_event_attendance': (0, 10),
+    'Going_outside': (0, 7),
+    'Friends_circle_size': (0, 15),
+    'Post_frequency': (0, 10),
+}
+
+# Numero massimo di righe di esempio riportate per ogni problema
+MAX_ESEMPI = 5
 
 def conta_campi_mancanti(nome_file):
     campi_mancanti = 0
@@ -14,12 +36,213 @@ def conta_campi_mancanti(nome_file):
                 campi_mancanti += len(intestazione) - len(riga)
     return campi_mancanti
 
-# Richiesta input all'utente
-nome_file = input("Inserisci il percorso del file CSV: ").strip()
+def dividi_in_intervalli(nome_file, n_intervalli):
+    """Divide il file (esclusa l'intestazione) in intervalli di byte allineati a inizio riga"""
+    dimensione = os.path.getsize(nome_file)
+    with open(nome_file, 'rb') as f:
+        intestazione = f.readline()
+        inizio_dati = f.tell()
+        confini = [inizio_dati]
+        passo = max(1, (dimensione - inizio_dati) // max(1, n_intervalli))
+        for i in range(1, n_intervalli):
+            f.seek(max(inizio_dati + i * passo, confini[-1]))
+            f.readline()  # completa la riga corrente
+            posizione = f.tell()
+            if posizione >= dimensione:
+                break
+            if posizione > confini[-1]:
+                confini.append(posizione)
+        confini.append(dimensione)
+    colonne = next(csv.reader([intestazione.decode('utf-8-sig')]))
+    return colonne, list(zip(confini[:-1], confini[1:]))
+
+def esempi(maschera):
+    """Primi indici (relativi al blocco) dove la maschera è vera"""
+    return np.flatnonzero(maschera)[:MAX_ESEMPI].tolist()
+
+def scansiona_intervallo(nome_file, inizio, fine, colonne):
+    """Controlla un intervallo di byte del file. Gli indici di riga restituiti sono relativi all'intervallo.
+
+    Il conteggio dei campi per riga è vettoriale sulle virgole: i file con campi
+    tra virgolette contenenti virgole o a capo non sono supportati.
+    """
+    with open(nome_file, 'rb') as f:
+        f.seek(inizio)
+        dati = f.read(fine - inizio)
+    if not dati:
+        return {'righe': 0, 'irregolari': 0, 'esempi_irregolari': [], 'colonne': {},
+                'hash': np.array([], dtype=np.uint64)}
+    if not dati.endswith(b'\n'):
+        dati += b'\n'
+
+    # Campi per riga: virgole tra un a capo e il successivo, più uno
+    byte = np.frombuffer(dati, dtype=np.uint8)
+    fine_righe = np.flatnonzero(byte == ord('\n'))
+    virgole = np.cumsum(byte == ord(','))[fine_righe]
+    campi_per_riga = np.diff(virgole, prepend=0) + 1
+    n_righe = len(fine_righe)
+
+    blocco = pd.read_csv(io.BytesIO(dati), header=None, names=range(int(campi_per_riga.max())),
+                         dtype=str, keep_default_na=False, skip_blank_lines=False, engine='c')
+    irregolari = campi_per_riga != len(colonne)
+    regolari = ~irregolari
+    blocco = blocco.iloc[:, :len(colonne)]
+    blocco.columns = colonne
+
+    risultato = {
+        'righe': n_righe,
+        'irregolari': int(irregolari.sum()),
+        'esempi_irregolari': esempi(irregolari),
+        'colonne': {},
+        # Hash di ogni riga per la ricerca dei duplicati su tutto il file
+        'hash': pd.util.hash_pandas_object(blocco, index=False).to_numpy(),
+    }
+
+    for col in colonne:
+        valori = blocco[col].fillna('').str.strip()
+        mancanti = (valori == '').to_numpy() & regolari
+        non_validi = np.zeros(n_righe, dtype=bool)
+        fuori_range = np.zeros(n_righe, dtype=bool)
+
+        if col in RANGE_VALIDI:
+            numeri = pd.to_numeric(valori, errors='coerce').to_numpy()
+            non_validi = np.isnan(numeri) & ~mancanti & regolari
+            minimo, massimo = RANGE_VALIDI[col]
+            with np.errstate(invalid='ignore'):
+                fuori_range = ((numeri < minimo) | (numeri > massimo)) & regolari
+        elif col in COLONNE_SI_NO:
+            non_validi = ~valori.str.lower().isin(MAPPA_SI_NO.keys()).to_numpy() & ~mancanti & regolari
+
+        risultato['colonne'][col] = {
+            'mancanti': int(mancanti.sum()),
+            'non_validi': int(non_validi.sum()),
+            'fuori_range': int(fuori_range.sum()),
+            'esempi_mancanti': esempi(mancanti),
+            'esempi_non_validi': esempi(non_validi),
+            'esempi_fuori_range': esempi(fuori_range),
+        }
+
+    return risultato
+
+def scansiona_file(nome_file, workers=None, blocco_mb=64):
+    """Scansione della qualità dei dati in parallelo su intervalli di byte del file"""
+    workers = workers or os.cpu_count() or 1
+    n_intervalli = max(workers, -(-os.path.getsize(nome_file) // (blocco_mb * 1024 * 1024)))
+    colonne, intervalli = dividi_in_intervalli(nome_file, n_intervalli)
+
+    if workers == 1:
+        parziali = [scansiona_intervallo(nome_file, inizio, fine, colonne) for inizio, fine in intervalli]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parziali = list(executor.map(scansiona_intervallo, *zip(*[
+                (nome_file, inizio, fine, colonne) for inizio, fine in intervalli
+            ])))
+
+    return unisci_risultati(colonne, parziali)
+
+def unisci_risultati(colonne, parziali):
+    """Fonde i risultati dei blocchi convertendo gli indici relativi in numeri di riga del file"""
+    report = {
+        'righe': 0,
+        'irregolari': 0,
+        'esempi_irregolari': [],
+        'colonne': {col: {'mancanti': 0, 'non_validi': 0, 'fuori_range': 0,
+                          'esempi_mancanti': [], 'esempi_non_validi': [], 'esempi_fuori_range': []}
+                    for col in colonne},
+        'intervalli': [],
+    }
+
+    # La riga 1 è l'intestazione
+    prima_riga = 2
+    for parziale in parziali:
+        sposta = lambda indici: [prima_riga + i for i in indici]
+        report['righe'] += parziale['righe']
+        report['irregolari'] += parziale['irregolari']
+        report['esempi_irregolari'].extend(sposta(parziale['esempi_irregolari']))
+
+        problemi_intervallo = parziale['irregolari']
+        for col, conteggi in parziale['colonne'].items():
+            totali = report['colonne'][col]
+            for chiave in ('mancanti', 'non_validi', 'fuori_range'):
+                totali[chiave] += conteggi[chiave]
+                totali[f"esempi_{chiave}"].extend(sposta(conteggi[f"esempi_{chiave}"]))
+                problemi_intervallo += conteggi[chiave]
+
+        report['intervalli'].append({
+            'da_riga': prima_riga,
+            'a_riga': prima_riga + parziale['righe'] - 1,
+            'problemi': problemi_intervallo,
+        })
+        prima_riga += parziale['righe']
+
+    report['esempi_irregolari'] = report['esempi_irregolari'][:MAX_ESEMPI]
+    for totali in report['colonne'].values():
+        for chiave in ('mancanti', 'non_validi', 'fuori_range'):
+            totali[f"esempi_{chiave}"] = totali[f"esempi_{chiave}"][:MAX_ESEMPI]
+
+    # Duplicati: righe con lo stesso hash di una riga precedente
+    hash_righe = np.concatenate([p['hash'] for p in parziali]) if parziali else np.array([], dtype=np.uint64)
+    _, prima_occorrenza = np.unique(hash_righe, return_index=True)
+    duplicati = np.ones(len(hash_righe), dtype=bool)
+    duplicati[prima_occorrenza] = False
+    report['duplicati'] = int(duplicati.sum())
+    report['esempi_duplicati'] = (np.flatnonzero(duplicati)[:MAX_ESEMPI] + 2).tolist()
+
+    return report
+
+def stampa_report(report):
+    print(f"Righe analizzate: {report['righe']}")
+    print(f"Righe con numero di campi errato: {report['irregolari']} {report['esempi_irregolari'] or ''}")
+    print(f"Righe duplicate: {report['duplicati']} {report['esempi_duplicati'] or ''}")
+    print(f"\n{'Colonna':<28} {'Mancanti':<10} {'Non validi':<11} {'Fuori range':<12}")
+    print("-" * 63)
+    for col, c in report['colonne'].items():
+        print(f"{col:<28} {c['mancanti']:<10} {c['non_validi']:<11} {c['fuori_range']:<12}")
+
+    problemi = [c for c in report['colonne'].items()
+                if c[1]['esempi_mancanti'] or c[1]['esempi_non_validi'] or c[1]['esempi_fuori_range']]
+    if problemi:
+        print("\nEsempi (numeri di riga):")
+        for col, c in problemi:
+            for chiave in ('mancanti', 'non_validi', 'fuori_range'):
+                if c[f"esempi_{chiave}"]:
+                    print(f"  {col} - {chiave.replace('_', ' ')}: {c[f'esempi_{chiave}']}")
+
+    print("\nProblemi per intervallo di righe:")
+    for intervallo in report['intervalli']:
+        print(f"  righe {intervallo['da_riga']}-{intervallo['a_riga']}: {intervallo['problemi']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Controllo qualità di un file CSV di personalità")
+    parser.add_argument("file", nargs='?', help="File CSV da controllare (se assente viene chiesto)")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Numero di processi (default: tutti i core)")
+    parser.add_argument("--blocco-mb", type=int, default=64, help="Dimensione massima di un blocco in MB")
+    parser.add_argument("--json", metavar="FILE", help="Salva il report in JSON")
+    parser.add_argument("--solo-mancanti", action="store_true",
+                        help="Conta solo i campi mancanti, con la scansione sequenziale originale")
+    args = parser.parse_args()
+
+    # Richiesta input all'utente
+    nome_file = args.file or input("Inserisci il percorso del file CSV: ").strip()
+
+    # Controllo se il file esiste
+    if not os.path.isfile(nome_file):
+        print("Errore: il file specificato non esiste.")
+        return 1
+
+    if args.solo_mancanti:
+        mancanti = conta_campi_mancanti(nome_file)
+        print(f"Numero totale di campi mancanti: {mancanti}")
+        return 0
+
+    report = scansiona_file(nome_file, args.workers, args.blocco_mb)
+    stampa_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Report salvato in: {args.json}")
+    return 0
 
-# Controllo se il file esiste
-if not os.path.isfile(nome_file):
-    print("Errore: il file specificato non esiste.")
-else:
-    mancanti = conta_campi_mancanti(nome_file)
-    print(f"Numero totale di campi mancanti: {mancanti}")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Convertitori ONNX personalizzati per i componenti sklearn che skl2onnx non supporta.
+
+Importare questo modulo prima di chiamare convert_sklearn: la registrazione
+avviene all'import e viene saltata se skl2onnx non è installato.
+"""
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.kernel_approximation import RBFSampler
+
+from preprocessamento import PreprocessoreQuestionario
+from schema_questionario import tutte_le_maiuscole_si_no
+
+try:
+    from skl2onnx import update_registered_converter
+    from skl2onnx.algebra.onnx_ops import (
+        OnnxAdd, OnnxCast, OnnxConcat, OnnxCos, OnnxIdentity, OnnxLabelEncoder,
+        OnnxMatMul, OnnxMul, OnnxReshape
+    )
+    from skl2onnx.common.data_types import FloatTensorType, StringTensorType
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    from skl2onnx.operator_converters.random_forest import convert_sklearn_random_forest_classifier
+    from onnx import TensorProto
+    SKL2ONNX_AVAILABLE = True
+except ImportError:
+    SKL2ONNX_AVAILABLE = False
+
+def calcola_forma_rbf_sampler(operator):
+    """Shape calculator: [N, n_features] -> [N, n_components]"""
+    n_righe = operator.inputs[0].get_first_dimension()
+    operator.outputs[0].type = FloatTensorType([n_righe, operator.raw_operator.n_components])
+
+def converti_rbf_sampler(scope, operator, container):
+    """Traduce RBFSampler.transform: cos(X·W + b) · sqrt(2 / n_components)"""
+    modello = operator.raw_operator
+    opv = container.target_opset
+    uscita = operator.outputs[0]
+
+    pesi = modello.random_weights_.astype(np.float32)
+    offset = modello.random_offset_.astype(np.float32)
+    scala = np.array([np.sqrt(2.0 / modello.n_components)], dtype=np.float32)
+
+    proiezione = OnnxAdd(OnnxMatMul(operator.inputs[0], pesi, op_version=opv), offset, op_version=opv)
+    risultato = OnnxMul(OnnxCos(proiezione, op_version=opv), scala,
+                        op_version=opv, output_names=uscita.full_name)
+    risultato.add_to(scope, container)
+
+def calcola_forma_preprocessore(operator):
+    """Shape calculator: uno o più input -> [N, n_features] float"""
+    n_righe = operator.inputs[0].get_first_dimension()
+    operator.outputs[0].type = FloatTensorType([n_righe, operator.raw_operator.n_features_in_])
+
+def converti_preprocessore(scope, operator, container):
+    """Traduce PreprocessoreQuestionario.
+
+    Con un solo input float [N, n_features] le colonne Yes/No sono già codificate
+    e il passo è un'identità (compatibile con i client esistenti). Con un input per
+    colonna, le colonne stringa vengono codificate con un LabelEncoder ONNX che
+    ignora maiuscole e minuscole, come il .lower() del percorso Python.
+    """
+    modello = operator.raw_operator
+    opv = container.target_opset
+    uscita = operator.outputs[0]
+
+    if len(operator.inputs) == 1:
+        risultato = OnnxIdentity(operator.inputs[0], op_version=opv, output_names=uscita.full_name)
+        risultato.add_to(scope, container)
+        return
+
+    mappa = tutte_le_maiuscole_si_no()
+    forma_colonna = np.array([-1, 1], dtype=np.int64)
+    colonne = []
+    for nome, variabile in zip(modello.feature_names_in_, operator.inputs):
+        if isinstance(variabile.type, StringTensorType):
+            codificata = OnnxLabelEncoder(
+                OnnxReshape(variabile, np.array([-1], dtype=np.int64), op_version=opv),
+                keys_strings=list(mappa.keys()),
+                values_floats=[float(v) for v in mappa.values()],
+                default_float=modello.moda_.get(nome, 0.0),
+                op_version=2
+            )
+            colonne.append(OnnxReshape(codificata, forma_colonna, op_version=opv))
+        else:
+            colonne.append(OnnxCast(variabile, to=TensorProto.FLOAT, op_version=opv))
+
+    risultato = OnnxConcat(*colonne, axis=1, op_version=opv, output_names=uscita.full_name)
+    risultato.add_to(scope, container)
+
+class ContenitoreFlagInteri:
+    """Contenitore skl2onnx che converte in interi i flag dei valori mancanti degli alberi"""
+
+    def __init__(self, container):
+        self._container = container
+
+    def __getattr__(self, nome):
+        return getattr(self._container, nome)
+
+    def add_node(self, op_type, inputs, outputs, **attrs):
+        if 'nodes_missing_value_tracks_true' in attrs:
+            attrs['nodes_missing_value_tracks_true'] = [int(v) for v in attrs['nodes_missing_value_tracks_true']]
+        return self._container.add_node(op_type, inputs, outputs, **attrs)
+
+def converti_hist_gradient_boosting(scope, operator, container):
+    """Convertitore di skl2onnx per HistGradientBoostingClassifier.
+
+    skl2onnx 1.20 scrive False (bool) come flag dei valori mancanti nelle foglie e
+    onnx 1.23 rifiuta i bool in un attributo di interi: il grafo prodotto è lo
+    stesso, con i flag convertiti in 0/1.
+    """
+    convert_sklearn_random_forest_classifier(scope, operator, ContenitoreFlagInteri(container))
+
+if SKL2ONNX_AVAILABLE:
+    update_registered_converter(
+        RBFSampler, "PersoRBFSampler",
+        calcola_forma_rbf_sampler, converti_rbf_sampler
+    )
+    update_registered_converter(
+        PreprocessoreQuestionario, "PersoPreprocessoreQuestionario",
+        calcola_forma_preprocessore, converti_preprocessore
+    )
+    update_registered_converter(
+        HistGradientBoostingClassifier, "SklearnHistGradientBoostingClassifier",
+        calculate_linear_classifier_output_shapes, converti_hist_gradient_boosting,
+        options={
+            "zipmap": [True, False, "columns"],
+            "raw_scores": [True, False],
+            "output_class_labels": [False, True],
+            "nocl": [True, False],
+        }
+    )
@@ -0,0 +1,263 @@
+"""
+Ottimizzazione e varianti compatte di un modello ONNX esportato.
+
+A partire dal grafo scritto da esporta_modello_onnx genera:
+  - ottimizzato:    grafo con le ottimizzazioni di ONNX Runtime applicate offline
+                    (livello BASIC, quindi ancora eseguibile da onnxruntime-web e mobile)
+  - float16:        pesi (initializer) salvati in float16 e riconvertiti con un Cast
+  - quantizzato:    quantizzazione dinamica int8 di MatMul/Gemm (onnxruntime.quantization)
+  - alberi_ridotti: ensemble di alberi senza attributi opzionali, soglie e valori
+                    delle foglie arrotondati alla precisione float16
+
+Le varianti non applicabili al modello (es. float16 senza initializer float, alberi
+ridotti senza ensemble) vengono saltate. Ogni variante è confrontata con sklearn
+sull'intero holdout e se ne riportano dimensione, tempo di caricamento e latenza per riga.
+
+Uso: python ottimizzazione_onnx.py dati.csv --modello modello_personalita.pkl --onnx modello_personalita.onnx
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnx import helper, numpy_helper, TensorProto
+
+from personality_predictor import (carica_dati_da_file, carica_modello, confronta_insieme_sklearn_onnx,
+                                   dividi_train_test, input_onnx, preprocessa_dati)
+from sessioni_onnx import SessioneModello, crea_opzioni_sessione
+
+VARIANTI = ['ottimizzato', 'float16', 'quantizzato', 'alberi_ridotti']
+
+# Initializer più piccoli di così non valgono il Cast aggiuntivo
+MIN_ELEMENTI_FLOAT16 = 16
+
+OPERATORI_ALBERI = {'TreeEnsembleClassifier', 'TreeEnsembleRegressor'}
+
+# Varianti con perdita di precisione: deviazione massima ammessa sulle probabilità
+# (le altre devono corrispondere a sklearn con la tolleranza di confronta_insieme_sklearn_onnx)
+TOLLERANZA_PROBABILITA = {'float16': 1e-2, 'quantizzato': 5e-2, 'alberi_ridotti': 1e-2}
+CONCORDANZA_MINIMA = 0.999
+
+def percorso_variante(percorso_onnx, variante):
+    base, estensione = os.path.splitext(percorso_onnx)
+    return f"{base}.{variante}{estensione}"
+
+def ottimizza_grafo(percorso_onnx, destinazione):
+    """Salva il grafo dopo le ottimizzazioni di base di ONNX Runtime (constant folding, nodi ridondanti)"""
+    opzioni = crea_opzioni_sessione(livello_ottimizzazione=ort.GraphOptimizationLevel.ORT_ENABLE_BASIC)
+    opzioni.optimized_model_filepath = destinazione
+    ort.InferenceSession(percorso_onnx, sess_options=opzioni, providers=['CPUExecutionProvider'])
+    return destinazione
+
+def converti_float16(percorso_onnx, destinazione):
+    """Salva gli initializer float32 in float16, con un Cast a float32 all'inizio del grafo"""
+    modello = onnx.load(percorso_onnx)
+    grafo = modello.graph
+    nuovi_initializer, cast = [], []
+
+    for init in grafo.initializer:
+        valori = numpy_helper.to_array(init)
+        if init.data_type != TensorProto.FLOAT or valori.size < MIN_ELEMENTI_FLOAT16:
+            nuovi_initializer.append(init)
+            continue
+        nome_fp16 = f"{init.name}_fp16"
+        nuovi_initializer.append(numpy_helper.from_array(valori.astype(np.float16), nome_fp16))
+        cast.append(helper.make_node('Cast', [nome_fp16], [init.name], to=TensorProto.FLOAT,
+                                     name=f"Cast_{init.name}"))
+
+    if not cast:
+        return None
+
+    del grafo.initializer[:]
+    grafo.initializer.extend(nuovi_initializer)
+    nodi = cast + list(grafo.node)
+    del grafo.node[:]
+    grafo.node.extend(nodi)
+    onnx.save(modello, destinazione)
+    return destinazione
+
+def quantizza_dinamico(percorso_onnx, destinazione):
+    """Quantizzazione dinamica int8 dei pesi di MatMul/Gemm"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    modello = onnx.load(percorso_onnx)
+    if not any(nodo.op_type in ('MatMul', 'Gemm') for nodo in modello.graph.node):
+        return None
+    quantize_dynamic(percorso_onnx, destinazione, weight_type=QuantType.QInt8,
+                     op_types_to_quantize=['MatMul', 'Gemm'],
+                     # I tensori prodotti dagli operatori ai.onnx.ml non hanno tipo dopo la shape inference
+                     extra_options={'DefaultTensorType': TensorProto.FLOAT})
+    return destinazione
+
+def precisione_float16(valori):
+    """Arrotonda i valori alla precisione float16 (restano memorizzati come float32)"""
+    return np.asarray(valori, dtype=np.float32).astype(np.float16).astype(np.float32).tolist()
+
+def riduci_alberi(percorso_onnx, destinazione):
+    """Compatta gli ensemble di alberi mantenendo operatori e opset originali.
+
+    - rimuove nodes_hitrates (opzionale, non usato in inferenza)
+    - rimuove nodes_missing_value_tracks_true se tutto a zero (valore di default)
+    - arrotonda soglie e pesi delle foglie alla precisione float16
+    - elimina i pesi nulli delle foglie (una foglia senza peso contribuisce zero)
+
+    Le soglie e i pesi arrotondati rendono il file molto più comprimibile (gzip/brotli
+    lato server web), anche se il formato protobuf li salva comunque su 32 bit.
+    """
+    modello = onnx.load(percorso_onnx)
+    ridotti = 0
+
+    for nodo in modello.graph.node:
+        if nodo.op_type not in OPERATORI_ALBERI:
+            continue
+        attributi = {a.name: a for a in nodo.attribute}
+        nuovi = []
+
+        for nome, attributo in attributi.items():
+            if nome == 'nodes_hitrates':
+                continue
+            if nome == 'nodes_missing_value_tracks_true' and not any(attributo.ints):
+                continue
+            if nome == 'nodes_values':
+                attributo = helper.make_attribute(nome, precisione_float16(attributo.floats))
+            nuovi.append(attributo)
+
+        # Pesi delle foglie: classificatore (class_*) o regressore (target_*)
+        prefisso = 'class' if 'class_weights' in attributi else 'target'
+        pesi = np.array(attributi[f'{prefisso}_weights'].floats, dtype=np.float32)
+        if len(pesi):
+            pesi = np.array(precisione_float16(pesi), dtype=np.float32)
+            tieni = pesi != 0
+            # Almeno un peso per classe usata, per non cambiare il numero di classi dedotto dal runtime
+            ids = np.array(attributi[f'{prefisso}_ids'].ints)
+            for classe in np.unique(ids):
+                if not tieni[ids == classe].any():
+                    tieni[np.flatnonzero(ids == classe)[0]] = True
+            campi = [f'{prefisso}_ids', f'{prefisso}_nodeids', f'{prefisso}_treeids']
+            nuovi = [a for a in nuovi if a.name not in campi + [f'{prefisso}_weights']]
+            nuovi.append(helper.make_attribute(f'{prefisso}_weights', pesi[tieni].tolist()))
+            for campo in campi:
+                nuovi.append(helper.make_attribute(campo, np.array(attributi[campo].ints)[tieni].tolist()))
+
+        del nodo.attribute[:]
+        nodo.attribute.extend(nuovi)
+        ridotti += 1
+
+    if not ridotti:
+        return None
+    onnx.save(modello, destinazione)
+    return destinazione
+
+GENERATORI = {
+    'ottimizzato': ottimizza_grafo,
+    'float16': converti_float16,
+    'quantizzato': quantizza_dinamico,
+    'alberi_ridotti': riduci_alberi,
+}
+
+def genera_varianti(percorso_onnx, varianti=VARIANTI):
+    """Scrive le varianti richieste accanto al modello; restituisce {nome: percorso}"""
+    percorsi = {'originale': percorso_onnx}
+    for variante in varianti:
+        try:
+            percorso = GENERATORI[variante](percorso_onnx, percorso_variante(percorso_onnx, variante))
+        except Exception as e:
+            print(f"[ATTENZIONE] Variante '{variante}' non generata: {e}")
+            continue
+        if percorso is None:
+            print(f"ℹ️  Variante '{variante}' non applicabile a questo modello")
+            continue
+        percorsi[variante] = percorso
+    return percorsi
+
+def dimensione_gzip(percorso):
+    with open(percorso, 'rb') as f:
+        return len(gzip.compress(f.read(), compresslevel=9))
+
+def misura_variante(modello_sklearn, nome, percorso, X, righe_latenza=1000):
+    """Dimensione, tempo di caricamento, latenza per riga e corrispondenza con sklearn"""
+    sessione = SessioneModello(os.path.abspath(percorso), None, crea_opzioni_sessione())
+    X_onnx = input_onnx(modello_sklearn, X)
+
+    # Latenza per riga: chiamate singole dopo una di riscaldamento
+    sessione.esegui(X_onnx[:1])
+    n = min(righe_latenza, len(X_onnx))
+    inizio = time.perf_counter()
+    for i in range(n):
+        sessione.esegui(X_onnx[i:i + 1])
+    latenza_riga = (time.perf_counter() - inizio) / n if n else 0.0
+
+    confronto = confronta_insieme_sklearn_onnx(modello_sklearn, percorso, X)
+    if nome in TOLLERANZA_PROBABILITA:
+        valida = (confronto['concordanza_etichette'] >= CONCORDANZA_MINIMA
+                  and confronto['max_deviazione_probabilita'] <= TOLLERANZA_PROBABILITA[nome])
+    else:
+        valida = confronto['corrispondenti']
+    return {
+        'file': percorso,
+        'dimensione_kb': round(os.path.getsize(percorso) / 1024, 1),
+        'dimensione_gzip_kb': round(dimensione_gzip(percorso) / 1024, 1),
+        'caricamento_ms': round(sessione.latenza_caricamento * 1000, 2),
+        'latenza_riga_ms': round(latenza_riga * 1000, 4),
+        'righe_holdout': confronto['righe'],
+        'concordanza_etichette': confronto['concordanza_etichette'],
+        'max_deviazione_probabilita': confronto['max_deviazione_probabilita'],
+        'corrispondente': confronto['corrispondenti'],
+        'valida': bool(valida),
+    }
+
+def stampa_varianti(risultati):
+    print(f"\n{'Variante':<16} {'KB':<9} {'KB gzip':<9} {'Caric. (ms)':<12} {'Riga (ms)':<10} "
+          f"{'Concordanza':<12} {'Max dev. prob.':<15}")
+    print("-" * 88)
+    for nome, r in risultati.items():
+        segno = "" if r['valida'] else " ⚠️"
+        print(f"{nome:<16} {r['dimensione_kb']:<9.1f} {r['dimensione_gzip_kb']:<9.1f} {r['caricamento_ms']:<12.2f} "
+              f"{r['latenza_riga_ms']:<10.4f} {r['concordanza_etichette']:<12.4%} "
+              f"{r['max_deviazione_probabilita']:<15.2e}{segno}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ottimizzazione e varianti compatte del modello ONNX")
+    parser.add_argument("dati", help="File CSV con colonna 'Personality' (se ne usa l'holdout)")
+    parser.add_argument("--modello", "-m", default="modello_personalita.pkl", help="Modello joblib di riferimento")
+    parser.add_argument("--onnx", default="modello_personalita.onnx", help="Modello ONNX esportato (input float)")
+    parser.add_argument("--varianti", nargs='+', choices=VARIANTI, default=VARIANTI, help="Varianti da generare")
+    parser.add_argument("--righe-latenza", type=int, default=1000, help="Chiamate singole per la latenza per riga")
+    parser.add_argument("--json", metavar="FILE", help="Salva il report in JSON")
+    args = parser.parse_args()
+
+    modello = carica_modello(args.modello)
+    if modello is None:
+        return 4
+    df = carica_dati_da_file(args.dati)
+    if df is None:
+        return 3
+
+    # Stesso holdout di addestra_modelli
+    X, y = preprocessa_dati(df)
+    _, X_test, _, _ = dividi_train_test(X, y)
+
+    print(f"\n⚙️  Generazione varianti di {args.onnx}")
+    percorsi = genera_varianti(args.onnx, args.varianti)
+    risultati = {nome: misura_variante(modello, nome, percorso, X_test, args.righe_latenza)
+                 for nome, percorso in percorsi.items()}
+    stampa_varianti(risultati)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(risultati, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Report salvato in: {args.json}")
+    non_valide = [nome for nome, r in risultati.items() if not r['valida']]
+    if non_valide:
+        print(f"\n⚠️  Varianti fuori tolleranza rispetto a sklearn: {', '.join(non_valide)}")
+        return 5
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,48 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.preprocessing import LabelEncoder
 import joblib
 import os
+import sys
+import time
+import json
+import argparse
+import hashlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib.util import find_spec
 
-# Aggiunta per ONNX
-try:
-    import skl2onnx
-    from skl2onnx import convert_sklearn
-    from skl2onnx.common.data_types import FloatTensorType
-    import onnxruntime as ort
-    ONNX_AVAILABLE = True
-except ImportError:
-    ONNX_AVAILABLE = False
-    print("[ATTENZIONE] skl2onnx o onnxruntime non installati. L'esportazione ONNX non sarà disponibile.")
-
-def carica_dati_da_file():
-    """Carica i dati da un file CSV"""
+from caricamento_dati import carica_dataset, leggi_csv_tipizzato
+from registro_modelli import REGISTRO_PREDEFINITO, ErroreRegistro, RegistroModelli, moda_si_no
+from schema_questionario import COLONNE_SI_NO
+
+# sklearn, skl2onnx e onnxruntime vengono importati solo nelle funzioni che li usano:
+# chi importa il modulo per predire o leggere il registro non ne paga il caricamento.
+# Per l'ONNX basta sapere se i pacchetti sono installati.
+ONNX_AVAILABLE = find_spec('skl2onnx') is not None and find_spec('onnxruntime') is not None
+if not ONNX_AVAILABLE:
+    # Su stderr: l'import non deve sporcare lo stdout riservato a --json -
+    print("[ATTENZIONE] skl2onnx o onnxruntime non installati. L'esportazione ONNX non sarà disponibile.",
+          file=sys.stderr)
+
+def carica_dati_da_file(percorso_file=None):
+    """Carica i dati da un file CSV (in modo non interattivo se viene passato il percorso)"""
+    interattivo = percorso_file is None
     while True:
         try:
-            percorso_file = input("Inserisci il percorso del file CSV: ")
+            if interattivo:
+                percorso_file = input("Inserisci il percorso del file CSV: ")
             
             # Verifica se il file esiste
             if not os.path.exists(percorso_file):
                 print(f"   Errore: Il file '{percorso_file}' non esiste.")
+                if not interattivo:
+                    return None
                 continue
             
-            # Carica il CSV
-            df = pd.read_csv(percorso_file)
+            # Carica il CSV (con tipi dichiarati e cache colonnare)
+            df = carica_dataset(percorso_file)
             print(f"Dataset caricato con successo: {df.shape[0]} righe, {df.shape[1]} colonne")
             
             # Mostra le prime righe per verifica
@@ -43,6 +53,8 @@ def carica_dati_da_file():
             if 'Personality' not in df.columns:
                 print("   Attenzione: Il file deve contenere una colonna 'Personality'")
                 print("   Colonne trovate:", list(df.columns))
+                if not interattivo:
+                    return None
                 continue
             
             return df
@@ -54,35 +66,19 @@ def carica_dati_da_file():
         except Exception as e:
             print(f"   Errore nel caricamento del file: {e}")
         
+        if not interattivo:
+            return None
+        
         # Chiedi se vuole riprovare
         riprova = input("Vuoi riprovare con un altro file? (Sì/No): ")
         if riprova.lower() not in ['si', 'sì', 's', 'yes', 'y']:
             return None
 
 def preprocessa_dati(df):
-    """Preprocessa i dati per il machine learning"""
-    # Copia del dataframe
-    df_processed = df.copy()
-    
-    # Converti le colonne Yes/No in 1/0
-    yes_no_columns = ['Stage_fear', 'Drained_after_socializing']
-    le = LabelEncoder()
-    
-    for col in yes_no_columns:
-        if col in df_processed.columns:
-            # Gestisci diversi formati di Yes/No
-            df_processed[col] = df_processed[col].astype(str).str.lower()
-            df_processed[col] = df_processed[col].map({
-                'yes': 1, 'no': 0, 'sì': 1, 'si': 1,
-                'true': 1, 'false': 0, '1': 1, '0': 0
-            })
-            # Se ci sono valori non mappati, usa LabelEncoder
-            if df_processed[col].isnull().any():
-                df_processed[col] = le.fit_transform(df_processed[col].fillna('no'))
-    
+    """Separa feature e target; la codifica è affidata a PreprocessoreQuestionario nella Pipeline"""
     # Separa features e target
-    X = df_processed.drop('Personality', axis=1)
-    y = df_processed['Personality']
+    X = df.drop(columns='Personality')
+    y = df['Personality']
     
     print("Caratteristiche utilizzate:", list(X.columns))
     print("Classi target:", y.unique())
@@ -91,66 +87,284 @@ def preprocessa_dati(df):
     
     return X, y
 
-def addestra_modelli(X, y):
-    """Addestra diversi modelli di machine learning"""
-    # Dividi i dati in training e test
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+# Oltre questo numero di righe la SVC con kernel esatto diventa troppo lenta
+SOGLIA_SVM_APPROSSIMATA = 100_000
+
+def crea_svm_approssimata(n_componenti=500, n_jobs=1):
+    """SVM con kernel RBF approssimato (random Fourier features) e probabilità calibrate.
+    
+    Il costo di addestramento cresce linearmente con il numero di righe, invece che
+    in modo quadratico/cubico come per SVC.
+    """
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.kernel_approximation import RBFSampler
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import LinearSVC
+    
+    return make_pipeline(
+        StandardScaler(),
+        RBFSampler(gamma='scale', n_components=n_componenti, random_state=42),
+        CalibratedClassifierCV(LinearSVC(random_state=42), method='sigmoid', cv=3,
+                               ensemble=False, n_jobs=n_jobs)
+    )
+
+def con_preprocessore(modello):
+    """Antepone al modello la codifica delle risposte, così da salvarle ed esportarle insieme"""
+    from sklearn.pipeline import Pipeline
+    from preprocessamento import PreprocessoreQuestionario
+    
+    return Pipeline([('preprocessore', PreprocessoreQuestionario()), ('modello', modello)])
+
+def crea_modelli(n_jobs=1, n_righe=0, soglia_svm=SOGLIA_SVM_APPROSSIMATA):
+    """Crea i modelli candidati non ancora addestrati (ognuno preceduto dal preprocessore)"""
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC
     
-    # Definisci i modelli
     modelli = {
-        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
+        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs),
+        # Alberi su feature discretizzate in istogrammi: fit rapido e grafo ONNX compatto
+        'Gradient Boosting': HistGradientBoostingClassifier(random_state=42),
         'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000),
-        'SVM': SVC(random_state=42, probability=True)
     }
     
-    risultati = {}
+    # Sopra la soglia la SVC esatta (con calibrazione Platt interna) non è praticabile
+    if n_righe > soglia_svm:
+        modelli['SVM (RBF approssimato)'] = crea_svm_approssimata(n_jobs=n_jobs)
+    else:
+        modelli['SVM'] = SVC(random_state=42, probability=True)
+    
+    return {nome: con_preprocessore(modello) for nome, modello in modelli.items()}
+
+def _figli(pid):
+    """Pid dei figli diretti, letti da /proc/<pid>/task/<tid>/children (un file per thread)"""
+    figli = []
+    try:
+        thread = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return figli
+    for tid in thread:
+        try:
+            with open(f'/proc/{pid}/task/{tid}/children') as f:
+                figli.extend(int(voce) for voce in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return figli
+
+def rss_albero_processi(pid=None):
+    """Memoria residente (byte) del processo e di tutti i suoi discendenti vivi.
+    
+    Su Linux legge /proc partendo dal processo e scendendo solo nei suoi figli; altrove
+    usa psutil se installato, altrimenti il picco ru_maxrss di processo e figli terminati
+    (un massimo dall'avvio: l'incremento misurato è allora quello del picco).
+    """
+    pid = pid or os.getpid()
+    if os.path.isdir('/proc'):
+        totale, da_visitare = 0, [pid]
+        while da_visitare:
+            corrente = da_visitare.pop()
+            try:
+                with open(f'/proc/{corrente}/statm') as f:
+                    totale += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, IndexError, ValueError):
+                continue
+            da_visitare.extend(_figli(corrente))
+        return totale
     
-    print("\n=== ADDESTRAMENTO MODELLI ===")
-    for nome, modello in modelli.items():
-        print(f"\nAddestrando {nome}...")
+    if find_spec('psutil') is not None:
+        import psutil
         
-        # Addestra il modello
+        try:
+            processo = psutil.Process(pid)
+            processi = [processo] + processo.children(recursive=True)
+        except psutil.Error:
+            return 0
+        totale = 0
+        for processo in processi:
+            try:
+                totale += processo.memory_info().rss
+            except psutil.Error:
+                continue
+        return totale
+    
+    try:
+        import resource
+    except ImportError:
+        # Windows senza psutil: memoria non misurabile
+        return 0
+    picco = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+             + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss è in byte su macOS e in kilobyte sugli altri sistemi
+    return picco if sys.platform == 'darwin' else picco * 1024
+
+class CampionatoreRSS:
+    """Picco di RSS del processo e dei worker joblib durante un blocco, rispetto a prima del blocco.
+    
+    ru_maxrss è il massimo dall'avvio del processo e non vede i worker loky ancora vivi:
+    un thread campiona invece l'albero dei processi a intervalli regolari.
+    """
+    
+    def __init__(self, intervallo=0.05):
+        self.intervallo = intervallo
+        self.base = 0
+        self.picco = 0
+        self._ferma = threading.Event()
+        self._thread = threading.Thread(target=self._campiona, daemon=True)
+    
+    def _campiona(self):
+        while not self._ferma.wait(self.intervallo):
+            self.picco = max(self.picco, rss_albero_processi())
+    
+    def __enter__(self):
+        self.base = self.picco = rss_albero_processi()
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._ferma.set()
+        self._thread.join()
+        self.picco = max(self.picco, rss_albero_processi())
+    
+    @property
+    def incremento_mb(self):
+        return (self.picco - self.base) / (1024 * 1024)
+
+def valuta_modello(nome, modello, X_train, y_train, X_test, y_test, n_fold=5, n_jobs=1):
+    """Cross-validation e addestramento di un singolo modello (eseguibile in un processo separato)"""
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import StratifiedKFold, cross_val_score
+    from threadpoolctl import threadpool_limits
+    
+    inizio = time.perf_counter()
+    
+    # Il Gradient Boosting usa thread OpenMP su tutti i core: con più modelli in
+    # parallelo va limitato ai worker assegnati, come n_jobs per gli altri modelli
+    with CampionatoreRSS() as memoria, threadpool_limits(limits=n_jobs, user_api='openmp'):
+        # Cross-validation k-fold sul training set, con i fold in parallelo
+        cv = StratifiedKFold(n_splits=n_fold, shuffle=True, random_state=42)
+        punteggi_cv = cross_val_score(modello, X_train, y_train, cv=cv, scoring='accuracy', n_jobs=n_jobs)
+        
+        # Addestra il modello sull'intero training set
         modello.fit(X_train, y_train)
         
         # Fai previsioni
         y_pred = modello.predict(X_test)
-        
-        # Calcola l'accuratezza
-        accuratezza = accuracy_score(y_test, y_pred)
-        
-        risultati[nome] = {
-            'modello': modello,
-            'accuratezza': accuratezza,
-            'y_test': y_test,
-            'y_pred': y_pred
-        }
-        
-        print(f"Accuratezza: {accuratezza:.4f}")
+    
+    tempo = time.perf_counter() - inizio
+    
+    return nome, {
+        'modello': modello,
+        'accuratezza': accuracy_score(y_test, y_pred),
+        'cv_media': punteggi_cv.mean(),
+        'cv_std': punteggi_cv.std(),
+        'tempo': tempo,
+        # Crescita della RSS (buffer NumPy/C compresi) rispetto a prima della valutazione
+        'memoria_picco_mb': memoria.incremento_mb,
+        'y_test': y_test,
+        'y_pred': y_pred
+    }
+
+def dividi_train_test(X, y):
+    """Divisione training/test usata ovunque serva lo stesso holdout di addestra_modelli"""
+    from sklearn.model_selection import train_test_split
+    
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+def addestra_modelli(X, y, n_jobs=None, n_fold=5, soglia_svm=SOGLIA_SVM_APPROSSIMATA):
+    """Addestra diversi modelli di machine learning in parallelo e sceglie il migliore in cross-validation"""
+    from sklearn.metrics import classification_report
+    
+    # Dividi i dati in training e test
+    X_train, X_test, y_train, y_test = dividi_train_test(X, y)
+    
+    # Ripartisci i worker tra i modelli e, per ciascun modello, tra i fold
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_modelli = len(crea_modelli(n_righe=len(X_train), soglia_svm=soglia_svm))
+    worker_modelli = min(n_modelli, n_jobs)
+    worker_per_modello = max(1, n_jobs // worker_modelli)
+    
+    # Definisci i modelli
+    modelli = crea_modelli(n_jobs=worker_per_modello, n_righe=len(X_train), soglia_svm=soglia_svm)
+    
+    risultati = {}
+    
+    print(f"\n=== ADDESTRAMENTO MODELLI ({worker_modelli} processi, {worker_per_modello} worker per modello, CV {n_fold}-fold) ===")
+    if worker_modelli == 1:
+        for nome, modello in modelli.items():
+            print(f"\nAddestrando {nome}...")
+            _, risultati[nome] = valuta_modello(nome, modello, X_train, y_train, X_test, y_test,
+                                                n_fold, worker_per_modello)
+    else:
+        with ProcessPoolExecutor(max_workers=worker_modelli) as executor:
+            futures = [
+                executor.submit(valuta_modello, nome, modello, X_train, y_train, X_test, y_test,
+                                n_fold, worker_per_modello)
+                for nome, modello in modelli.items()
+            ]
+            for future in as_completed(futures):
+                nome, risultato = future.result()
+                risultati[nome] = risultato
+        # Mantieni l'ordine di definizione dei modelli
+        risultati = {nome: risultati[nome] for nome in modelli}
+    
+    for nome, risultato in risultati.items():
+        print(f"\n--- {nome} ---")
+        print(f"Accuratezza CV: {risultato['cv_media']:.4f} (± {risultato['cv_std']:.4f})")
+        print(f"Accuratezza test: {risultato['accuratezza']:.4f}")
         
         # Mostra il classification report
         print("Classification Report:")
-        print(classification_report(y_test, y_pred))
+        print(classification_report(y_test, risultato['y_pred']))
+    
+    print("\n=== RISORSE PER MODELLO ===")
+    print(f"{'Modello':<22} {'CV':<8} {'Tempo (s)':<11} {'Δ picco RSS (MB)':<18}")
+    for nome, risultato in risultati.items():
+        print(f"{nome:<22} {risultato['cv_media']:<8.4f} {risultato['tempo']:<11.2f} {risultato['memoria_picco_mb']:<18.1f}")
     
-    # Trova il modello migliore
-    miglior_modello_nome = max(risultati.keys(), key=lambda x: risultati[x]['accuratezza'])
+    # Trova il modello migliore in base al punteggio di cross-validation
+    miglior_modello_nome = max(risultati.keys(), key=lambda x: risultati[x]['cv_media'])
     miglior_modello = risultati[miglior_modello_nome]['modello']
     
-    print(f"\n🏆 Miglior modello: {miglior_modello_nome} (Accuratezza: {risultati[miglior_modello_nome]['accuratezza']:.4f})")
+    print(f"\n🏆 Miglior modello: {miglior_modello_nome} (Accuratezza CV: {risultati[miglior_modello_nome]['cv_media']:.4f}, "
+          f"test: {risultati[miglior_modello_nome]['accuratezza']:.4f})")
     
     return miglior_modello, risultati, X_train, X_test, y_train, y_test
 
-def esporta_modello_onnx(modello, X, nome_file="modello_personalita.onnx"):
-    """Esporta il modello in formato ONNX con opzioni ottimizzate per Kotlin"""
+def tipi_input_onnx(modello, n_features, input_grezzi=False):
+    """Input del grafo ONNX: un tensore float unico oppure un input per colonna con Sì/No testuali"""
+    from skl2onnx.common.data_types import FloatTensorType, StringTensorType
+    
+    if not input_grezzi:
+        return [("float_input", FloatTensorType([None, n_features]))]
+    
+    return [
+        (col, StringTensorType([None, 1]) if col in COLONNE_SI_NO else FloatTensorType([None, 1]))
+        for col in modello.feature_names_in_
+    ]
+
+def esporta_modello_onnx(modello, X, nome_file="modello_personalita.onnx", input_grezzi=False):
+    """Esporta il modello in formato ONNX con opzioni ottimizzate per Kotlin.
+    
+    Per default il grafo ha il singolo input float_input dei client esistenti, che
+    codificano da sé le risposte Sì/No con MAPPA_SI_NO (preprocessore = identità).
+    Con input_grezzi=True (--onnx-input-grezzi) riceve una colonna per input e le
+    risposte Sì/No come stringhe, codificate nel grafo senza distinguere maiuscole e
+    minuscole, come nel percorso Python.
+    """
     if not ONNX_AVAILABLE:
         print("[ERRORE] Librerie ONNX non disponibili")
         return False, None  # CORREZIONE: Restituisce sempre una tupla
     
+    from skl2onnx import convert_sklearn
+    import convertitori_onnx  # Registra i convertitori per i componenti non supportati
+    
     try:
         print(f"\n📦 Esportazione modello ONNX...")
         
         # Determina il numero di feature
         n_features = X.shape[1]
-        initial_type = [("float_input", FloatTensorType([None, n_features]))]
+        initial_type = tipi_input_onnx(modello, n_features, input_grezzi)
         
         # Opzioni per l'esportazione ONNX - CRUCIALI per compatibilità con Kotlin
         options = {
@@ -169,6 +383,12 @@ def esporta_modello_onnx(modello, X, nome_file="modello_personalita.onnx"):
             target_opset={'': 15, 'ai.onnx.ml': 2}  # Versioni compatibili
         )
         
+        # Le mode del preprocessore viaggiano con il grafo: il percorso leggero (punteggio.py)
+        # le usa per imputare le risposte Sì/No mancanti come fa la Pipeline
+        moda = moda_si_no(modello)
+        if moda is not None:
+            onnx_model.metadata_props.add(key='moda_si_no', value=json.dumps(moda))
+        
         # Salva il file
         with open(nome_file, "wb") as f:
             f.write(onnx_model.SerializeToString())
@@ -181,8 +401,9 @@ def esporta_modello_onnx(modello, X, nome_file="modello_personalita.onnx"):
         print(f"  - Output: {[out.name for out in onnx_model.graph.output]}")
         
         # Ottieni le classi del modello
-        classi_modello = modello.classes_
-        print(f"  - Classi: {list(classi_modello)}")
+        # str(): con numpy 2 le classi sono np.str_ e list() ne stamperebbe la repr
+        classi_modello = [str(c) for c in modello.classes_]
+        print(f"  - Classi: {classi_modello}")
         print(f"  - Numero classi: {len(classi_modello)}")
         
         return True, classi_modello
@@ -201,20 +422,21 @@ def testa_modello_onnx(nome_file="modello_personalita.onnx", classi_modello=None
     
     try:
         print(f"\n🧪 Test modello ONNX: {nome_file}")
+        from sessioni_onnx import GESTORE_SESSIONI, stampa_statistiche
         
-        # Carica il modello ONNX
-        session = ort.InferenceSession(nome_file)
+        # Sessione condivisa: il grafo viene caricato e ottimizzato una sola volta
+        modello_onnx = GESTORE_SESSIONI.sessione(nome_file)
+        session = modello_onnx.sessione
         
         # Mostra input e output
         print(f"Input modello: {[inp.name for inp in session.get_inputs()]}")
-        print(f"Output modello: {[out.name for out in session.get_outputs()]}")
+        print(f"Output modello: {modello_onnx.nomi_output}")
         
         # Test con dati fittizi
         test_input = np.array([[5.0, 1.0, 3.0, 2.0, 1.0, 4.0, 2.0]], dtype=np.float32)
         
         # Esegui predizione
-        input_name = session.get_inputs()[0].name
-        result = session.run(None, {input_name: test_input})
+        result = modello_onnx.esegui(test_input)
         
         print(f"\n📊 Test con input: {test_input[0]}")
         print(f"Numero di output: {len(result)}")
@@ -239,6 +461,7 @@ def testa_modello_onnx(nome_file="modello_personalita.onnx", classi_modello=None
                     for j, (classe, prob) in enumerate(zip(classi_modello, probs)):
                         print(f"    {classe}: {prob:.4f} ({prob*100:.2f}%)")
         
+        stampa_statistiche()
         return True
         
     except Exception as e:
@@ -247,6 +470,38 @@ def testa_modello_onnx(nome_file="modello_personalita.onnx", classi_modello=None
         traceback.print_exc()
         return False
 
+def input_onnx(modello_sklearn, X):
+    """Matrice float32 per il grafo con input unico: la codifica è quella del preprocessore della Pipeline"""
+    if hasattr(modello_sklearn, 'named_steps') and 'preprocessore' in modello_sklearn.named_steps:
+        return modello_sklearn.named_steps['preprocessore'].transform(X)
+    return np.asarray(X, dtype=np.float32)
+
+def confronta_insieme_sklearn_onnx(modello_sklearn, nome_file_onnx, X, rtol=1e-4, atol=1e-6):
+    """Confronta sklearn e ONNX su un intero insieme di righe.
+    
+    Restituisce concordanza delle etichette, massima deviazione assoluta delle
+    probabilità e se le due implementazioni corrispondono entro la tolleranza.
+    """
+    from sessioni_onnx import GESTORE_SESSIONI
+    
+    pred_sklearn = modello_sklearn.predict(X)
+    prob_sklearn = modello_sklearn.predict_proba(X)
+    
+    etichette_onnx, prob_onnx = GESTORE_SESSIONI.predict_batch(nome_file_onnx, input_onnx(modello_sklearn, X))
+    
+    concordanza = float(np.mean(pred_sklearn.astype(str) == etichette_onnx.astype(str)))
+    deviazione = np.abs(prob_sklearn - prob_onnx)
+    return {
+        'righe': len(prob_sklearn),
+        'concordanza_etichette': concordanza,
+        'max_deviazione_probabilita': float(deviazione.max()) if deviazione.size else 0.0,
+        'corrispondenti': concordanza == 1.0 and bool(np.allclose(prob_sklearn, prob_onnx, rtol=rtol, atol=atol)),
+        'pred_sklearn': pred_sklearn,
+        'prob_sklearn': prob_sklearn,
+        'etichette_onnx': etichette_onnx,
+        'prob_onnx': prob_onnx,
+    }
+
 def confronta_predizioni_sklearn_onnx(modello_sklearn, nome_file_onnx="modello_personalita.onnx"):
     """Confronta le predizioni tra il modello sklearn e ONNX"""
     if not ONNX_AVAILABLE:
@@ -255,35 +510,23 @@ def confronta_predizioni_sklearn_onnx(modello_sklearn, nome_file_onnx="modello_p
     
     try:
         print(f"\n🔍 Confronto predizioni sklearn vs ONNX")
+        from sessioni_onnx import stampa_statistiche
         
         # Dati di test
         test_data = np.array([[5.0, 1.0, 3.0, 2.0, 1.0, 4.0, 2.0]], dtype=np.float32)
-        
-        # Predizione sklearn
-        pred_sklearn = modello_sklearn.predict(test_data)[0]
-        prob_sklearn = modello_sklearn.predict_proba(test_data)[0]
-        classi_sklearn = modello_sklearn.classes_
+        confronto = confronta_insieme_sklearn_onnx(modello_sklearn, nome_file_onnx, test_data)
         
         print(f"📈 Sklearn:")
-        print(f"  - Classe predetta: {pred_sklearn}")
-        print(f"  - Probabilità: {prob_sklearn}")
-        
-        # Predizione ONNX
-        session = ort.InferenceSession(nome_file_onnx)
-        input_name = session.get_inputs()[0].name
-        result_onnx = session.run(None, {input_name: test_data})
-        
-        # Estrai risultati ONNX
-        label_onnx = result_onnx[0][0] if len(result_onnx) > 0 else "N/A"
-        prob_onnx = result_onnx[1][0] if len(result_onnx) > 1 else []
+        print(f"  - Classe predetta: {confronto['pred_sklearn'][0]}")
+        print(f"  - Probabilità: {confronto['prob_sklearn'][0]}")
         
         print(f"📊 ONNX:")
-        print(f"  - Classe predetta: {label_onnx}")
-        print(f"  - Probabilità: {prob_onnx}")
+        print(f"  - Classe predetta: {confronto['etichette_onnx'][0]}")
+        print(f"  - Probabilità: {confronto['prob_onnx'][0]}")
         
         # Confronto
-        classi_match = str(pred_sklearn) == str(label_onnx)
-        prob_match = np.allclose(prob_sklearn, prob_onnx, rtol=1e-4) if len(prob_onnx) > 0 else False
+        classi_match = confronto['concordanza_etichette'] == 1.0
+        prob_match = confronto['corrispondenti']
         
         print(f"\n✅ Risultati confronto:")
         print(f"  - Classi corrispondenti: {classi_match}")
@@ -291,13 +534,114 @@ def confronta_predizioni_sklearn_onnx(modello_sklearn, nome_file_onnx="modello_p
         
         if not classi_match or not prob_match:
             print("⚠️  Le predizioni non corrispondono perfettamente!")
-            
+        
+        stampa_statistiche()
         return classi_match and prob_match
         
     except Exception as e:
         print(f"[ERRORE CONFRONTO] {e}")
         return False
 
+# Dimensioni di batch del confronto di parità e velocità sklearn/ONNX
+DIMENSIONI_BATCH_PARITA = (1, 32, 1_000, 100_000)
+
+def versione_modello_onnx(nome_file_onnx):
+    """Identificativo della versione del modello: hash SHA-256 del file ONNX"""
+    h = hashlib.sha256()
+    with open(nome_file_onnx, 'rb') as f:
+        for blocco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(blocco)
+    return h.hexdigest()
+
+def nome_candidato(modello, risultati):
+    """Nome con cui addestra_modelli ha registrato il candidato scelto"""
+    for nome, r in risultati.items():
+        if r['modello'] is modello:
+            return nome
+    return nome_stimatore(modello)
+
+def nome_stimatore(modello):
+    """Nome dello stimatore finale, anche dentro Pipeline annidate"""
+    while hasattr(modello, 'steps'):
+        modello = modello.steps[-1][1]
+    return type(modello).__name__
+
+def benchmark_parita(modello_sklearn, nome_file_onnx, X_test, dimensioni_batch=DIMENSIONI_BATCH_PARITA,
+                     limite_chiamate=5_000):
+    """Parità e velocità di sklearn e ONNX Runtime sull'intero test set, a diverse dimensioni di batch.
+    
+    Per ogni dimensione il test set viene percorso a batch consecutivi (al massimo
+    limite_chiamate batch, per contenere i tempi con batch da una riga). ONNX riceve
+    l'input già codificato, come i client; il tempo di sklearn include il preprocessore.
+    """
+    from sessioni_onnx import GESTORE_SESSIONI
+    
+    X_onnx = input_onnx(modello_sklearn, X_test)
+    righe_sklearn = X_test.iloc if isinstance(X_test, pd.DataFrame) else X_test
+    GESTORE_SESSIONI.predict_batch(nome_file_onnx, X_onnx[:1])  # caricamento e prima chiamata
+    
+    risultati = {}
+    for dimensione in dimensioni_batch:
+        righe = min(len(X_test), dimensione * limite_chiamate)
+        prob_sklearn, etichette_sklearn, prob_onnx, etichette_onnx = [], [], [], []
+        
+        # Etichette da predict, come servizio_predizioni e tabella_predizioni: con
+        # SVC(probability=True) l'argmax di predict_proba può non coincidere
+        inizio = time.perf_counter()
+        for i in range(0, righe, dimensione):
+            batch = righe_sklearn[i:min(i + dimensione, righe)]
+            etichette_sklearn.append(modello_sklearn.predict(batch))
+            prob_sklearn.append(modello_sklearn.predict_proba(batch))
+        tempo_sklearn = time.perf_counter() - inizio
+        
+        inizio = time.perf_counter()
+        for i in range(0, righe, dimensione):
+            etichette, probabilita = GESTORE_SESSIONI.predict_batch(nome_file_onnx, X_onnx[i:min(i + dimensione, righe)])
+            etichette_onnx.append(etichette)
+            prob_onnx.append(probabilita)
+        tempo_onnx = time.perf_counter() - inizio
+        
+        prob_sklearn = np.concatenate(prob_sklearn)
+        prob_onnx = np.concatenate(prob_onnx)
+        etichette_sklearn = np.concatenate(etichette_sklearn).astype(str)
+        etichette_onnx = np.concatenate(etichette_onnx).astype(str)
+        
+        risultati[str(dimensione)] = {
+            'righe': righe,
+            'concordanza_etichette': float(np.mean(etichette_sklearn == etichette_onnx)),
+            'max_deviazione_probabilita': float(np.abs(prob_sklearn - prob_onnx).max()),
+            'sklearn_righe_al_secondo': round(righe / tempo_sklearn, 1) if tempo_sklearn > 0 else None,
+            'onnx_righe_al_secondo': round(righe / tempo_onnx, 1) if tempo_onnx > 0 else None,
+        }
+    
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'modello': nome_stimatore(modello_sklearn),
+        'onnx': os.path.basename(nome_file_onnx),
+        'onnx_sha256': versione_modello_onnx(nome_file_onnx),
+        'righe_test': len(X_test),
+        'batch': risultati,
+    }
+
+def stampa_parita(report):
+    print(f"\n⚖️  Parità sklearn vs ONNX su {report['righe_test']} righe di test ({report['modello']})")
+    print(f"{'Batch':<8} {'Righe':<8} {'Concordanza':<12} {'Max dev. prob.':<15} {'sklearn righe/s':<16} {'ONNX righe/s':<14}")
+    print("-" * 77)
+    for dimensione, r in report['batch'].items():
+        print(f"{dimensione:<8} {r['righe']:<8} {r['concordanza_etichette']:<12.4%} {r['max_deviazione_probabilita']:<15.2e} "
+              f"{r['sklearn_righe_al_secondo']:<16,.0f} {r['onnx_righe_al_secondo']:<14,.0f}")
+
+def salva_parita(report, percorso):
+    """Aggiunge il report allo storico JSON, per confrontare le versioni del modello nel tempo"""
+    storico = []
+    if os.path.exists(percorso):
+        with open(percorso, encoding='utf-8') as f:
+            storico = json.load(f)
+    storico.append(report)
+    with open(percorso, 'w', encoding='utf-8') as f:
+        json.dump(storico, f, ensure_ascii=False, indent=2)
+    print(f"💾 Risultati di parità aggiunti a: {percorso}")
+
 def converti_risposta_questionario(risposte):
     """Converte le risposte del questionario in formato per il modello"""
     # Mappa le chiavi del questionario alle colonne del dataset
@@ -315,29 +659,31 @@ def converti_risposta_questionario(risposte):
     
     for chiave_questionario, chiave_dataset in mapping.items():
         if chiave_questionario in risposte:
-            valore = risposte[chiave_questionario]
-            
-            # Converti Sì/No in 1/0
-            if valore == 'Sì':
-                dati_convertiti[chiave_dataset] = 1
-            elif valore == 'No':
-                dati_convertiti[chiave_dataset] = 0
-            else:
-                dati_convertiti[chiave_dataset] = valore
+            # Sì/No restano testuali: li codifica il preprocessore del modello
+            dati_convertiti[chiave_dataset] = risposte[chiave_questionario]
     
     return dati_convertiti
 
-def prevedi_personalita(modello, dati_utente):
-    """Fai una previsione sulla personalità dell'utente"""
-    # Converti in DataFrame
-    df_utente = pd.DataFrame([dati_utente])
+def prevedi_personalita(modello, dati_utente, tabella=None):
+    """Fai una previsione sulla personalità dell'utente.
     
-    # Fai la previsione
-    previsione = modello.predict(df_utente)[0]
-    probabilita = modello.predict_proba(df_utente)[0]
-    
-    # Ottieni le classi
-    classi = modello.classes_
+    Con una TabellaPredizioni le risposte del questionario sono una lookup; quelle
+    fuori dal dominio della tabella passano comunque dal modello.
+    """
+    risultato = tabella.prevedi(dati_utente) if tabella is not None else None
+    if risultato is not None:
+        previsione, probabilita = risultato
+        classi = tabella.classi
+    else:
+        # Converti in DataFrame
+        df_utente = pd.DataFrame([dati_utente])
+        
+        # Fai la previsione
+        previsione = modello.predict(df_utente)[0]
+        probabilita = modello.predict_proba(df_utente)[0]
+        
+        # Ottieni le classi
+        classi = modello.classes_
     
     print(f"\n🔮 PREVISIONE PERSONALITÀ:")
     print(f"Tipo di personalità previsto: {previsione}")
@@ -347,6 +693,40 @@ def prevedi_personalita(modello, dati_utente):
     
     return previsione, probabilita
 
+def prevedi_da_csv(modello, percorso_input, percorso_output, dimensione_blocco=100_000):
+    """Applica il modello a un file CSV a blocchi, scrivendo classe e probabilità su file"""
+    classi = modello.classes_
+    colonne_modello = getattr(modello, 'feature_names_in_', None)
+    colonne_output = ['Personality_prevista'] + [f"Probabilita_{classe}" for classe in classi]
+    
+    righe_totali = 0
+    inizio = time.perf_counter()
+    
+    print(f"\n📂 Predizione a blocchi: {percorso_input} -> {percorso_output}")
+    
+    for i, blocco in enumerate(leggi_csv_tipizzato(percorso_input, chunksize=dimensione_blocco)):
+        # La codifica Yes/No è quella appresa in addestramento (primo passo della Pipeline)
+        X = blocco.drop(columns='Personality', errors='ignore')
+        if colonne_modello is not None:
+            X = X[colonne_modello]
+        
+        # Classe da predict (con SVC può differire dall'argmax delle probabilità)
+        previsioni = modello.predict(X)
+        probabilita = modello.predict_proba(X)
+        
+        risultato = pd.DataFrame(probabilita, columns=colonne_output[1:])
+        risultato.insert(0, colonne_output[0], previsioni)
+        risultato.to_csv(percorso_output, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        
+        righe_totali += len(blocco)
+    
+    durata = time.perf_counter() - inizio
+    righe_al_secondo = righe_totali / durata if durata > 0 else float('inf')
+    
+    print(f"✅ Righe elaborate: {righe_totali} in {durata:.2f}s ({righe_al_secondo:,.0f} righe/s)")
+    
+    return righe_totali, righe_al_secondo
+
 def questionario_e_previsione():
     """Funzione integrata questionario + previsione"""
     try:
@@ -401,11 +781,12 @@ def input_dati_manuali():
 
 def salva_info_modello(modello, classi_modello, nome_file="info_modello.txt"):
     """Salva informazioni sul modello per riferimento"""
+    classi_modello = [str(c) for c in classi_modello]
     try:
         with open(nome_file, 'w', encoding='utf-8') as f:
             f.write("=== INFORMAZIONI MODELLO ===\n")
             f.write(f"Tipo modello: {type(modello).__name__}\n")
-            f.write(f"Classi: {list(classi_modello)}\n")
+            f.write(f"Classi: {classi_modello}\n")
             f.write(f"Numero classi: {len(classi_modello)}\n")
             f.write("\n=== CODICE KOTLIN ===\n")
             f.write("// Aggiorna questa lista nel codice Kotlin:\n")
@@ -455,12 +836,25 @@ def main():
         salva_info_modello(miglior_modello, classi_modello)
         
         print(f"\n📋 IMPORTANTE PER KOTLIN:")
-        print(f"Aggiorna la lista classLabels con: {list(classi_modello)}")
+        print(f"Aggiorna la lista classLabels con: {classi_modello}")
     else:
         # Anche se ONNX non è disponibile, salva comunque le info base del modello
         print("\n📋 ONNX non disponibile, ma salvo le informazioni del modello...")
         salva_info_modello(miglior_modello, miglior_modello.classes_)
     
+    # Conserva anche una versione nel registro: i file sopra vengono sovrascritti a ogni addestramento.
+    # La promozione resta esplicita, come nella CLI del registro: si chiede prima di cambiare la corrente
+    registro = RegistroModelli(REGISTRO_PREDEFINITO)
+    versione = registra_addestramento(registro, miglior_modello, risultati,
+                                      "modello_personalita.onnx" if onnx_success else None)
+    risposta = input(f"Vuoi renderla la versione corrente di '{REGISTRO_PREDEFINITO}'? (Sì/No): ")
+    if risposta.strip().lower() in ['sì', 'si', 's', 'yes', 'y']:
+        registro.promuovi(versione)
+    
+    # Le risposte del questionario sono un insieme finito: le si precalcola tutte per questa versione
+    from tabella_predizioni import tabella_per_modello
+    tabella = tabella_per_modello(miglior_modello, versione, registro=registro)
+    
     # Menu interattivo
     while True:
         print("\n" + "="*60)
@@ -476,11 +870,11 @@ def main():
         if scelta == '1':
             dati_utente = questionario_e_previsione()
             if dati_utente:
-                prevedi_personalita(miglior_modello, dati_utente)
+                prevedi_personalita(miglior_modello, dati_utente, tabella)
         
         elif scelta == '2':
             dati_manuali = input_dati_manuali()
-            prevedi_personalita(miglior_modello, dati_manuali)
+            prevedi_personalita(miglior_modello, dati_manuali, tabella)
         
         elif scelta == '3':
             if onnx_success:
@@ -491,6 +885,7 @@ def main():
         elif scelta == '4':
             if onnx_success:
                 confronta_predizioni_sklearn_onnx(miglior_modello)
+                stampa_parita(benchmark_parita(miglior_modello, "modello_personalita.onnx", X_test))
             else:
                 print("Modello ONNX non disponibile")
         
@@ -501,5 +896,342 @@ def main():
         else:
             print("❌ Scelta non valida!")
 
+# Codici di uscita della riga di comando
+ESITO_OK = 0
+ESITO_ERRORE_DATI = 3
+ESITO_ERRORE_MODELLO = 4
+ESITO_ERRORE_ONNX = 5
+
+class CronometroFasi:
+    """Misura la durata delle fasi di una pipeline e la esporta in JSON"""
+    
+    def __init__(self, comando):
+        self.comando = comando
+        self.fasi = {}
+        self.extra = {}
+    
+    @contextmanager
+    def fase(self, nome):
+        inizio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fasi[nome] = round(time.perf_counter() - inizio, 6)
+    
+    def report(self, esito):
+        return {
+            'comando': self.comando,
+            'esito': esito,
+            'fasi_secondi': self.fasi,
+            'totale_secondi': round(sum(self.fasi.values()), 6),
+            **self.extra
+        }
+    
+    def scrivi(self, esito, percorso):
+        """Scrive il report JSON su file ('-' per lo standard output)"""
+        if percorso is None:
+            return
+        testo = json.dumps(self.report(esito), ensure_ascii=False, indent=2)
+        if percorso == '-':
+            print(testo)
+        else:
+            with open(percorso, 'w', encoding='utf-8') as f:
+                f.write(testo + "\n")
+
+def comando_train(args, cronometro):
+    """Addestra i modelli e salva il migliore (con ONNX e info opzionali)"""
+    with cronometro.fase('caricamento'):
+        df = carica_dati_da_file(args.dati)
+    if df is None:
+        return ESITO_ERRORE_DATI
+    
+    with cronometro.fase('preprocessamento'):
+        X, y = preprocessa_dati(df)
+    
+    with cronometro.fase('addestramento'):
+        miglior_modello, risultati, _, X_test, _, _ = addestra_modelli(X, y, args.workers, args.fold, args.soglia_svm)
+    cronometro.extra['modello'] = nome_candidato(miglior_modello, risultati)
+    cronometro.extra['modelli'] = report_modelli(risultati)
+    
+    with cronometro.fase('salvataggio'):
+        joblib.dump(miglior_modello, args.modello)
+    print(f"\n💾 Modello salvato come '{args.modello}'")
+    
+    if args.onnx:
+        with cronometro.fase('esportazione_onnx'):
+            onnx_success, classi_modello = esporta_modello_onnx(miglior_modello, X, args.onnx,
+                                                                args.onnx_input_grezzi)
+        if not onnx_success:
+            return ESITO_ERRORE_ONNX
+        
+        if args.varianti and not args.onnx_input_grezzi:
+            # Import locale: ottimizzazione_onnx importa a sua volta questo modulo
+            from ottimizzazione_onnx import genera_varianti, misura_variante, stampa_varianti
+            with cronometro.fase('varianti_onnx'):
+                percorsi = genera_varianti(args.onnx, args.varianti)
+                varianti = {nome: misura_variante(miglior_modello, nome, percorso, X_test)
+                            for nome, percorso in percorsi.items()}
+            stampa_varianti(varianti)
+            cronometro.extra['varianti_onnx'] = varianti
+            if not all(v['valida'] for v in varianti.values()):
+                return ESITO_ERRORE_ONNX
+        
+        if args.parita and not args.onnx_input_grezzi:
+            with cronometro.fase('parita_onnx'):
+                report = benchmark_parita(miglior_modello, args.onnx, X_test)
+            stampa_parita(report)
+            salva_parita(report, args.parita)
+    
+    with cronometro.fase('info_modello'):
+        salva_info_modello(miglior_modello, miglior_modello.classes_, args.info)
+    
+    if args.registro:
+        with cronometro.fase('registro'):
+            registro = RegistroModelli(args.registro)
+            versione = registra_addestramento(registro, miglior_modello, risultati, args.onnx)
+            if args.promuovi:
+                registro.promuovi(versione)
+        cronometro.extra['versione'] = versione
+    
+    return ESITO_OK
+
+def comando_export(args, cronometro):
+    """Esporta in ONNX un modello joblib già addestrato"""
+    with cronometro.fase('caricamento_modello'):
+        modello = carica_modello(args.modello)
+    if modello is None:
+        return ESITO_ERRORE_MODELLO
+    
+    # Per l'esportazione serve solo il numero di feature
+    X_vuoto = np.empty((0, modello.n_features_in_), dtype=np.float32)
+    
+    with cronometro.fase('esportazione_onnx'):
+        onnx_success, classi_modello = esporta_modello_onnx(modello, X_vuoto, args.onnx,
+                                                            args.onnx_input_grezzi)
+    if not onnx_success:
+        return ESITO_ERRORE_ONNX
+    
+    if not args.onnx_input_grezzi:
+        with cronometro.fase('test_onnx'):
+            testa_modello_onnx(args.onnx, classi_modello)
+    
+    with cronometro.fase('info_modello'):
+        salva_info_modello(modello, classi_modello, args.info)
+    
+    return ESITO_OK
+
+def comando_score(args, cronometro):
+    """Applica un modello joblib a un file CSV a blocchi"""
+    if not os.path.exists(args.input):
+        print(f"[ERRORE] Il file '{args.input}' non esiste.")
+        return ESITO_ERRORE_DATI
+    
+    with cronometro.fase('caricamento_modello'):
+        modello, _ = carica_modello_richiesto(args)
+    if modello is None:
+        return ESITO_ERRORE_MODELLO
+    
+    with cronometro.fase('predizione'):
+        righe, righe_al_secondo = prevedi_da_csv(modello, args.input, args.output, args.blocco)
+    cronometro.extra['righe'] = righe
+    cronometro.extra['righe_al_secondo'] = righe_al_secondo
+    
+    return ESITO_OK
+
+def comando_parita(args, cronometro):
+    """Parità e velocità sklearn/ONNX di un modello già esportato, sullo stesso test set dell'addestramento"""
+    if not ONNX_AVAILABLE:
+        print("[ERRORE] ONNX Runtime non disponibile")
+        return ESITO_ERRORE_ONNX
+    
+    with cronometro.fase('caricamento'):
+        df = carica_dati_da_file(args.dati)
+        modello, onnx_registro = carica_modello_richiesto(args)
+    if df is None:
+        return ESITO_ERRORE_DATI
+    if modello is None:
+        return ESITO_ERRORE_MODELLO
+    # Con il registro il grafo deve essere quello della stessa versione: il file
+    # --onnx predefinito potrebbe venire da un altro modello
+    if args.registro and onnx_registro is None:
+        print("[ERRORE] La versione del registro scelta non ha un export ONNX")
+        return ESITO_ERRORE_ONNX
+    percorso_onnx = onnx_registro if args.registro else args.onnx
+    
+    X, y = preprocessa_dati(df)
+    _, X_test, _, _ = dividi_train_test(X, y)
+    
+    with cronometro.fase('parita'):
+        report = benchmark_parita(modello, percorso_onnx, X_test, args.batch, args.limite_chiamate)
+    stampa_parita(report)
+    salva_parita(report, args.output)
+    cronometro.extra['parita'] = report
+    
+    concordanti = all(r['concordanza_etichette'] == 1.0 for r in report['batch'].values())
+    return ESITO_OK if concordanti else ESITO_ERRORE_ONNX
+
+def comando_benchmark(args, cronometro):
+    """Misura i tempi di caricamento, preprocessamento, addestramento e predizione"""
+    with cronometro.fase('caricamento'):
+        df = carica_dati_da_file(args.dati)
+    if df is None:
+        return ESITO_ERRORE_DATI
+    
+    with cronometro.fase('preprocessamento'):
+        X, y = preprocessa_dati(df)
+    
+    with cronometro.fase('addestramento'):
+        miglior_modello, risultati, X_train, X_test, y_train, y_test = addestra_modelli(X, y, args.workers, args.fold, args.soglia_svm)
+    
+    # Predizione ripetuta sul test set per stimare il throughput a regime
+    durate = []
+    for _ in range(args.ripetizioni):
+        inizio = time.perf_counter()
+        miglior_modello.predict_proba(X_test)
+        durate.append(time.perf_counter() - inizio)
+    cronometro.fasi['predizione'] = round(min(durate), 6)
+    
+    cronometro.extra['righe'] = len(df)
+    cronometro.extra['modello'] = nome_candidato(miglior_modello, risultati)
+    cronometro.extra['modelli'] = report_modelli(risultati)
+    cronometro.extra['predizione_righe_al_secondo'] = len(X_test) / min(durate) if min(durate) > 0 else None
+    
+    return ESITO_OK
+
+def report_modelli(risultati):
+    """Riassume i risultati di addestra_modelli in un dizionario serializzabile in JSON"""
+    return {
+        nome: {
+            'accuratezza': r['accuratezza'],
+            'cv_media': r['cv_media'],
+            'cv_std': r['cv_std'],
+            'tempo_secondi': r['tempo'],
+            'memoria_picco_mb': r['memoria_picco_mb']
+        }
+        for nome, r in risultati.items()
+    }
+
+def carica_modello(percorso_modello):
+    """Carica un modello joblib, restituendo None in caso di errore"""
+    try:
+        return joblib.load(percorso_modello)
+    except Exception as e:
+        print(f"[ERRORE] Impossibile caricare il modello '{percorso_modello}': {e}")
+        return None
+
+def registra_addestramento(registro, modello, risultati, percorso_onnx=None):
+    """Salva nel registro il modello vincente con le sue metriche e il tempo di addestramento"""
+    nome = next(nome for nome, r in risultati.items() if r['modello'] is modello)
+    metriche = report_modelli({nome: risultati[nome]})[nome]
+    return registro.registra(modello, metriche=metriche, tempo_addestramento=metriche.pop('tempo_secondi'),
+                             percorso_onnx=percorso_onnx, extra={'nome_modello': nome})
+
+def carica_modello_richiesto(args):
+    """Modello dal registro (--registro/--versione) oppure dal file joblib (--modello).
+    
+    Restituisce (modello, percorso ONNX della versione o None).
+    """
+    if not args.registro:
+        return carica_modello(args.modello), None
+    try:
+        versione = RegistroModelli(args.registro).carica(args.versione)
+        print(f"📚 Modello dal registro: versione {versione.versione}")
+        return versione.modello, versione.percorso_onnx
+    except (ErroreRegistro, OSError) as e:
+        print(f"[ERRORE] {e}")
+        return None, None
+
+def aggiungi_opzioni_registro(parser):
+    """Opzioni per leggere il modello dal registro invece che da un file joblib"""
+    parser.add_argument("--registro", help="Carica il modello da questo registro invece che da --modello")
+    parser.add_argument("--versione", help="Versione del registro (default: corrente)")
+
+def aggiungi_opzioni_addestramento(parser):
+    """Opzioni comuni ai sottocomandi che addestrano i modelli"""
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Numero di processi per l'addestramento (default: tutti i core)")
+    parser.add_argument("--fold", "-k", type=int, default=5, help="Numero di fold per la cross-validation")
+    parser.add_argument("--soglia-svm", type=int, default=SOGLIA_SVM_APPROSSIMATA,
+                        help="Righe di training oltre le quali si usa la SVM con kernel approssimato")
+
+def main_cli(argv):
+    """Punto di ingresso non interattivo: train / export / score / parita / benchmark"""
+    parser = argparse.ArgumentParser(description="Sistema di previsione personalità (modalità non interattiva)")
+    parser.add_argument("--json", metavar="FILE",
+                        help="Scrive i tempi di ogni fase in JSON ('-' per lo standard output, "
+                             "con i messaggi spostati sullo standard error)")
+    sottocomandi = parser.add_subparsers(dest="comando", required=True)
+    
+    p_train = sottocomandi.add_parser("train", help="Addestra i modelli e salva il migliore")
+    p_train.add_argument("dati", help="File CSV di training con colonna 'Personality'")
+    p_train.add_argument("--modello", "-m", default="modello_personalita.pkl", help="File joblib di output")
+    p_train.add_argument("--onnx", help="Esporta anche il modello ONNX in questo file")
+    p_train.add_argument("--info", default="info_modello.txt", help="File con le informazioni sul modello")
+    p_train.add_argument("--onnx-input-grezzi", action="store_true",
+                         help="Grafo ONNX con un input per colonna e Sì/No testuali (senza l'opzione: "
+                              "unico float_input con Sì/No già codificati dal client)")
+    p_train.add_argument("--varianti", nargs='+', metavar="VARIANTE",
+                         choices=['ottimizzato', 'float16', 'quantizzato', 'alberi_ridotti'],
+                         help="Dopo --onnx genera e valida sull'holdout le varianti ottimizzate/compresse")
+    p_train.add_argument("--parita", metavar="FILE",
+                         help="Dopo --onnx misura parità e velocità sklearn/ONNX sul test set e le aggiunge a FILE")
+    p_train.add_argument("--registro", help="Salva anche una nuova versione in questo registro")
+    p_train.add_argument("--promuovi", action="store_true", help="Rende corrente la versione registrata")
+    aggiungi_opzioni_addestramento(p_train)
+    p_train.set_defaults(esegui=comando_train)
+    
+    p_export = sottocomandi.add_parser("export", help="Esporta in ONNX un modello già addestrato")
+    p_export.add_argument("--modello", "-m", default="modello_personalita.pkl", help="File joblib di input")
+    p_export.add_argument("--onnx", default="modello_personalita.onnx", help="File ONNX di output")
+    p_export.add_argument("--info", default="info_modello.txt", help="File con le informazioni sul modello")
+    p_export.add_argument("--onnx-input-grezzi", action="store_true",
+                          help="Grafo ONNX con un input per colonna e Sì/No testuali (senza l'opzione: "
+                              "unico float_input con Sì/No già codificati dal client)")
+    p_export.set_defaults(esegui=comando_export)
+    
+    p_score = sottocomandi.add_parser("score", help="Predizione a blocchi da file CSV")
+    p_score.add_argument("input", help="File CSV con le risposte da classificare")
+    p_score.add_argument("output", help="File CSV in cui scrivere classe e probabilità")
+    p_score.add_argument("--modello", "-m", default="modello_personalita.pkl", help="Modello joblib addestrato")
+    p_score.add_argument("--blocco", "-b", type=int, default=100_000, help="Numero di righe per blocco")
+    aggiungi_opzioni_registro(p_score)
+    p_score.set_defaults(esegui=comando_score)
+    
+    p_parita = sottocomandi.add_parser("parita", help="Parità e velocità sklearn vs ONNX sull'intero test set")
+    p_parita.add_argument("dati", help="File CSV di training (se ne usa lo stesso test set di 'train')")
+    p_parita.add_argument("--modello", "-m", default="modello_personalita.pkl", help="Modello joblib addestrato")
+    p_parita.add_argument("--onnx", default="modello_personalita.onnx", help="Modello ONNX esportato (input float)")
+    p_parita.add_argument("--output", "-o", default="parita_onnx.json", help="Storico JSON dei risultati")
+    p_parita.add_argument("--batch", type=int, nargs='+', default=list(DIMENSIONI_BATCH_PARITA),
+                          help="Dimensioni di batch da misurare")
+    p_parita.add_argument("--limite-chiamate", type=int, default=5_000,
+                          help="Numero massimo di batch per dimensione")
+    aggiungi_opzioni_registro(p_parita)
+    p_parita.set_defaults(esegui=comando_parita)
+    
+    p_benchmark = sottocomandi.add_parser("benchmark", help="Misura i tempi dell'intera pipeline")
+    p_benchmark.add_argument("dati", help="File CSV di training con colonna 'Personality'")
+    p_benchmark.add_argument("--ripetizioni", "-r", type=int, default=5,
+                             help="Ripetizioni della predizione sul test set")
+    aggiungi_opzioni_addestramento(p_benchmark)
+    p_benchmark.set_defaults(esegui=comando_benchmark)
+    
+    args = parser.parse_args(argv)
+    cronometro = CronometroFasi(args.comando)
+    
+    # Con '--json -' lo standard output contiene solo il report: i messaggi vanno sullo standard error
+    log = sys.stderr if args.json == '-' else sys.stdout
+    with redirect_stdout(log):
+        try:
+            esito = args.esegui(args, cronometro)
+        except Exception as e:
+            print(f"[ERRORE] Comando '{args.comando}' fallito: {e}")
+            esito = 1
+    
+    cronometro.scrivi(esito, args.json)
+    return esito
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main_cli(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Preprocessamento delle risposte al questionario come trasformatore sklearn.
+
+PreprocessoreQuestionario viene addestrato insieme al modello (primo passo della
+Pipeline), quindi viene salvato con joblib ed esportato nel grafo ONNX: la stessa
+codifica vale in addestramento, nella predizione Python e nei client.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from schema_questionario import COLONNE_SI_NO, MAPPA_SI_NO, varianti_si_no
+
+class PreprocessoreQuestionario(BaseEstimator, TransformerMixin):
+    """Converte le risposte grezze (Yes/No come stringhe) in una matrice float32.
+
+    Le colonne Yes/No vengono codificate tramite dtype categorico: la mappatura
+    testuale si applica solo alle poche categorie distinte, poi ogni riga è una
+    lookup intera. Valori mancanti o non riconosciuti prendono il valore più
+    frequente della colonna osservato in fit (stato separato per ogni colonna).
+    Le colonne già numeriche passano invariate.
+    """
+
+    def fit(self, X, y=None):
+        for attributo in ('feature_names_in_', 'n_features_in_', 'conteggi_', 'moda_'):
+            self.__dict__.pop(attributo, None)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X, y=None):
+        """Aggiorna i conteggi delle risposte con un blocco di righe (per i dati a blocchi)"""
+        X = self._come_dataframe(X)
+        if not hasattr(self, 'conteggi_'):
+            self.feature_names_in_ = np.array(X.columns, dtype=object)
+            self.n_features_in_ = X.shape[1]
+            self.conteggi_ = {col: np.zeros(2, dtype=np.int64) for col in COLONNE_SI_NO if col in X.columns}
+
+        for col, conteggi in self.conteggi_.items():
+            valori = self._codifica_si_no(X[col], np.nan)
+            valori = valori[~np.isnan(valori)].astype(np.int64)
+            nuovi = np.bincount(valori, minlength=len(conteggi))
+            if len(nuovi) > len(conteggi):
+                conteggi = self.conteggi_[col] = np.pad(conteggi, (0, len(nuovi) - len(conteggi)))
+            conteggi += nuovi
+
+        self.moda_ = {col: float(conteggi.argmax()) if conteggi.any() else 0.0
+                      for col, conteggi in self.conteggi_.items()}
+        return self
+
+    def transform(self, X):
+        return self.codifica(X)
+
+    def codifica(self, X, imputa_mancanti=True):
+        """Come transform; con imputa_mancanti=False le risposte Yes/No mancanti restano NaN"""
+        X = self._come_dataframe(X)
+        risultato = np.empty((len(X), self.n_features_in_), dtype=np.float32)
+
+        for i, col in enumerate(self.feature_names_in_):
+            if col in self.moda_:
+                risultato[:, i] = self._codifica_si_no(X[col], self.moda_[col] if imputa_mancanti else np.nan)
+            else:
+                risultato[:, i] = X[col].to_numpy(dtype=np.float32, na_value=np.nan)
+
+        return risultato
+
+    def colonne_si_no(self):
+        """Indici delle colonne Yes/No nella matrice codificata"""
+        return [i for i, col in enumerate(self.feature_names_in_) if col in self.moda_]
+
+    def get_feature_names_out(self, input_features=None):
+        return self.feature_names_in_
+
+    def _come_dataframe(self, X):
+        if isinstance(X, pd.DataFrame):
+            return X
+        # Array già numerico nell'ordine delle colonne di addestramento
+        colonne = getattr(self, 'feature_names_in_', None)
+        return pd.DataFrame(np.asarray(X), columns=colonne)
+
+    @staticmethod
+    def _codifica_si_no(serie, valore_default):
+        """Codifica una colonna Yes/No in 0/1 con una lookup sui codici categorici"""
+        if pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            valori = serie.to_numpy(dtype=np.float32, na_value=np.nan)
+            return np.where(np.isnan(valori), valore_default, valori)
+
+        categorie = serie.astype('category')
+        mappa = varianti_si_no()
+        # Tabella indicizzata dal codice categorico; l'ultima voce (codice -1) è per i mancanti
+        tabella = np.array(
+            [mappa.get(str(c), MAPPA_SI_NO.get(str(c).lower(), valore_default))
+             for c in categorie.cat.categories] + [valore_default],
+            dtype=np.float32
+        )
+        return tabella[categorie.cat.codes.to_numpy()]
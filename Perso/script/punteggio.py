@@ -0,0 +1,179 @@
+"""
+Predizione leggera con il solo modello ONNX.
+
+Per avviarsi in fretta il modulo importa soltanto numpy, onnxruntime e la libreria
+standard: niente pandas, sklearn o skl2onnx. Le risposte Sì/No vengono codificate
+con la stessa mappatura del preprocessore (schema_questionario.py); i grafi esportati
+con --onnx-input-grezzi le ricevono invece come testo. Come nella Pipeline, le
+risposte Sì/No mancanti o non riconosciute prendono la moda vista in addestramento
+(dai metadati del registro o del grafo ONNX) e i valori numerici mancanti restano NaN.
+
+Uso:
+  python punteggio.py --onnx modello_personalita.onnx --risposte '{"Time_spent_Alone": 4, ...}'
+  python punteggio.py --registro registro_modelli input.csv output.csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from schema_questionario import COLONNE_FEATURE, COLONNE_SI_NO, varianti_si_no
+from sessioni_onnx import GESTORE_SESSIONI
+
+MAPPA_SI_NO = varianti_si_no()
+
+def codifica_valore(colonna, valore, moda=None):
+    """Valore float di una risposta, con le regole di imputazione del preprocessore.
+
+    Una risposta Sì/No mancante o non riconosciuta prende moda[colonna]; senza moda
+    nota quella mancante diventa NaN e quella non riconosciuta solleva ValueError.
+    Un valore numerico mancante è NaN, uno non valido solleva ValueError.
+    """
+    testo = str(valore).strip() if valore is not None else ''
+    if colonna in COLONNE_SI_NO:
+        codice = MAPPA_SI_NO.get(testo, MAPPA_SI_NO.get(testo.lower()))
+        if codice is not None:
+            return float(codice)
+        if moda and colonna in moda:
+            return moda[colonna]
+        if testo == '':
+            return float('nan')
+        raise ValueError(f"Risposta Sì/No non riconosciuta per '{colonna}': {valore!r}")
+    if testo == '':
+        return float('nan')
+    try:
+        return float(testo)
+    except ValueError:
+        raise ValueError(f"Valore numerico non valido per '{colonna}': {valore!r}") from None
+
+def codifica_risposte(righe, colonne=COLONNE_FEATURE, moda=None):
+    """Matrice float32 (righe x colonne) per il grafo con input unico"""
+    X = np.empty((len(righe), len(colonne)), dtype=np.float32)
+    for i, riga in enumerate(righe):
+        for j, col in enumerate(colonne):
+            X[i, j] = codifica_valore(col, riga.get(col), moda)
+    return X
+
+class PredittoreLeggero:
+    """Sessione ONNX condivisa con codifica delle risposte, senza dipendenze di addestramento"""
+
+    def __init__(self, percorso_onnx, classi=None, moda=None):
+        self.percorso_onnx = percorso_onnx
+        self.sessione = GESTORE_SESSIONI.sessione(percorso_onnx)
+        ingressi = self.sessione.sessione.get_inputs()
+        # Un input per colonna: grafo esportato con --onnx-input-grezzi
+        self.input_grezzi = len(ingressi) > 1
+        self.tipi_input = {inp.name: inp.type for inp in ingressi}
+        self.classi = classi
+        if moda is None:
+            # Mode salvate nel grafo da esporta_modello_onnx
+            metadati = self.sessione.sessione.get_modelmeta().custom_metadata_map
+            moda = json.loads(metadati['moda_si_no']) if 'moda_si_no' in metadati else None
+        self.moda = moda
+
+    @classmethod
+    def da_registro(cls, radice, versione=None):
+        """Versione del registro (default: corrente); legge solo metadati e file ONNX"""
+        from registro_modelli import ErroreRegistro, RegistroModelli
+
+        registrato = RegistroModelli(radice).carica(versione)
+        if registrato.percorso_onnx is None:
+            raise ErroreRegistro(f"La versione {registrato.versione} non ha un modello ONNX")
+        return cls(registrato.percorso_onnx, registrato.classi, registrato.moda_si_no)
+
+    def _feed(self, righe):
+        if not self.input_grezzi:
+            return codifica_risposte(righe, moda=self.moda)
+        feed = {}
+        for nome, tipo in self.tipi_input.items():
+            if tipo == 'tensor(string)':
+                feed[nome] = np.array([[str(r.get(nome, '')).strip()] for r in righe], dtype=object)
+            else:
+                feed[nome] = np.array([[codifica_valore(nome, r.get(nome), self.moda)] for r in righe],
+                                      dtype=np.float32)
+        return feed
+
+    def prevedi(self, righe):
+        """Lista di (classe, {classe: probabilità}) per una lista di risposte (dizionari)"""
+        uscite = self.sessione.esegui(self._feed(righe))
+        etichette, probabilita = uscite[0], uscite[1]
+        if self.classi is None:
+            # I grafi esportati con output_class_labels riportano le classi nel terzo output
+            self.classi = [str(c) for c in uscite[2]] if len(uscite) > 2 else [str(i) for i in range(probabilita.shape[1])]
+        return [
+            (str(etichetta), dict(zip(self.classi, map(float, riga))))
+            for etichetta, riga in zip(etichette, probabilita)
+        ]
+
+def prevedi_csv(predittore, percorso_input, percorso_output, dimensione_blocco=10_000):
+    """Predizione a blocchi da CSV con il solo modulo csv; restituisce (righe, righe al secondo)"""
+    inizio = time.perf_counter()
+    righe_totali = 0
+    with open(percorso_input, newline='', encoding='utf-8') as f_in, \
+            open(percorso_output, 'w', newline='', encoding='utf-8') as f_out:
+        lettore = csv.DictReader(f_in)
+        scrittore = csv.writer(f_out)
+        blocco = []
+        intestazione_scritta = False
+        for riga in lettore:
+            blocco.append(riga)
+            if len(blocco) < dimensione_blocco:
+                continue
+            intestazione_scritta = scrivi_blocco(predittore, blocco, scrittore, intestazione_scritta)
+            righe_totali += len(blocco)
+            blocco = []
+        if blocco:
+            scrivi_blocco(predittore, blocco, scrittore, intestazione_scritta)
+            righe_totali += len(blocco)
+
+    durata = time.perf_counter() - inizio
+    return righe_totali, righe_totali / durata if durata > 0 else float('inf')
+
+def scrivi_blocco(predittore, blocco, scrittore, intestazione_scritta):
+    risultati = predittore.prevedi(blocco)
+    if not intestazione_scritta:
+        scrittore.writerow(['Personality_prevista'] + [f"Probabilita_{c}" for c in predittore.classi])
+    scrittore.writerows([classe] + [probabilita[c] for c in predittore.classi] for classe, probabilita in risultati)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Predizione leggera della personalità con il modello ONNX")
+    parser.add_argument("input", nargs='?', help="File CSV con le risposte da classificare")
+    parser.add_argument("output", nargs='?', help="File CSV in cui scrivere classe e probabilità")
+    parser.add_argument("--onnx", default="modello_personalita.onnx", help="Modello ONNX")
+    parser.add_argument("--registro", "-r", help="Usa il modello ONNX della versione del registro")
+    parser.add_argument("--versione", help="Versione del registro (default: corrente)")
+    parser.add_argument("--risposte", help="Singola risposta in JSON, invece del CSV")
+    parser.add_argument("--blocco", "-b", type=int, default=10_000, help="Righe per blocco")
+    args = parser.parse_args()
+
+    try:
+        if args.registro:
+            predittore = PredittoreLeggero.da_registro(args.registro, args.versione)
+        else:
+            predittore = PredittoreLeggero(args.onnx)
+    except Exception as e:
+        print(f"[ERRORE] Impossibile caricare il modello: {e}")
+        return 4
+
+    try:
+        if args.risposte:
+            classe, probabilita = predittore.prevedi([json.loads(args.risposte)])[0]
+            print(json.dumps({'classe': classe, 'probabilita': probabilita}, ensure_ascii=False))
+            return 0
+        if not (args.input and args.output):
+            parser.error("servono input e output CSV, oppure --risposte")
+        righe, righe_al_secondo = prevedi_csv(predittore, args.input, args.output, args.blocco)
+    except (ValueError, OSError) as e:
+        print(f"[ERRORE] {e}")
+        return 3
+
+    print(f"✅ Righe elaborate: {righe} ({righe_al_secondo:,.0f} righe/s) -> {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Registro su disco dei modelli addestrati.
+
+Ogni addestramento salva i propri artefatti in una cartella identificata dall'hash
+del contenuto del modello joblib, senza sovrascrivere le versioni precedenti:
+
+    registro_modelli/
+        versioni/<hash>/modello.pkl      modello joblib non compresso (memory-mappabile)
+        versioni/<hash>/modello.onnx     grafo ONNX, se esportato
+        versioni/<hash>/metadati.json    classi, schema, mode Sì/No, metriche, tempo di addestramento
+        corrente                         hash della versione in uso
+        storico.json                     promozioni precedenti, per il rollback
+        tabelle/<hash>/                  tabelle precalcolate delle predizioni (tabella_predizioni.py)
+
+I modelli vengono caricati solo al primo accesso e con joblib.load(mmap_mode='r').
+La mappatura vale solo per gli array numpy che il modello tiene come attributi
+(es. vettori di supporto della SVC, parametri dello scaler): gli alberi di sklearn
+(RandomForest, HistGradientBoosting) ricopiano nodi e valori nella propria memoria
+durante il caricamento, quindi per questi modelli ogni processo ha la sua copia.
+joblib e pandas sono importati solo quando servono, così leggere metadati e
+percorsi ONNX (es. da punteggio.py) non li carica.
+
+Uso: python registro_modelli.py [--registro DIR] elenco | mostra [VERSIONE] | promuovi VERSIONE | rollback
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+REGISTRO_PREDEFINITO = 'registro_modelli'
+LUNGHEZZA_VERSIONE = 16
+
+class ErroreRegistro(Exception):
+    """Versione inesistente o registro incoerente"""
+
+def hash_file(percorso):
+    h = hashlib.sha256()
+    with open(percorso, 'rb') as f:
+        for blocco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(blocco)
+    return h.hexdigest()
+
+def schema_feature(modello):
+    """Nomi e tipi delle feature attese dal modello"""
+    from caricamento_dati import SCHEMA
+
+    colonne = getattr(modello, 'feature_names_in_', None)
+    if colonne is None:
+        return None
+    return [{'nome': str(col), 'tipo': SCHEMA.get(col, 'float32')} for col in colonne]
+
+def moda_si_no(modello):
+    """Valori imputati dal preprocessore alle risposte Sì/No mancanti o non riconosciute"""
+    preprocessore = getattr(modello, 'named_steps', {}).get('preprocessore')
+    moda = getattr(preprocessore, 'moda_', None)
+    return {str(col): float(valore) for col, valore in moda.items()} if moda is not None else None
+
+class ModelloRegistrato:
+    """Versione del registro: i metadati sono letti subito, il modello solo al primo accesso"""
+
+    def __init__(self, cartella):
+        self.cartella = cartella
+        self.versione = os.path.basename(cartella)
+        with open(os.path.join(cartella, 'metadati.json'), encoding='utf-8') as f:
+            self.metadati = json.load(f)
+        self._modello = None
+
+    @property
+    def percorso_modello(self):
+        return os.path.join(self.cartella, 'modello.pkl')
+
+    @property
+    def percorso_onnx(self):
+        percorso = os.path.join(self.cartella, 'modello.onnx')
+        return percorso if os.path.exists(percorso) else None
+
+    @property
+    def classi(self):
+        return self.metadati['classi']
+
+    @property
+    def moda_si_no(self):
+        return self.metadati.get('moda_si_no')
+
+    @property
+    def modello(self):
+        if self._modello is None:
+            import joblib
+
+            # Mappa in sola lettura gli array numpy del modello; non gli alberi, che
+            # Tree.__setstate__ copia comunque in memoria propria
+            self._modello = joblib.load(self.percorso_modello, mmap_mode='r')
+        return self._modello
+
+class RegistroModelli:
+    """Registro versionato con puntatore 'corrente', promozione e rollback"""
+
+    def __init__(self, radice=REGISTRO_PREDEFINITO):
+        self.radice = radice
+        self.cartella_versioni = os.path.join(radice, 'versioni')
+        self.file_corrente = os.path.join(radice, 'corrente')
+        self.file_storico = os.path.join(radice, 'storico.json')
+        self.cartella_tabelle = os.path.join(radice, 'tabelle')
+        self._caricati = {}
+
+    def registra(self, modello, metriche=None, tempo_addestramento=None, percorso_onnx=None, extra=None):
+        """Salva una nuova versione e ne restituisce l'identificativo (hash del modello joblib)"""
+        import joblib
+
+        os.makedirs(self.cartella_versioni, exist_ok=True)
+        temporanea = tempfile.mkdtemp(prefix='.nuova-', dir=self.cartella_versioni)
+        try:
+            percorso_modello = os.path.join(temporanea, 'modello.pkl')
+            # Nessuna compressione: è il requisito per il caricamento memory-mapped
+            joblib.dump(modello, percorso_modello, compress=0)
+            versione = hash_file(percorso_modello)[:LUNGHEZZA_VERSIONE]
+
+            destinazione = os.path.join(self.cartella_versioni, versione)
+            if os.path.exists(destinazione):
+                print(f"ℹ️  Versione {versione} già presente nel registro")
+                return versione
+
+            if percorso_onnx:
+                shutil.copyfile(percorso_onnx, os.path.join(temporanea, 'modello.onnx'))
+
+            metadati = {
+                'versione': versione,
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'tipo_modello': type(modello).__name__,
+                'classi': [str(c) for c in getattr(modello, 'classes_', [])],
+                'schema': schema_feature(modello),
+                'moda_si_no': moda_si_no(modello),
+                'metriche': metriche or {},
+                'tempo_addestramento_secondi': tempo_addestramento,
+                'onnx_sha256': hash_file(percorso_onnx) if percorso_onnx else None,
+                **(extra or {}),
+            }
+            with open(os.path.join(temporanea, 'metadati.json'), 'w', encoding='utf-8') as f:
+                json.dump(metadati, f, ensure_ascii=False, indent=2)
+
+            os.replace(temporanea, destinazione)
+            print(f"📚 Modello registrato come versione {versione}")
+            return versione
+        finally:
+            if os.path.exists(temporanea):
+                shutil.rmtree(temporanea)
+
+    def versioni(self):
+        """Metadati di tutte le versioni, dalla più recente"""
+        if not os.path.isdir(self.cartella_versioni):
+            return []
+        elenco = [
+            ModelloRegistrato(os.path.join(self.cartella_versioni, nome)).metadati
+            for nome in os.listdir(self.cartella_versioni) if not nome.startswith('.')
+        ]
+        return sorted(elenco, key=lambda m: m['data'], reverse=True)
+
+    def corrente(self):
+        """Versione promossa, o None se il registro non ne ha ancora una"""
+        if not os.path.exists(self.file_corrente):
+            return None
+        with open(self.file_corrente, encoding='utf-8') as f:
+            return f.read().strip() or None
+
+    def versioni_in_uso(self):
+        """Versione corrente e promozioni precedenti, a cui si può tornare con rollback"""
+        return {versione for versione in [self.corrente(), *self._storico()] if versione}
+
+    def _scrivi_corrente(self, versione):
+        temporaneo = f"{self.file_corrente}.tmp"
+        with open(temporaneo, 'w', encoding='utf-8') as f:
+            f.write(versione + "\n")
+        os.replace(temporaneo, self.file_corrente)
+
+    def _storico(self):
+        if not os.path.exists(self.file_storico):
+            return []
+        with open(self.file_storico, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _salva_storico(self, storico):
+        temporaneo = f"{self.file_storico}.tmp"
+        with open(temporaneo, 'w', encoding='utf-8') as f:
+            json.dump(storico, f, ensure_ascii=False, indent=2)
+        os.replace(temporaneo, self.file_storico)
+
+    def risolvi(self, versione):
+        """Accetta anche un prefisso univoco dell'hash"""
+        if not os.path.isdir(self.cartella_versioni):
+            raise ErroreRegistro(f"Registro vuoto: {self.radice}")
+        candidati = [nome for nome in os.listdir(self.cartella_versioni)
+                     if nome.startswith(versione) and not nome.startswith('.')]
+        if len(candidati) != 1:
+            raise ErroreRegistro(f"Versione '{versione}' {'ambigua' if candidati else 'non trovata'}")
+        return candidati[0]
+
+    def promuovi(self, versione):
+        """Rende corrente una versione, ricordando la precedente per il rollback"""
+        versione = self.risolvi(versione)
+        precedente = self.corrente()
+        if precedente == versione:
+            return versione
+        storico = self._storico()
+        if precedente:
+            storico.append(precedente)
+        self._salva_storico(storico)
+        self._scrivi_corrente(versione)
+        print(f"⬆️  Versione corrente: {versione}")
+        return versione
+
+    def rollback(self):
+        """Torna alla versione corrente precedente"""
+        storico = self._storico()
+        if not storico:
+            raise ErroreRegistro("Nessuna versione precedente a cui tornare")
+        versione = storico.pop()
+        self._salva_storico(storico)
+        self._scrivi_corrente(versione)
+        print(f"⬇️  Rollback alla versione: {versione}")
+        return versione
+
+    def carica(self, versione=None):
+        """Versione richiesta (default: corrente), con caricamento pigro del modello"""
+        versione = self.risolvi(versione) if versione else self.corrente()
+        if versione is None:
+            raise ErroreRegistro(f"Nessuna versione corrente in {self.radice}")
+        if versione not in self._caricati:
+            self._caricati[versione] = ModelloRegistrato(os.path.join(self.cartella_versioni, versione))
+        return self._caricati[versione]
+
+def stampa_versioni(registro):
+    corrente = registro.corrente()
+    versioni = registro.versioni()
+    if not versioni:
+        print(f"Registro vuoto: {registro.radice}")
+        return
+    print(f"{'':<2} {'Versione':<18} {'Data':<20} {'Modello':<24} {'Accuratezza':<12} {'ONNX':<5}")
+    for m in versioni:
+        segno = '*' if m['versione'] == corrente else ''
+        accuratezza = m['metriche'].get('accuratezza')
+        testo_accuratezza = f"{accuratezza:.4f}" if accuratezza is not None else '-'
+        print(f"{segno:<2} {m['versione']:<18} {m['data']:<20} {m.get('nome_modello', m['tipo_modello']):<24} "
+              f"{testo_accuratezza:<12} {'sì' if m['onnx_sha256'] else 'no':<5}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro dei modelli di personalità")
+    parser.add_argument("--registro", "-r", default=REGISTRO_PREDEFINITO, help="Cartella del registro")
+    sotto = parser.add_subparsers(dest="comando", required=True)
+    sotto.add_parser("elenco", help="Elenca le versioni (* = corrente)")
+    p_mostra = sotto.add_parser("mostra", help="Mostra i metadati di una versione")
+    p_mostra.add_argument("versione", nargs='?', help="Hash o prefisso (default: corrente)")
+    p_promuovi = sotto.add_parser("promuovi", help="Rende corrente una versione")
+    p_promuovi.add_argument("versione", help="Hash o prefisso")
+    sotto.add_parser("rollback", help="Torna alla versione corrente precedente")
+    args = parser.parse_args()
+
+    registro = RegistroModelli(args.registro)
+    try:
+        if args.comando == "elenco":
+            stampa_versioni(registro)
+        elif args.comando == "mostra":
+            print(json.dumps(registro.carica(args.versione).metadati, ensure_ascii=False, indent=2))
+        elif args.comando == "promuovi":
+            registro.promuovi(args.versione)
+        else:
+            registro.rollback()
+    except ErroreRegistro as e:
+        print(f"[ERRORE] {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Ricerca degli iperparametri con successive halving sulle famiglie di modelli candidate.
+
+Vengono campionate N configurazioni (Random Forest, Gradient Boosting, Logistic
+Regression, SVM) e valutate in cross-validation su un budget di righe crescente:
+a ogni round resta solo la frazione 1/eta migliore e il budget viene moltiplicato
+per eta, fino all'intero training set nell'ultimo round.
+
+- Il training set viene codificato una sola volta con PreprocessoreQuestionario e
+  condiviso con i processi worker; i fold di ogni budget sono calcolati una volta
+  e riusati da tutte le configurazioni del round.
+- Una configurazione viene fermata dopo il primo fold se resta sotto la soglia
+  di potatura (classe maggioritaria al primo round, poi migliore media del round
+  precedente meno un margine).
+- Ogni prova viene aggiunta a uno storico JSONL, con un'impronta del file di dati
+  e delle opzioni che cambiano le prove (fold, seme, eta, righe minime, margine):
+  rieseguendo lo stesso comando le prove già presenti non vengono ripetute, quindi
+  una ricerca interrotta riprende.
+
+Uso: python ricerca_iperparametri.py dati.csv --configurazioni 27 --eta 3 --storico ricerca.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.svm import SVC
+from threadpoolctl import threadpool_limits
+
+from caricamento_dati import hash_sorgente
+from personality_predictor import (SOGLIA_SVM_APPROSSIMATA, carica_dati_da_file, con_preprocessore,
+                                   crea_svm_approssimata, dividi_train_test, esporta_modello_onnx,
+                                   preprocessa_dati)
+from preprocessamento import PreprocessoreQuestionario
+
+FAMIGLIE = ['Random Forest', 'Gradient Boosting', 'Logistic Regression', 'SVM']
+
+def log_uniforme(rng, minimo, massimo):
+    return float(10 ** rng.uniform(math.log10(minimo), math.log10(massimo)))
+
+def campiona_parametri(famiglia, rng, svm_approssimata):
+    """Una configurazione casuale dello spazio di ricerca della famiglia"""
+    if famiglia == 'Random Forest':
+        return {
+            'n_estimators': int(rng.choice([50, 100, 200, 400])),
+            'max_depth': [None, 5, 10, 20][rng.integers(4)],
+            'min_samples_leaf': int(rng.choice([1, 2, 5, 10])),
+            'max_features': ['sqrt', 'log2', None][rng.integers(3)],
+        }
+    if famiglia == 'Gradient Boosting':
+        return {
+            'learning_rate': log_uniforme(rng, 0.02, 0.3),
+            'max_iter': int(rng.choice([100, 200, 400])),
+            'max_leaf_nodes': int(rng.choice([15, 31, 63])),
+            'min_samples_leaf': int(rng.choice([10, 20, 50])),
+            'l2_regularization': log_uniforme(rng, 1e-4, 1.0),
+        }
+    if famiglia == 'Logistic Regression':
+        return {'C': log_uniforme(rng, 1e-3, 1e2)}
+    if svm_approssimata:
+        return {'C': log_uniforme(rng, 1e-2, 1e2), 'n_componenti': int(rng.choice([200, 500, 1000]))}
+    return {'C': log_uniforme(rng, 1e-1, 1e2), 'gamma': log_uniforme(rng, 1e-3, 1.0)}
+
+def crea_stimatore(famiglia, parametri, probabilita=True, n_jobs=1):
+    """Stimatore della famiglia (senza preprocessore) con gli iperparametri indicati"""
+    if famiglia == 'Random Forest':
+        return RandomForestClassifier(random_state=42, n_jobs=n_jobs, **parametri)
+    if famiglia == 'Gradient Boosting':
+        return HistGradientBoostingClassifier(random_state=42, **parametri)
+    if famiglia == 'Logistic Regression':
+        return LogisticRegression(random_state=42, max_iter=1000, **parametri)
+    if 'n_componenti' in parametri:
+        modello = crea_svm_approssimata(parametri['n_componenti'], n_jobs)
+        modello.set_params(calibratedclassifiercv__estimator__C=parametri['C'])
+        return modello
+    if probabilita:
+        return SVC(random_state=42, probability=True, **parametri)
+    # Durante la ricerca conta solo l'accuratezza: la calibrazione Platt interna si salta
+    return SVC(random_state=42, **parametri)
+
+def id_configurazione(famiglia, parametri):
+    testo = json.dumps({'famiglia': famiglia, 'parametri': parametri}, sort_keys=True)
+    return hashlib.sha1(testo.encode()).hexdigest()[:10]
+
+def campiona_configurazioni(n, seme, svm_approssimata):
+    """Configurazioni riproducibili dato il seme, distribuite in modo uniforme tra le famiglie"""
+    rng = np.random.default_rng(seme)
+    configurazioni = {}
+    for i in range(n * 10):
+        if len(configurazioni) == n:
+            break
+        famiglia = FAMIGLIE[len(configurazioni) % len(FAMIGLIE)]
+        parametri = campiona_parametri(famiglia, rng, svm_approssimata)
+        # Le griglie discrete (es. Random Forest) possono ripetere una configurazione
+        id_conf = id_configurazione(famiglia, parametri)
+        configurazioni.setdefault(id_conf, {'id': id_conf, 'famiglia': famiglia, 'parametri': parametri})
+    return list(configurazioni.values())
+
+def budget_round(n_configurazioni, eta, n_righe, min_righe):
+    """Righe per round: l'ultimo usa l'intero training set, ognuno dei precedenti 1/eta del successivo"""
+    n_round = max(1, int(math.floor(math.log(n_configurazioni, eta))) + 1)
+    budget = [int(n_righe / eta ** (n_round - 1 - r)) for r in range(n_round)]
+    return [b for b in budget if b >= min_righe] or [n_righe]
+
+# --- Valutazione nei processi worker ---
+
+_X = None
+_y = None
+_thread = 1
+
+def inizializza_worker(X, y, thread=1):
+    """Riceve una sola volta per processo la matrice già codificata e i thread a disposizione"""
+    global _X, _y, _thread
+    _X, _y, _thread = X, y, thread
+
+def valuta_configurazione(configurazione, fold, soglia_potatura):
+    """Cross-validation sui fold in cache, fermandosi dopo il primo fold se sotto soglia"""
+    punteggi = []
+    inizio = time.perf_counter()
+    # Il Gradient Boosting usa thread OpenMP su tutti i core: con più prove in
+    # parallelo va limitato alla quota del worker, come in valuta_modello
+    with threadpool_limits(limits=_thread, user_api='openmp'):
+        for indice_train, indice_val in fold:
+            modello = crea_stimatore(configurazione['famiglia'], configurazione['parametri'], probabilita=False)
+            modello.fit(_X[indice_train], _y[indice_train])
+            punteggi.append(accuracy_score(_y[indice_val], modello.predict(_X[indice_val])))
+            if soglia_potatura is not None and len(punteggi) == 1 and punteggi[0] < soglia_potatura:
+                break
+    return {
+        'punteggi': punteggi,
+        'accuratezza': float(np.mean(punteggi)),
+        'potata': len(punteggi) < len(fold),
+        'tempo': time.perf_counter() - inizio,
+    }
+
+# --- Storico delle prove ---
+
+def impronta_ricerca(percorso_dati, n_fold, seme, eta, min_righe, margine):
+    """Impronta dei dati e delle opzioni da cui dipende il risultato di una prova"""
+    testo = json.dumps({'dati': hash_sorgente(percorso_dati), 'fold': n_fold, 'seme': seme, 'eta': eta,
+                        'min_righe': min_righe, 'margine': margine}, sort_keys=True)
+    return hashlib.sha1(testo.encode()).hexdigest()[:16]
+
+def carica_storico(percorso, impronta=None):
+    """Prove già eseguite con la stessa impronta, indicizzate per (configurazione, budget)"""
+    prove = {}
+    if percorso and os.path.exists(percorso):
+        with open(percorso, encoding='utf-8') as f:
+            for riga in f:
+                if riga.strip():
+                    prova = json.loads(riga)
+                    if prova.get('impronta') == impronta:
+                        prove[(prova['id'], prova['budget'])] = prova
+    return prove
+
+def aggiungi_allo_storico(percorso, prova):
+    if not percorso:
+        return
+    with open(percorso, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(prova, ensure_ascii=False) + "\n")
+        f.flush()
+
+# --- Ricerca ---
+
+def successive_halving(X, y, configurazioni, eta=3, n_fold=3, min_righe=500, workers=None,
+                       margine=0.05, storico=None, seme=42, impronta=None):
+    """Esegue i round di successive halving; restituisce (migliore configurazione, tutte le prove)"""
+    prove_salvate = carica_storico(storico, impronta)
+    budget = budget_round(len(configurazioni), eta, len(X), min(min_righe, len(X)))
+    workers = workers or os.cpu_count() or 1
+    thread_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    # Soglia del primo round: accuratezza della classe maggioritaria
+    _, conteggi = np.unique(y, return_counts=True)
+    soglia = conteggi.max() / conteggi.sum()
+
+    prove = []
+    sopravvissute = configurazioni
+    with ProcessPoolExecutor(max_workers=workers, initializer=inizializza_worker,
+                             initargs=(X, y, thread_per_worker)) as executor:
+        for r, righe in enumerate(budget):
+            # Sottoinsieme stratificato e fold calcolati una volta per round
+            if righe < len(X):
+                indici, _ = train_test_split(np.arange(len(X)), train_size=righe, stratify=y, random_state=seme)
+            else:
+                indici = np.arange(len(X))
+            cv = StratifiedKFold(n_splits=n_fold, shuffle=True, random_state=seme)
+            fold = [(indici[tr], indici[va]) for tr, va in cv.split(indici, y[indici])]
+
+            print(f"\n=== Round {r + 1}/{len(budget)}: {len(sopravvissute)} configurazioni su {righe} righe "
+                  f"(soglia di potatura {soglia:.4f}) ===")
+
+            da_eseguire = [c for c in sopravvissute if (c['id'], righe) not in prove_salvate]
+            riprese = len(sopravvissute) - len(da_eseguire)
+            if riprese:
+                print(f"↩️  {riprese} prove riprese dallo storico")
+
+            futures = {c['id']: executor.submit(valuta_configurazione, c, fold, soglia) for c in da_eseguire}
+            round_prove = []
+            for c in sopravvissute:
+                if (c['id'], righe) in prove_salvate:
+                    prova = prove_salvate[(c['id'], righe)]
+                else:
+                    prova = {**c, 'round': r + 1, 'budget': righe, 'impronta': impronta,
+                             **futures[c['id']].result()}
+                    aggiungi_allo_storico(storico, prova)
+                round_prove.append(prova)
+                stato = " (potata)" if prova['potata'] else ""
+                print(f"  {prova['famiglia']:<20} {prova['accuratezza']:.4f} in {prova['tempo']:.2f}s "
+                      f"{json.dumps(prova['parametri'])}{stato}")
+            prove.extend(round_prove)
+
+            # Le potate vanno in fondo; tra le altre si tiene la frazione 1/eta migliore
+            ordinate = sorted(round_prove, key=lambda p: (not p['potata'], p['accuratezza']), reverse=True)
+            migliori = [p for p in ordinate if not p['potata']] or ordinate
+            n_tenute = max(1, len(round_prove) // eta)
+            id_tenuti = {p['id'] for p in migliori[:n_tenute]}
+            sopravvissute = [c for c in sopravvissute if c['id'] in id_tenuti]
+            soglia = migliori[0]['accuratezza'] - margine
+
+    migliore = max((p for p in prove if p['budget'] == budget[-1]), key=lambda p: p['accuratezza'])
+    return migliore, prove
+
+def frontiera_tempo_accuratezza(prove):
+    """Prove non dominate: nessun'altra è sia più accurata sia più veloce"""
+    frontiera = []
+    for p in sorted(prove, key=lambda p: (p['tempo'], -p['accuratezza'])):
+        if not frontiera or p['accuratezza'] > frontiera[-1]['accuratezza']:
+            frontiera.append(p)
+    return frontiera
+
+def stampa_report(prove, migliore):
+    print("\n=== PROVE: ACCURATEZZA E TEMPO DI CALCOLO ===")
+    print(f"{'Round':<6} {'Righe':<9} {'Famiglia':<20} {'Accuratezza':<12} {'Tempo (s)':<10} {'Stato':<8} Id")
+    for p in sorted(prove, key=lambda p: (p['round'], -p['accuratezza'])):
+        print(f"{p['round']:<6} {p['budget']:<9} {p['famiglia']:<20} {p['accuratezza']:<12.4f} "
+              f"{p['tempo']:<10.2f} {'potata' if p['potata'] else 'ok':<8} {p['id']}")
+
+    print("\nFrontiera accuratezza/tempo:")
+    for p in frontiera_tempo_accuratezza(prove):
+        print(f"  {p['accuratezza']:.4f} in {p['tempo']:.2f}s - {p['famiglia']} {json.dumps(p['parametri'])} "
+              f"({p['budget']} righe)")
+
+    print(f"\n🏆 Migliore configurazione: {migliore['famiglia']} {json.dumps(migliore['parametri'])} "
+          f"(CV {migliore['accuratezza']:.4f})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricerca degli iperparametri con successive halving")
+    parser.add_argument("dati", help="File CSV di training con colonna 'Personality'")
+    parser.add_argument("--configurazioni", "-n", type=int, default=27, help="Configurazioni iniziali")
+    parser.add_argument("--eta", type=int, default=3, help="Fattore di riduzione tra un round e il successivo")
+    parser.add_argument("--fold", "-k", type=int, default=3, help="Fold di cross-validation per prova")
+    parser.add_argument("--min-righe", type=int, default=500, help="Budget minimo di righe del primo round")
+    parser.add_argument("--margine", type=float, default=0.05,
+                        help="Distacco dalla migliore del round precedente oltre il quale una prova viene fermata")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Processi paralleli (default: tutti i core)")
+    parser.add_argument("--seme", type=int, default=42, help="Seme per configurazioni e sottoinsiemi")
+    parser.add_argument("--storico", default="ricerca_iperparametri.jsonl",
+                        help="Storico JSONL delle prove (permette di riprendere la ricerca)")
+    parser.add_argument("--modello", "-m", help="Salva qui il modello migliore riaddestrato sul training set")
+    parser.add_argument("--onnx", help="Esporta anche il modello migliore in ONNX")
+    args = parser.parse_args()
+
+    df = carica_dati_da_file(args.dati)
+    if df is None:
+        return 3
+    X, y = preprocessa_dati(df)
+    X_train, X_test, y_train, y_test = dividi_train_test(X, y)
+
+    # Codifica una sola volta: tutte le prove lavorano sulla stessa matrice
+    preprocessore = PreprocessoreQuestionario().fit(X_train)
+    X_codificato = preprocessore.transform(X_train)
+    y_codificato = np.asarray(y_train)
+
+    svm_approssimata = len(X_train) > SOGLIA_SVM_APPROSSIMATA
+    configurazioni = campiona_configurazioni(args.configurazioni, args.seme, svm_approssimata)
+
+    inizio = time.perf_counter()
+    migliore, prove = successive_halving(X_codificato, y_codificato, configurazioni, args.eta, args.fold,
+                                         args.min_righe, args.workers, args.margine, args.storico, args.seme,
+                                         impronta=impronta_ricerca(args.dati, args.fold, args.seme, args.eta,
+                                                                   args.min_righe, args.margine))
+    stampa_report(prove, migliore)
+    print(f"⏱️  Ricerca completata in {time.perf_counter() - inizio:.1f}s "
+          f"({sum(p['tempo'] for p in prove):.1f}s di calcolo nelle prove)")
+
+    modello = con_preprocessore(crea_stimatore(migliore['famiglia'], migliore['parametri'], n_jobs=args.workers or -1))
+    modello.fit(X_train, y_train)
+    print(f"Accuratezza test del modello migliore: {accuracy_score(y_test, modello.predict(X_test)):.4f}")
+
+    if args.modello:
+        joblib.dump(modello, args.modello)
+        print(f"💾 Modello salvato come '{args.modello}'")
+    if args.onnx:
+        esporta_modello_onnx(modello, X_train, args.onnx)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
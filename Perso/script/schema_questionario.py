@@ -0,0 +1,41 @@
+"""
+Costanti del questionario condivise da addestramento, predizione e controlli.
+
+Il modulo dipende solo dalla libreria standard: lo importano anche i percorsi di
+predizione leggeri, che non devono caricare pandas o sklearn.
+"""
+
+from itertools import product
+
+# Feature nell'ordine delle colonne del dataset (e dell'input float del grafo ONNX)
+COLONNE_FEATURE = [
+    'Time_spent_Alone', 'Stage_fear', 'Social_event_attendance', 'Going_outside',
+    'Drained_after_socializing', 'Friends_circle_size', 'Post_frequency',
+]
+
+# Colonne Yes/No e relativa mappatura, condivise tra addestramento e predizione
+COLONNE_SI_NO = ['Stage_fear', 'Drained_after_socializing']
+MAPPA_SI_NO = {
+    'yes': 1, 'no': 0, 'sì': 1, 'si': 1,
+    'true': 1, 'false': 0, '1': 1, '0': 0
+}
+
+def varianti_si_no():
+    """Mappatura estesa alle varianti maiuscole, per la lookup senza conversioni di stringa"""
+    varianti = {}
+    for chiave, valore in MAPPA_SI_NO.items():
+        for variante in (chiave, chiave.capitalize(), chiave.upper()):
+            varianti[variante] = valore
+    return varianti
+
+def tutte_le_maiuscole_si_no():
+    """Mappatura con ogni combinazione di maiuscole e minuscole delle chiavi (es. 'yEs').
+
+    Equivale a MAPPA_SI_NO.get(testo.lower()) senza conversioni di stringa: la usa il
+    grafo ONNX con input grezzi, dove StringNormalizer dipende dai locale installati.
+    """
+    varianti = {}
+    for chiave, valore in MAPPA_SI_NO.items():
+        for lettere in product(*({c, c.upper()} for c in chiave)):
+            varianti[''.join(lettere)] = valore
+    return varianti
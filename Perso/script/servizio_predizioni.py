@@ -0,0 +1,438 @@
+"""
+Servizio HTTP locale di predizione della personalità, con micro-batching.
+
+Il server (solo asyncio, nessuna dipendenza esterna) carica una volta il modello
+joblib e, se indicato, la relativa sessione ONNX. Le richieste singole concorrenti
+vengono accodate e raggruppate in micro-batch: un batch parte quando raggiunge
+--max-batch istanze o quando la prima istanza in coda ha atteso --max-ritardo-ms.
+
+Endpoint:
+  POST /predict        {"istanza": {"Time_spent_Alone": 4, "Stage_fear": "No", ...}}
+  POST /predict_batch  {"istanze": [{...}, {...}]}
+  GET  /metrics        contatori, latenze p50/p99 e throughput
+  GET  /health
+
+Uso:
+  python servizio_predizioni.py serve --modello modello_personalita.pkl [--onnx modello_personalita.onnx]
+  python servizio_predizioni.py carico --richieste 5000 --concorrenza 64
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from schema_questionario import COLONNE_SI_NO
+
+MAX_CORPO = 10 * 1024 * 1024
+FINESTRA_LATENZE = 10_000
+
+ESEMPIO_ISTANZA = {
+    'Time_spent_Alone': 4.0, 'Stage_fear': 'No', 'Social_event_attendance': 5.0,
+    'Going_outside': 4.0, 'Drained_after_socializing': 'No', 'Friends_circle_size': 8.0,
+    'Post_frequency': 5.0,
+}
+
+class ErroreRichiesta(Exception):
+    """Richiesta non valida (risposta 400)"""
+
+class Predittore:
+    """Modello sklearn (Pipeline con preprocessore) o sessione ONNX alimentata dal preprocessore"""
+
+    def __init__(self, percorso_modello, percorso_onnx=None):
+        self.modello = joblib.load(percorso_modello)
+        self.classi = [str(c) for c in self.modello.classes_]
+        self.colonne = list(self.modello.feature_names_in_)
+        self.percorso_onnx = percorso_onnx
+        if percorso_onnx:
+            from sessioni_onnx import GESTORE_SESSIONI
+            self.sessioni = GESTORE_SESSIONI
+            self.sessioni.sessione(percorso_onnx)  # caricamento anticipato
+
+    def come_dataframe(self, istanze):
+        """DataFrame con le colonne del modello; le feature numeriche vengono convertite qui,
+        così un valore non numerico diventa un errore della richiesta e non del modello"""
+        # Il controllo va fatto istanza per istanza: from_records unisce le chiavi di tutto
+        # il batch e riempirebbe di NaN le feature omesse da una sola istanza
+        for i, istanza in enumerate(istanze):
+            if not isinstance(istanza, dict):
+                raise ErroreRichiesta(f"Istanza {i} non valida: atteso un oggetto JSON")
+            mancanti = [col for col in self.colonne if col not in istanza or istanza[col] is None]
+            if mancanti:
+                raise ErroreRichiesta(f"Istanza {i}: colonne mancanti {mancanti}")
+        try:
+            df = pd.DataFrame.from_records(istanze)
+            df = df[self.colonne]
+        except KeyError as e:
+            raise ErroreRichiesta(f"Colonne mancanti: {e}")
+        except (TypeError, ValueError) as e:
+            raise ErroreRichiesta(f"Istanze non valide: {e}")
+
+        for col in self.colonne:
+            if col in COLONNE_SI_NO:
+                continue
+            try:
+                df[col] = pd.to_numeric(df[col], errors='raise').astype(np.float32)
+            except (TypeError, ValueError):
+                raise ErroreRichiesta(f"Valore non numerico per '{col}'")
+        return df
+
+    def predizioni(self, istanze):
+        """Classi predette e matrice delle probabilità (righe x classi) per una lista di istanze"""
+        X = self.come_dataframe(istanze)
+        if self.percorso_onnx:
+            # Il grafo float_input riceve le feature già codificate dal preprocessore della Pipeline
+            X = self.modello.named_steps['preprocessore'].transform(X)
+            return self.sessioni.predict_batch(self.percorso_onnx, X)
+        # predict e non argmax(predict_proba): per la SVC con probability=True possono differire
+        return self.modello.predict(X), self.modello.predict_proba(X)
+
+    def risultati(self, istanze):
+        classi, probabilita = self.predizioni(istanze)
+        return [
+            {'classe': str(classe), 'probabilita': dict(zip(self.classi, map(float, riga)))}
+            for classe, riga in zip(classi, probabilita)
+        ]
+
+class Metriche:
+    """Contatori del servizio e latenze delle ultime richieste"""
+
+    def __init__(self):
+        self.avvio = time.perf_counter()
+        self.richieste = 0
+        self.errori = 0
+        self.righe = 0
+        self.batch = 0
+        self.righe_in_batch = 0
+        self.latenze = deque(maxlen=FINESTRA_LATENZE)
+
+    def registra(self, righe, durata):
+        self.richieste += 1
+        self.righe += righe
+        self.latenze.append(durata)
+
+    def registra_batch(self, dimensione):
+        self.batch += 1
+        self.righe_in_batch += dimensione
+
+    def riepilogo(self):
+        durata = time.perf_counter() - self.avvio
+        latenze = np.array(self.latenze) * 1000
+        return {
+            'uptime_secondi': round(durata, 3),
+            'richieste': self.richieste,
+            'errori': self.errori,
+            'righe': self.righe,
+            'righe_al_secondo': round(self.righe / durata, 1) if durata > 0 else 0.0,
+            'micro_batch': self.batch,
+            'dimensione_media_batch': round(self.righe_in_batch / self.batch, 2) if self.batch else 0.0,
+            'latenza_p50_ms': round(float(np.percentile(latenze, 50)), 3) if len(latenze) else None,
+            'latenza_p99_ms': round(float(np.percentile(latenze, 99)), 3) if len(latenze) else None,
+        }
+
+class MicroBatcher:
+    """Raggruppa le istanze singole concorrenti in un'unica chiamata al modello"""
+
+    def __init__(self, predittore, metriche, max_batch=64, max_ritardo=0.002):
+        self.predittore = predittore
+        self.metriche = metriche
+        self.max_batch = max_batch
+        self.max_ritardo = max_ritardo
+        self.coda = asyncio.Queue()
+        self._task = None
+
+    def avvia(self):
+        self._task = asyncio.create_task(self._ciclo())
+
+    async def ferma(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def predici(self, istanza):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.coda.put((istanza, futuro))
+        return await futuro
+
+    def _risultati(self, istanze):
+        try:
+            return self.predittore.risultati(istanze)
+        except Exception:
+            # Un'istanza non valida non deve far fallire le altre del batch:
+            # ciascuna riceve il proprio risultato o il proprio errore
+            risultati = []
+            for istanza in istanze:
+                try:
+                    risultati.append(self.predittore.risultati([istanza])[0])
+                except Exception as e:
+                    risultati.append(e)
+            return risultati
+
+    async def _ciclo(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            elementi = [await self.coda.get()]
+            scadenza = loop.time() + self.max_ritardo
+            while len(elementi) < self.max_batch:
+                attesa = scadenza - loop.time()
+                if attesa <= 0:
+                    break
+                try:
+                    elementi.append(await asyncio.wait_for(self.coda.get(), attesa))
+                except asyncio.TimeoutError:
+                    break
+
+            self.metriche.registra_batch(len(elementi))
+            istanze = [istanza for istanza, _ in elementi]
+            try:
+                # Il modello gira in un thread per non bloccare l'accettazione di nuove richieste
+                risultati = await loop.run_in_executor(None, self._risultati, istanze)
+            except Exception as e:
+                risultati = [e] * len(elementi)
+
+            for (_, futuro), risultato in zip(elementi, risultati):
+                if futuro.done():
+                    continue
+                if isinstance(risultato, Exception):
+                    futuro.set_exception(risultato)
+                else:
+                    futuro.set_result(risultato)
+
+class ServizioPredizioni:
+    """Server HTTP/1.1 minimale con keep-alive"""
+
+    def __init__(self, predittore, max_batch=64, max_ritardo=0.002):
+        self.predittore = predittore
+        self.metriche = Metriche()
+        self.batcher = MicroBatcher(predittore, self.metriche, max_batch, max_ritardo)
+
+    async def gestisci_richiesta(self, metodo, percorso, corpo):
+        """Restituisce (stato HTTP, oggetto JSON di risposta)"""
+        if metodo == 'GET' and percorso == '/health':
+            return 200, {'stato': 'ok', 'classi': self.predittore.classi}
+        if metodo == 'GET' and percorso == '/metrics':
+            return 200, self.metriche.riepilogo()
+        if metodo != 'POST' or percorso not in ('/predict', '/predict_batch'):
+            return 404, {'errore': f"Endpoint non trovato: {metodo} {percorso}"}
+
+        inizio = time.perf_counter()
+        try:
+            dati = json.loads(corpo or b'{}')
+            if percorso == '/predict':
+                if not isinstance(dati.get('istanza'), dict):
+                    raise ErroreRichiesta("Campo 'istanza' mancante o non valido")
+                risposta = await self.batcher.predici(dati['istanza'])
+                righe = 1
+            else:
+                istanze = dati.get('istanze')
+                if not isinstance(istanze, list) or not istanze:
+                    raise ErroreRichiesta("Campo 'istanze' mancante o vuoto")
+                loop = asyncio.get_running_loop()
+                risposta = {'risultati': await loop.run_in_executor(None, self.predittore.risultati, istanze)}
+                righe = len(istanze)
+        except (ErroreRichiesta, json.JSONDecodeError, AttributeError) as e:
+            self.metriche.errori += 1
+            return 400, {'errore': str(e)}
+        except Exception as e:
+            self.metriche.errori += 1
+            return 500, {'errore': str(e)}
+
+        self.metriche.registra(righe, time.perf_counter() - inizio)
+        return 200, risposta
+
+    async def gestisci_connessione(self, reader, writer):
+        try:
+            while True:
+                riga = await reader.readline()
+                if not riga:
+                    break
+                try:
+                    metodo, percorso, versione = riga.decode('latin-1').split()
+                except ValueError:
+                    await self.scrivi_risposta(writer, 400, {'errore': 'Richiesta malformata'}, False)
+                    break
+
+                intestazioni = {}
+                while True:
+                    riga = await reader.readline()
+                    if riga in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valore = riga.decode('latin-1').partition(':')
+                    intestazioni[nome.strip().lower()] = valore.strip()
+
+                lunghezza = int(intestazioni.get('content-length', 0) or 0)
+                if lunghezza > MAX_CORPO:
+                    await self.scrivi_risposta(writer, 413, {'errore': 'Corpo troppo grande'}, False)
+                    break
+                corpo = await reader.readexactly(lunghezza) if lunghezza else b''
+
+                keep_alive = (versione == 'HTTP/1.1' and intestazioni.get('connection', '').lower() != 'close')
+                stato, risposta = await self.gestisci_richiesta(metodo, percorso.split('?')[0], corpo)
+                await self.scrivi_risposta(writer, stato, risposta, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def scrivi_risposta(self, writer, stato, oggetto, keep_alive):
+        testi = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                 500: 'Internal Server Error'}
+        corpo = json.dumps(oggetto, ensure_ascii=False).encode('utf-8')
+        intestazione = (
+            f"HTTP/1.1 {stato} {testi.get(stato, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode('latin-1')
+        writer.write(intestazione + corpo)
+        await writer.drain()
+
+    async def avvia(self, host, porta):
+        self.batcher.avvia()
+        server = await asyncio.start_server(self.gestisci_connessione, host, porta)
+        print(f"🚀 Servizio di predizione in ascolto su http://{host}:{porta}")
+        print(f"  - Micro-batch: max {self.batcher.max_batch} istanze, "
+              f"max {self.batcher.max_ritardo * 1000:.1f} ms di attesa")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.ferma()
+
+# --- Generatore di carico ---
+
+async def invia(reader, writer, host, metodo, percorso, oggetto=None):
+    """Invia una richiesta su una connessione keep-alive e restituisce (stato, corpo JSON)"""
+    corpo = json.dumps(oggetto).encode('utf-8') if oggetto is not None else b''
+    writer.write(
+        f"{metodo} {percorso} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n".encode('latin-1') + corpo
+    )
+    await writer.drain()
+
+    stato = int((await reader.readline()).split()[1])
+    lunghezza = 0
+    while True:
+        riga = await reader.readline()
+        if riga in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valore = riga.decode('latin-1').partition(':')
+        if nome.strip().lower() == 'content-length':
+            lunghezza = int(valore)
+    return stato, json.loads(await reader.readexactly(lunghezza))
+
+async def genera_carico(host, porta, richieste, concorrenza, dimensione_batch=1):
+    """Invia richieste da più client concorrenti e misura latenza e throughput lato client"""
+    latenze = []
+    errori = 0
+    contatore = iter(range(richieste))
+
+    async def client():
+        nonlocal errori
+        reader, writer = await asyncio.open_connection(host, porta)
+        try:
+            for _ in contatore:
+                inizio = time.perf_counter()
+                if dimensione_batch == 1:
+                    stato, _ = await invia(reader, writer, host, 'POST', '/predict', {'istanza': ESEMPIO_ISTANZA})
+                else:
+                    stato, _ = await invia(reader, writer, host, 'POST', '/predict_batch',
+                                           {'istanze': [ESEMPIO_ISTANZA] * dimensione_batch})
+                latenze.append(time.perf_counter() - inizio)
+                if stato != 200:
+                    errori += 1
+        finally:
+            writer.close()
+
+    inizio = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concorrenza)))
+    durata = time.perf_counter() - inizio
+
+    reader, writer = await asyncio.open_connection(host, porta)
+    _, metriche_server = await invia(reader, writer, host, 'GET', '/metrics')
+    writer.close()
+
+    latenze = np.array(latenze) * 1000
+    return {
+        'richieste': len(latenze),
+        'errori': errori,
+        'concorrenza': concorrenza,
+        'durata_secondi': round(durata, 3),
+        'richieste_al_secondo': round(len(latenze) / durata, 1),
+        'righe_al_secondo': round(len(latenze) * dimensione_batch / durata, 1),
+        'latenza_p50_ms': round(float(np.percentile(latenze, 50)), 3),
+        'latenza_p99_ms': round(float(np.percentile(latenze, 99)), 3),
+        'server': metriche_server,
+    }
+
+def stampa_carico(report):
+    print(f"\n📊 Risultati del carico ({report['richieste']} richieste, concorrenza {report['concorrenza']})")
+    print(f"  - Durata: {report['durata_secondi']:.2f} s")
+    print(f"  - Throughput: {report['richieste_al_secondo']:,.0f} richieste/s ({report['righe_al_secondo']:,.0f} righe/s)")
+    print(f"  - Latenza client: p50 {report['latenza_p50_ms']:.2f} ms, p99 {report['latenza_p99_ms']:.2f} ms")
+    print(f"  - Errori: {report['errori']}")
+    server = report['server']
+    print(f"  - Dimensione media micro-batch lato server: {server['dimensione_media_batch']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servizio HTTP di predizione della personalità")
+    sotto = parser.add_subparsers(dest="comando", required=True)
+
+    p_serve = sotto.add_parser("serve", help="Avvia il servizio")
+    p_serve.add_argument("--modello", "-m", default="modello_personalita.pkl", help="File joblib del modello")
+    p_serve.add_argument("--onnx", help="Usa questa sessione ONNX (input float) per l'inferenza")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--porta", "-p", type=int, default=8080)
+    p_serve.add_argument("--max-batch", type=int, default=64, help="Istanze massime per micro-batch")
+    p_serve.add_argument("--max-ritardo-ms", type=float, default=2.0,
+                         help="Attesa massima prima di eseguire un micro-batch incompleto")
+
+    p_carico = sotto.add_parser("carico", help="Genera carico verso un servizio in esecuzione")
+    p_carico.add_argument("--host", default="127.0.0.1")
+    p_carico.add_argument("--porta", "-p", type=int, default=8080)
+    p_carico.add_argument("--richieste", "-n", type=int, default=5000)
+    p_carico.add_argument("--concorrenza", "-c", type=int, default=64)
+    p_carico.add_argument("--batch", type=int, default=1,
+                          help="Istanze per richiesta (oltre 1 usa /predict_batch)")
+    p_carico.add_argument("--json", metavar="FILE", help="Salva il report in JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "serve":
+        try:
+            predittore = Predittore(args.modello, args.onnx)
+        except Exception as e:
+            print(f"[ERRORE] Impossibile caricare il modello: {e}")
+            return 4
+        servizio = ServizioPredizioni(predittore, args.max_batch, args.max_ritardo_ms / 1000)
+        try:
+            asyncio.run(servizio.avvia(args.host, args.porta))
+        except KeyboardInterrupt:
+            print("\n👋 Servizio arrestato")
+        return 0
+
+    try:
+        report = asyncio.run(genera_carico(args.host, args.porta, args.richieste, args.concorrenza, args.batch))
+    except OSError as e:
+        print(f"[ERRORE] Servizio non raggiungibile su {args.host}:{args.porta}: {e}")
+        return 1
+    stampa_carico(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Report salvato in: {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
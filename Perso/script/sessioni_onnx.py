@@ -0,0 +1,127 @@
+"""
+Gestione condivisa delle sessioni ONNX Runtime.
+
+Ogni modello viene caricato (e ottimizzato) una sola volta: la sessione resta in
+cache, indicizzata per percorso e mtime del file, e viene ricreata solo se il file
+cambia. predict_batch è thread-safe e registra separatamente la latenza di
+caricamento, della prima chiamata e delle ultime FINESTRA_LATENZE chiamate a regime.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import onnxruntime as ort
+
+# Latenze a regime conservate per sessione: le statistiche riguardano le chiamate recenti
+FINESTRA_LATENZE = 10_000
+
+def crea_opzioni_sessione(thread_intra=0, thread_inter=0, arena_memoria=True,
+                          livello_ottimizzazione=ort.GraphOptimizationLevel.ORT_ENABLE_ALL):
+    """SessionOptions esplicite (0 thread = scelta automatica di ONNX Runtime)"""
+    opzioni = ort.SessionOptions()
+    opzioni.graph_optimization_level = livello_ottimizzazione
+    opzioni.intra_op_num_threads = thread_intra
+    opzioni.inter_op_num_threads = thread_inter
+    opzioni.enable_cpu_mem_arena = arena_memoria
+    opzioni.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    return opzioni
+
+class SessioneModello:
+    """Sessione caricata con le relative misure di latenza"""
+
+    def __init__(self, percorso, mtime, opzioni):
+        inizio = time.perf_counter()
+        self.sessione = ort.InferenceSession(percorso, sess_options=opzioni,
+                                             providers=['CPUExecutionProvider'])
+        self.latenza_caricamento = time.perf_counter() - inizio
+
+        self.percorso = percorso
+        self.mtime = mtime
+        self.nome_input = self.sessione.get_inputs()[0].name
+        self.nomi_output = [out.name for out in self.sessione.get_outputs()]
+        self.latenza_prima_chiamata = None
+        self.latenze = deque(maxlen=FINESTRA_LATENZE)
+        self.chiamate = 0
+        self._lock = threading.Lock()
+
+    def esegui(self, X):
+        """Esegue il grafo su una matrice (input unico) o su un dizionario {nome input: array}"""
+        feed = X if isinstance(X, dict) else {self.nome_input: X}
+        inizio = time.perf_counter()
+        risultato = self.sessione.run(None, feed)
+        durata = time.perf_counter() - inizio
+
+        with self._lock:
+            if self.latenza_prima_chiamata is None:
+                self.latenza_prima_chiamata = durata
+            else:
+                self.latenze.append(durata)
+                self.chiamate += 1
+        return risultato
+
+    def statistiche(self):
+        """Latenze in millisecondi: caricamento, prima chiamata e ultime chiamate a regime"""
+        with self._lock:
+            latenze = np.array(self.latenze) * 1000
+            chiamate = self.chiamate
+        return {
+            'percorso': self.percorso,
+            'caricamento_ms': self.latenza_caricamento * 1000,
+            'prima_chiamata_ms': self.latenza_prima_chiamata * 1000 if self.latenza_prima_chiamata else None,
+            'chiamate_a_regime': chiamate,
+            'regime_media_ms': float(latenze.mean()) if len(latenze) else None,
+            'regime_p50_ms': float(np.percentile(latenze, 50)) if len(latenze) else None,
+            'regime_p99_ms': float(np.percentile(latenze, 99)) if len(latenze) else None,
+        }
+
+class GestoreSessioni:
+    """Cache thread-safe di sessioni ONNX indicizzate per percorso e mtime"""
+
+    def __init__(self, opzioni=None):
+        self.opzioni = opzioni or crea_opzioni_sessione()
+        self._sessioni = {}
+        self._lock = threading.Lock()
+
+    def sessione(self, percorso):
+        """Restituisce la sessione del modello, caricandola solo se assente o se il file è cambiato"""
+        percorso = os.path.abspath(percorso)
+        mtime = os.stat(percorso).st_mtime_ns
+        with self._lock:
+            corrente = self._sessioni.get(percorso)
+            if corrente is None or corrente.mtime != mtime:
+                corrente = SessioneModello(percorso, mtime, self.opzioni)
+                self._sessioni[percorso] = corrente
+            return corrente
+
+    def predict_batch(self, percorso, X):
+        """Predizione su un batch: restituisce (etichette, probabilità)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        etichette, probabilita = self.sessione(percorso).esegui(X)[:2]
+        return etichette, probabilita
+
+    def statistiche(self):
+        with self._lock:
+            return [s.statistiche() for s in self._sessioni.values()]
+
+    def svuota(self):
+        with self._lock:
+            self._sessioni.clear()
+
+# Gestore condiviso dal processo
+GESTORE_SESSIONI = GestoreSessioni()
+
+def stampa_statistiche(gestore=GESTORE_SESSIONI):
+    """Stampa le latenze di tutte le sessioni caricate"""
+    for s in gestore.statistiche():
+        print(f"⏱️  {os.path.basename(s['percorso'])}")
+        print(f"  - Caricamento: {s['caricamento_ms']:.2f} ms")
+        if s['prima_chiamata_ms'] is not None:
+            print(f"  - Prima chiamata: {s['prima_chiamata_ms']:.3f} ms")
+        if s['chiamate_a_regime']:
+            print(f"  - A regime ({s['chiamate_a_regime']} chiamate): media {s['regime_media_ms']:.3f} ms, "
+                  f"p50 {s['regime_p50_ms']:.3f} ms, p99 {s['regime_p99_ms']:.3f} ms")
@@ -1,55 +1,36 @@
-import pandas as pd
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 
-# Leggi il file CSV
-file_path = "/home/ema/Scrivania/archive/personality_datasert.csv"
-df = pd.read_csv(file_path)
+# Motore statistico condiviso (cartella superiore)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from statistiche import TUTTI, calcola_statistiche, stampa_report
 
-# Pulisci i dati: converti valori strani in NaN e poi rimuovili
-df['Friends_circle_size'] = pd.to_numeric(df['Friends_circle_size'], errors='coerce')
-df_clean = df.dropna(subset=['Friends_circle_size'])
+# Leggi il file CSV (percorso opzionale da riga di comando)
+file_path = sys.argv[1] if len(sys.argv) > 1 else "/home/ema/Scrivania/archive/personality_datasert.csv"
+statistiche = calcola_statistiche(file_path)
 
-# Arrotonda i valori decimali a numeri interi (potrebbero essere errori di lettura)
-df_clean['Friends_circle_size'] = df_clean['Friends_circle_size'].round().astype(int)
+# Distribuzione di Friends_circle_size (valori arrotondati a interi)
+stampa_report(statistiche, ['distribuzione_amici'])
 
-# Conta i livelli di Friends_circle_size
-friends_counts = df_clean['Friends_circle_size'].value_counts().sort_index()
-
-# Calcola il totale
-total = len(df_clean)
-total_original = len(df)
-
-# Stampa i risultati
-print(f"Totale persone nel dataset originale: {total_original}")
-print(f"Persone con dati validi per Friends_circle_size: {total}")
-if total_original != total:
-    print(f"Righe scartate per dati invalidi: {total_original - total}")
-
-print("\nDistribuzione Friends_circle_size:")
-print("-" * 40)
-
-total_percentage = 0
-for size, count in friends_counts.items():
-    percentage = (count / total) * 100
-    total_percentage += percentage
-    print(f"Dimensione {size}: {count} persone ({percentage:.1f}%)")
-
-print("-" * 40)
-print(f"Verifica totale: {total_percentage:.1f}%")
+istogramma = statistiche['istogrammi']['Friends_circle_size'][TUTTI]
+valori = np.array([int(v) for v in istogramma], dtype=float)
+conteggi = np.array(list(istogramma.values()), dtype=float)
+descrittive = statistiche['descrittive'][TUTTI]['Friends_circle_size']
+total = descrittive['n']
 
 # Crea il grafico
 plt.figure(figsize=(10, 6))
 
-# Istogramma dei dati
-plt.hist(df_clean['Friends_circle_size'], bins=range(int(df_clean['Friends_circle_size'].min()), 
-                                                   int(df_clean['Friends_circle_size'].max()) + 2), 
-         density=True, alpha=0.7, color='skyblue', edgecolor='black', label='Dati osservati')
+# Istogramma dei dati (densità per valore intero, già aggregata)
+plt.bar(valori, conteggi / conteggi.sum(), width=1.0, align='edge',
+        alpha=0.7, color='skyblue', edgecolor='black', label='Dati osservati')
 
 # Curva gaussiana di best fit
-mu = df_clean['Friends_circle_size'].mean()
-sigma = df_clean['Friends_circle_size'].std()
-x = np.linspace(df_clean['Friends_circle_size'].min(), df_clean['Friends_circle_size'].max(), 100)
+mu = descrittive['media']
+sigma = descrittive['std']
+x = np.linspace(valori.min(), valori.max(), 100)
 y = (1/(sigma * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((x - mu) / sigma) ** 2)
 
 plt.plot(x, y, 'r-', linewidth=2, label=f'Curva gaussiana (μ={mu:.1f}, σ={sigma:.1f})')
@@ -0,0 +1,366 @@
+"""
+Motore statistico a passata singola sul dataset di personalità.
+
+Calcola in un'unica lettura a blocchi tutte le statistiche degli script stat/1-4:
+conteggi per classe, persone con zero amici, media/deviazione standard/mediana/
+min/max per classe, percentuali di "Yes", istogrammi e test t di Student.
+Ogni blocco produce aggregati parziali (conteggi, somme, somme dei quadrati,
+istogrammi dei valori arrotondati) che vengono poi fusi: la memoria non dipende
+dalla dimensione del file.
+
+Come negli script originali, media, deviazione standard, mediana, min/max e test t
+sono calcolati sui valori arrotondati all'intero; solo le medie del confronto
+(stat/4.py) usano i valori grezzi ('media_grezza').
+
+Uso: python statistiche.py dati.csv [--json statistiche.json] [--sezioni conteggi confronto]
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from caricamento_dati import leggi_blocchi_dataset
+from schema_questionario import COLONNE_SI_NO
+
+try:
+    from scipy import stats
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+COLONNE_NUMERICHE = ['Time_spent_Alone', 'Social_event_attendance', 'Going_outside',
+                     'Friends_circle_size', 'Post_frequency']
+
+# Etichetta per le righe senza 'Personality' (contano nei totali, non nelle classi)
+SENZA_CLASSE = 'N/D'
+TUTTI = 'Tutti'
+
+SEZIONI = ['conteggi', 'distribuzione_amici', 'amici_per_personalita', 'confronto']
+
+class AggregatoStatistiche:
+    """Aggregati parziali per blocco, fusi alla fine in un unico riepilogo"""
+
+    def __init__(self):
+        self.righe = 0
+        self.colonne = None
+        self.anteprima = None
+        self.momenti = []
+        self.istogrammi = []
+        self.conteggi_si = []
+        self.zero_amici = []
+
+    def aggiorna(self, blocco):
+        if self.colonne is None:
+            self.colonne = list(blocco.columns)
+            self.anteprima = blocco.head()
+        self.righe += len(blocco)
+
+        classe = blocco['Personality'].astype(object).fillna(SENZA_CLASSE).rename('Personality')
+        numeriche = blocco[[c for c in COLONNE_NUMERICHE if c in blocco.columns]].astype(np.float64)
+        # + 0.0 normalizza il -0.0 prodotto dall'arrotondamento di valori in (-0.5, 0)
+        arrotondate = numeriche.round() + 0.0
+
+        # Conteggio, somma, somma dei quadrati, min e max per classe in un solo groupby,
+        # più la somma dei valori grezzi per le medie del confronto
+        tabella = pd.concat([arrotondate, arrotondate.pow(2).add_suffix('__q'),
+                             numeriche.add_suffix('__grezzo')], axis=1)
+        aggregazioni = {c: ['count', 'sum', 'min', 'max'] for c in numeriche.columns}
+        aggregazioni.update({f"{c}__q": ['sum'] for c in numeriche.columns})
+        aggregazioni.update({f"{c}__grezzo": ['sum'] for c in numeriche.columns})
+        momenti = tabella.groupby(classe).agg(aggregazioni)
+        momenti[('righe', 'count')] = classe.value_counts()
+        self.momenti.append(momenti)
+
+        # Istogrammi dei valori arrotondati (colonna, classe, valore) -> conteggio
+        lunghi = arrotondate.assign(Personality=classe).melt(id_vars='Personality').dropna()
+        self.istogrammi.append(lunghi.groupby(['variable', 'Personality', 'value']).size())
+
+        colonne_si_no = [c for c in COLONNE_SI_NO if c in blocco.columns]
+        self.conteggi_si.append((blocco[colonne_si_no] == 'Yes').groupby(classe).sum())
+
+        if 'Friends_circle_size' in blocco.columns:
+            self.zero_amici.append((blocco['Friends_circle_size'] == 0).groupby(classe).sum())
+
+    def risultato(self):
+        """Fonde i parziali e calcola le statistiche finali in una struttura serializzabile in JSON"""
+        momenti = pd.concat(self.momenti)
+        colonne_min = [c for c in momenti.columns if c[1] == 'min']
+        colonne_max = [c for c in momenti.columns if c[1] == 'max']
+        colonne_somma = [c for c in momenti.columns if c[1] in ('count', 'sum')]
+        momenti = pd.concat([
+            momenti[colonne_somma].groupby(level=0).sum(),
+            momenti[colonne_min].groupby(level=0).min(),
+            momenti[colonne_max].groupby(level=0).max(),
+        ], axis=1)
+        # Riga complessiva su tutte le classi
+        totale = pd.concat([
+            momenti[colonne_somma].sum(),
+            momenti[colonne_min].min(),
+            momenti[colonne_max].max(),
+        ])
+        momenti.loc[TUTTI] = totale[momenti.columns]
+
+        istogrammi = pd.concat(self.istogrammi).groupby(level=[0, 1, 2]).sum()
+        istogramma_totale = istogrammi.groupby(level=[0, 2]).sum()
+
+        classi = [c for c in momenti.index if c != TUTTI]
+        conteggi_classe = {c: int(momenti.loc[c, ('righe', 'count')]) for c in classi if c != SENZA_CLASSE}
+
+        descrittive = {}
+        for gruppo in classi + [TUTTI]:
+            descrittive[gruppo] = {}
+            for col in COLONNE_NUMERICHE:
+                if (col, 'count') not in momenti.columns:
+                    continue
+                if gruppo == TUTTI:
+                    isto = sotto_istogramma(istogramma_totale, col)
+                else:
+                    isto = sotto_istogramma(istogrammi, (col, gruppo))
+                descrittive[gruppo][col] = descrivi(momenti.loc[gruppo], col, isto)
+
+        si = pd.concat(self.conteggi_si).groupby(level=0).sum() if self.conteggi_si else pd.DataFrame()
+        percentuali_si = {
+            classe: {
+                col: {
+                    'si': int(si.loc[classe, col]),
+                    'totale': conteggi_classe[classe],
+                    'percentuale': percentuale(si.loc[classe, col], conteggi_classe[classe])
+                }
+                for col in si.columns
+            }
+            for classe in conteggi_classe if classe in si.index
+        }
+
+        zero = pd.concat(self.zero_amici).groupby(level=0).sum() if self.zero_amici else pd.Series(dtype='int64')
+        zero_amici = {classe: int(zero.get(classe, 0)) for classe in conteggi_classe}
+
+        return {
+            'righe': self.righe,
+            'colonne': self.colonne,
+            'anteprima': json.loads(self.anteprima.to_json(orient='records', force_ascii=False)),
+            'classi': conteggi_classe,
+            'zero_amici': zero_amici,
+            'descrittive': descrittive,
+            'percentuali_si': percentuali_si,
+            'istogrammi': {
+                col: {
+                    **{classe: istogramma_dict(sotto_istogramma(istogrammi, (col, classe)))
+                       for classe in conteggi_classe},
+                    TUTTI: istogramma_dict(sotto_istogramma(istogramma_totale, col)),
+                }
+                for col in istogramma_totale.index.get_level_values(0).unique()
+            },
+            't_test': test_t(descrittive, 'Friends_circle_size'),
+        }
+
+def sotto_istogramma(istogrammi, chiave):
+    """Istogramma valore -> conteggio per una colonna (e classe), vuoto se assente"""
+    try:
+        return istogrammi.loc[chiave]
+    except KeyError:
+        return pd.Series(dtype='int64')
+
+def descrivi(riga, col, istogramma):
+    """Statistiche descrittive di una colonna a partire dagli aggregati fusi"""
+    n = int(riga[(col, 'count')])
+    somma = riga[(col, 'sum')]
+    somma_q = riga[(f"{col}__q", 'sum')]
+    media = float(somma / n) if n else None
+    media_grezza = float(riga[(f"{col}__grezzo", 'sum')] / n) if n else None
+    std = float(np.sqrt(max(somma_q - somma ** 2 / n, 0) / (n - 1))) if n > 1 else None
+    return {
+        'n': n,
+        'media': media,
+        'media_grezza': media_grezza,
+        'std': std,
+        'mediana': mediana_da_istogramma(istogramma),
+        'min': float(riga[(col, 'min')]) if n else None,
+        'max': float(riga[(col, 'max')]) if n else None,
+    }
+
+def mediana_da_istogramma(istogramma):
+    """Mediana esatta dei valori arrotondati (media dei due centrali se il totale è pari)"""
+    if istogramma.empty:
+        return None
+    istogramma = istogramma.sort_index()
+    cumulata = istogramma.cumsum().to_numpy()
+    valori = istogramma.index.to_numpy(dtype=np.float64)
+    n = cumulata[-1]
+    basso = valori[np.searchsorted(cumulata, (n - 1) // 2 + 1)]
+    alto = valori[np.searchsorted(cumulata, n // 2 + 1)]
+    return float((basso + alto) / 2)
+
+def istogramma_dict(istogramma):
+    return {str(int(valore)): int(conteggio) for valore, conteggio in istogramma.sort_index().items()}
+
+def percentuale(parte, totale):
+    return float(parte / totale * 100) if totale else 0.0
+
+def test_t(descrittive, col, classi=('Introvert', 'Extrovert')):
+    """Test t di Student a varianze uguali calcolato dalle statistiche aggregate"""
+    a, b = (descrittive.get(classe, {}).get(col) for classe in classi)
+    if not a or not b or a['n'] <= 10 or b['n'] <= 10 or not SCIPY_AVAILABLE:
+        return None
+    t_stat, p_value = stats.ttest_ind_from_stats(a['media'], a['std'], a['n'],
+                                                 b['media'], b['std'], b['n'], equal_var=True)
+    return {'colonna': col, 'classi': list(classi), 't': float(t_stat), 'p': float(p_value)}
+
+def calcola_statistiche(percorso_file, dimensione_blocco=1_000_000):
+    """Calcola tutte le statistiche in una sola passata a blocchi sul file"""
+    aggregato = AggregatoStatistiche()
+    for blocco in leggi_blocchi_dataset(percorso_file, dimensione_blocco):
+        aggregato.aggiorna(blocco)
+    return aggregato.risultato()
+
+def stampa_conteggi(s):
+    """Distribuzione delle personalità e analisi delle persone con zero amici (stat/1.py)"""
+    totale = s['righe']
+    introversi = s['classi'].get('Introvert', 0)
+    estroversi = s['classi'].get('Extrovert', 0)
+    perc_i = percentuale(introversi, totale)
+    perc_e = percentuale(estroversi, totale)
+    print(f"Totale persone analizzate: {totale}")
+    print(f"Introversi: {introversi} ({perc_i:.1f}%)")
+    print(f"Estroversi: {estroversi} ({perc_e:.1f}%)")
+    print(f"Verifica: {perc_i + perc_e:.1f}%")
+    print()
+
+    zero_i = s['zero_amici'].get('Introvert', 0)
+    zero_e = s['zero_amici'].get('Extrovert', 0)
+    totale_zero = zero_i + zero_e
+    perc_zi = percentuale(zero_i, totale_zero)
+    perc_ze = percentuale(zero_e, totale_zero)
+    print("ANALISI PERSONE CON ZERO AMICI:")
+    print(f"Totale persone con 0 amici: {totale_zero}")
+    print(f"Introversi con 0 amici: {zero_i} ({perc_zi:.1f}%)")
+    print(f"Estroversi con 0 amici: {zero_e} ({perc_ze:.1f}%)")
+    print(f"Verifica: {perc_zi + perc_ze:.1f}%")
+
+def stampa_distribuzione_amici(s):
+    """Distribuzione di Friends_circle_size su tutto il dataset (stat/2.py)"""
+    istogramma = s['istogrammi']['Friends_circle_size'][TUTTI]
+    validi = sum(istogramma.values())
+    print(f"Totale persone nel dataset originale: {s['righe']}")
+    print(f"Persone con dati validi per Friends_circle_size: {validi}")
+    if s['righe'] != validi:
+        print(f"Righe scartate per dati invalidi: {s['righe'] - validi}")
+
+    print("\nDistribuzione Friends_circle_size:")
+    print("-" * 40)
+    totale_percentuale = 0
+    for dimensione, conteggio in istogramma.items():
+        perc = percentuale(conteggio, validi)
+        totale_percentuale += perc
+        print(f"Dimensione {dimensione}: {conteggio} persone ({perc:.1f}%)")
+    print("-" * 40)
+    print(f"Verifica totale: {totale_percentuale:.1f}%")
+
+def stampa_amici_per_personalita(s):
+    """Friends_circle_size per introversi ed estroversi con test t (stat/3.py)"""
+    print("=" * 50)
+    print("ANALISI FRIENDS_CIRCLE_SIZE PER PERSONALITÀ")
+    print("=" * 50)
+    introversi = s['descrittive'].get('Introvert', {}).get('Friends_circle_size')
+    estroversi = s['descrittive'].get('Extrovert', {}).get('Friends_circle_size')
+    n_i = introversi['n'] if introversi else 0
+    n_e = estroversi['n'] if estroversi else 0
+    print(f"Totale persone analizzate: {n_i + n_e}")
+    print(f"Introversi: {n_i} persone")
+    print(f"Estroversi: {n_e} persone")
+
+    for titolo, d in (("INTROVERSI", introversi), ("ESTROVERSI", estroversi)):
+        if not d or not d['n']:
+            continue
+        print(f"\nSTATISTICHE {titolo}:")
+        print(f"Media: {d['media']:.1f}")
+        print(f"Deviazione standard: {d['std']:.1f}" if d['std'] is not None else "Deviazione standard: N/D")
+        print(f"Mediana: {d['mediana']:.1f}")
+        print(f"Min: {d['min']:.0f}, Max: {d['max']:.0f}")
+
+    test = s['t_test']
+    if test:
+        print("\nTEST T-STUDENT:")
+        print(f"T-statistic: {test['t']:.3f}")
+        print(f"P-value: {test['p']:.3f}")
+        if test['p'] < 0.05:
+            print("Differenza statisticamente significativa (p < 0.05)")
+        else:
+            print("Differenza NON statisticamente significativa (p >= 0.05)")
+    else:
+        print("\nDati insufficienti per il test statistico (serve scipy: pip install scipy)")
+
+def stampa_confronto(s):
+    """Medie e percentuali Yes per personalità con confronto diretto (stat/4.py)"""
+    print("=== INFORMAZIONI SUL DATASET ===")
+    print(f"Numero totale di righe: {s['righe']}")
+    print(f"Colonne: {s['colonne']}")
+    print("\nPrime righe del dataset:")
+    print(pd.DataFrame(s['anteprima']))
+
+    print("\n=== DISTRIBUZIONE PERSONALITÀ ===")
+    for classe, conteggio in sorted(s['classi'].items(), key=lambda x: -x[1]):
+        print(f"{classe}: {conteggio}")
+
+    for classe, titolo in (('Extrovert', 'ESTROVERSI'), ('Introvert', 'INTROVERSI')):
+        print(f"\n=== MEDIE PER {titolo} ===")
+        for col, d in s['descrittive'].get(classe, {}).items():
+            if d['media_grezza'] is not None:
+                print(f"{col}: {d['media_grezza']:.2f}")
+
+    for classe, titolo in (('Extrovert', 'ESTROVERSI'), ('Introvert', 'INTROVERSI')):
+        print(f"\n=== PERCENTUALI PER {titolo} ===")
+        for col, d in s['percentuali_si'].get(classe, {}).items():
+            print(f"{col} (Yes): {d['percentuale']:.1f}% ({d['si']}/{d['totale']})")
+
+    print("\n=== CONFRONTO DIRETTO ===")
+    print(f"{'Caratteristica':<25} {'Estroversi':<12} {'Introversi':<12} {'Differenza':<12}")
+    print("-" * 65)
+    estroversi = s['descrittive'].get('Extrovert', {})
+    introversi = s['descrittive'].get('Introvert', {})
+    for col in COLONNE_NUMERICHE:
+        if col in estroversi and col in introversi and estroversi[col]['media_grezza'] is not None \
+                and introversi[col]['media_grezza'] is not None:
+            ext_mean = estroversi[col]['media_grezza']
+            int_mean = introversi[col]['media_grezza']
+            print(f"{col:<25} {ext_mean:<12.2f} {int_mean:<12.2f} {ext_mean - int_mean:<+12.2f}")
+
+STAMPE = {
+    'conteggi': stampa_conteggi,
+    'distribuzione_amici': stampa_distribuzione_amici,
+    'amici_per_personalita': stampa_amici_per_personalita,
+    'confronto': stampa_confronto,
+}
+
+def stampa_report(statistiche, sezioni=SEZIONI):
+    """Stampa il report testuale delle sezioni richieste"""
+    for i, sezione in enumerate(sezioni):
+        if i:
+            print()
+        STAMPE[sezione](statistiche)
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistiche del dataset di personalità in una sola passata")
+    parser.add_argument("dati", help="File CSV con colonna 'Personality'")
+    parser.add_argument("--json", metavar="FILE", help="Salva le statistiche in JSON ('-' per lo standard output)")
+    parser.add_argument("--sezioni", nargs='+', choices=SEZIONI, default=SEZIONI,
+                        help="Sezioni del report testuale")
+    parser.add_argument("--blocco", "-b", type=int, default=1_000_000, help="Numero di righe per blocco")
+    args = parser.parse_args()
+
+    statistiche = calcola_statistiche(args.dati, args.blocco)
+
+    if args.json == '-':
+        print(json.dumps(statistiche, ensure_ascii=False, indent=2))
+        return 0
+
+    stampa_report(statistiche, args.sezioni)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(statistiche, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Statistiche salvate in: {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,264 @@
+"""
+Tabella precalcolata delle predizioni sullo spazio discreto del questionario.
+
+Il questionario accetta solo interi in intervalli piccoli e due risposte Sì/No:
+12 x 2 x 11 x 8 x 2 x 16 x 11 = 743.424 combinazioni. Per un modello si calcolano
+una volta classe e probabilità di tutte le combinazioni e le si salva come array
+.npy non compressi; le predizioni successive sono una lookup O(1) nell'array
+aperto in memory-map (circa 6 MB per due classi).
+
+Le tabelle stanno in <registro>/tabelle/<versione>/, dove la versione è l'hash
+del modello joblib (lo stesso identificativo del registro), oppure in
+.perso_cache/predizioni/ per un modello fuori dal registro. Un modello nuovo non
+trova la tabella e la ricostruisce. Nel registro vengono poi rimosse solo le
+tabelle delle versioni non più in uso: la corrente e le promozioni precedenti
+dello storico restano, così un rollback ritrova la propria tabella. Fuori dal
+registro non si rimuove nulla, perché non si sa quali versioni servano ad altri
+processi. Le risposte fuori dal dominio (es. inserimento manuale con decimali)
+restano al modello.
+
+L'import richiede solo numpy: pandas serve solo per costruire la tabella.
+
+Uso:
+  python tabella_predizioni.py --registro registro_modelli
+  python tabella_predizioni.py --modello modello_personalita.pkl --prove 100000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from schema_questionario import COLONNE_FEATURE, COLONNE_SI_NO, varianti_si_no
+
+# Per i modelli fuori dal registro: stessa cartella della cache colonnare di caricamento_dati.py
+CARTELLA_TABELLE = os.path.join('.perso_cache', 'predizioni')
+VERSIONE_FORMATO = 1
+
+# Valori ammessi dal questionario: da 0 a n-1 (Sì/No codificati 0/1), nell'ordine delle feature
+DOMINIO_QUESTIONARIO = {
+    'Time_spent_Alone': 12,
+    'Stage_fear': 2,
+    'Social_event_attendance': 11,
+    'Going_outside': 8,
+    'Drained_after_socializing': 2,
+    'Friends_circle_size': 16,
+    'Post_frequency': 11,
+}
+
+DIMENSIONI = tuple(DOMINIO_QUESTIONARIO[col] for col in COLONNE_FEATURE)
+# Passo di ogni colonna nell'indice lineare (ordine C, come np.ravel_multi_index)
+PASSI = tuple(int(np.prod(DIMENSIONI[i + 1:])) for i in range(len(DIMENSIONI)))
+N_COMBINAZIONI = int(np.prod(DIMENSIONI))
+
+MAPPA_SI_NO = varianti_si_no()
+
+def griglia_risposte(inizio=0, fine=N_COMBINAZIONI):
+    """Righe codificate (float32, colonne COLONNE_FEATURE) per gli indici lineari [inizio, fine)"""
+    indici = np.unravel_index(np.arange(inizio, fine), DIMENSIONI)
+    return np.stack(indici, axis=1).astype(np.float32)
+
+def indice_risposte(dati):
+    """Indice lineare delle risposte, o None se anche una sola è fuori dal dominio del questionario"""
+    indice = 0
+    for col, passo in zip(COLONNE_FEATURE, PASSI):
+        valore = dati.get(col)
+        # Sì/No testuali; le risposte già codificate 0/1 seguono la via numerica
+        if col in COLONNE_SI_NO and isinstance(valore, str):
+            testo = valore.strip()
+            codice = MAPPA_SI_NO.get(testo, MAPPA_SI_NO.get(testo.lower()))
+        else:
+            try:
+                numero = float(valore)
+            except (TypeError, ValueError):
+                return None
+            codice = int(numero) if numero.is_integer() else None
+        if codice is None or not 0 <= codice < DOMINIO_QUESTIONARIO[col]:
+            return None
+        indice += codice * passo
+    return indice
+
+def cartella_tabella(versione, radice=CARTELLA_TABELLE):
+    return os.path.join(radice, versione)
+
+class TabellaPredizioni:
+    """Classi e probabilità precalcolate di un modello, aperte in memory-map"""
+
+    def __init__(self, cartella):
+        with open(os.path.join(cartella, 'metadati.json'), encoding='utf-8') as f:
+            self.metadati = json.load(f)
+        self.versione = self.metadati['versione']
+        self.classi = np.array(self.metadati['classi'], dtype=object)
+        self.probabilita = np.load(os.path.join(cartella, 'probabilita.npy'), mmap_mode='r')
+        self.etichette = np.load(os.path.join(cartella, 'etichette.npy'), mmap_mode='r')
+
+    @classmethod
+    def carica(cls, versione, radice=CARTELLA_TABELLE):
+        """Tabella della versione indicata, o None se manca o è di un formato/dominio diverso"""
+        cartella = cartella_tabella(versione, radice)
+        if not os.path.exists(os.path.join(cartella, 'metadati.json')):
+            return None
+        tabella = cls(cartella)
+        if (tabella.metadati.get('formato') != VERSIONE_FORMATO
+                or tabella.metadati.get('dominio') != DOMINIO_QUESTIONARIO
+                or tabella.probabilita.shape[0] != N_COMBINAZIONI):
+            return None
+        return tabella
+
+    def prevedi(self, dati):
+        """(classe, probabilità) per un dizionario di risposte, o None se fuori dal dominio"""
+        indice = indice_risposte(dati)
+        if indice is None:
+            return None
+        return self.classi[self.etichette[indice]], np.asarray(self.probabilita[indice])
+
+def costruisci_tabella(modello, versione, radice=CARTELLA_TABELLE, dimensione_blocco=100_000):
+    """Calcola classe e probabilità di tutte le combinazioni e le salva in modo atomico"""
+    import pandas as pd
+
+    os.makedirs(radice, exist_ok=True)
+    classi = [str(c) for c in modello.classes_]
+    inizio = time.perf_counter()
+
+    temporanea = tempfile.mkdtemp(prefix='.nuova-', dir=radice)
+    try:
+        probabilita = np.lib.format.open_memmap(os.path.join(temporanea, 'probabilita.npy'), mode='w+',
+                                                dtype=np.float32, shape=(N_COMBINAZIONI, len(classi)))
+        etichette = np.lib.format.open_memmap(os.path.join(temporanea, 'etichette.npy'), mode='w+',
+                                              dtype=np.uint8, shape=(N_COMBINAZIONI,))
+        posizione_classe = {c: i for i, c in enumerate(modello.classes_)}
+
+        for primo in range(0, N_COMBINAZIONI, dimensione_blocco):
+            ultimo = min(primo + dimensione_blocco, N_COMBINAZIONI)
+            # Colonne numeriche già codificate: il preprocessore del modello le lascia invariate
+            blocco = pd.DataFrame(griglia_risposte(primo, ultimo), columns=COLONNE_FEATURE)
+            probabilita[primo:ultimo] = modello.predict_proba(blocco)
+            # predict e non argmax: con la SVC le due possono differire vicino al confine
+            etichette[primo:ultimo] = [posizione_classe[c] for c in modello.predict(blocco)]
+
+        probabilita.flush()
+        etichette.flush()
+        del probabilita, etichette
+
+        durata = time.perf_counter() - inizio
+        metadati = {
+            'versione': versione,
+            'formato': VERSIONE_FORMATO,
+            'classi': classi,
+            'dominio': DOMINIO_QUESTIONARIO,
+            'combinazioni': N_COMBINAZIONI,
+            'tempo_costruzione_secondi': round(durata, 2),
+        }
+        with open(os.path.join(temporanea, 'metadati.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadati, f, ensure_ascii=False, indent=2)
+
+        destinazione = cartella_tabella(versione, radice)
+        if os.path.exists(destinazione):
+            shutil.rmtree(destinazione)
+        os.replace(temporanea, destinazione)
+        print(f"🗂️  Tabella delle predizioni costruita: {N_COMBINAZIONI:,} combinazioni in {durata:.1f}s")
+        return destinazione
+    finally:
+        if os.path.exists(temporanea):
+            shutil.rmtree(temporanea)
+
+def pulisci_tabelle_obsolete(versioni_da_conservare, radice=CARTELLA_TABELLE):
+    """Rimuove le tabelle delle versioni che non sono tra quelle da conservare"""
+    if not os.path.isdir(radice):
+        return
+    for nome in os.listdir(radice):
+        if nome not in versioni_da_conservare and not nome.startswith('.'):
+            shutil.rmtree(os.path.join(radice, nome), ignore_errors=True)
+
+def tabella_per_modello(modello, versione, radice=CARTELLA_TABELLE, registro=None):
+    """Tabella della versione del modello, costruita se manca o non è più valida.
+
+    Con un registro (RegistroModelli) la tabella sta nella sua cartella e, dopo una
+    costruzione, si rimuovono le tabelle delle versioni non più in uso nel registro.
+    """
+    if registro is not None:
+        radice = registro.cartella_tabelle
+    tabella = TabellaPredizioni.carica(versione, radice)
+    if tabella is None:
+        costruisci_tabella(modello, versione, radice)
+        if registro is not None:
+            pulisci_tabelle_obsolete(registro.versioni_in_uso() | {versione}, radice)
+        tabella = TabellaPredizioni.carica(versione, radice)
+    return tabella
+
+def confronta_con_modello(tabella, modello, n_prove=100_000, seme=42):
+    """Latenza per predizione di tabella e modello su risposte casuali del dominio, e loro concordanza"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seme)
+    indici = rng.integers(0, N_COMBINAZIONI, size=n_prove)
+    X = griglia_risposte()[indici]
+    righe = [dict(zip(COLONNE_FEATURE, riga)) for riga in X.tolist()]
+
+    inizio = time.perf_counter()
+    risultati = [tabella.prevedi(riga) for riga in righe]
+    tempo_tabella = (time.perf_counter() - inizio) / n_prove
+
+    # Il modello a una riga per chiamata, come nel questionario (su un sottoinsieme: è lento)
+    n_modello = min(n_prove, 200)
+    inizio = time.perf_counter()
+    for riga in righe[:n_modello]:
+        modello.predict_proba(pd.DataFrame([riga], columns=COLONNE_FEATURE))
+    tempo_modello = (time.perf_counter() - inizio) / n_modello
+
+    df = pd.DataFrame(X, columns=COLONNE_FEATURE)
+    etichette_modello = modello.predict(df)
+    probabilita_modello = modello.predict_proba(df)
+    return {
+        'prove': n_prove,
+        'latenza_tabella_us': tempo_tabella * 1e6,
+        'latenza_modello_us': tempo_modello * 1e6,
+        'concordanza_etichette': float(np.mean([c == e for (c, _), e in zip(risultati, etichette_modello)])),
+        'max_deviazione_probabilita': float(np.max(np.abs(np.stack([p for _, p in risultati]) - probabilita_modello))),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tabella precalcolata delle predizioni del questionario")
+    parser.add_argument("--modello", "-m", default="modello_personalita.pkl", help="Modello joblib")
+    parser.add_argument("--registro", "-r", help="Usa la versione del registro invece del file joblib")
+    parser.add_argument("--versione", help="Versione del registro (default: corrente)")
+    parser.add_argument("--cartella", default=CARTELLA_TABELLE,
+                        help="Cartella delle tabelle per --modello (con --registro si usa quella del registro)")
+    parser.add_argument("--prove", type=int, default=100_000, help="Risposte casuali per il confronto con il modello")
+    args = parser.parse_args()
+
+    from registro_modelli import ErroreRegistro, RegistroModelli, hash_file, LUNGHEZZA_VERSIONE
+
+    registro = None
+    try:
+        if args.registro:
+            registro = RegistroModelli(args.registro)
+            registrato = registro.carica(args.versione)
+            modello, versione = registrato.modello, registrato.versione
+        else:
+            import joblib
+
+            modello = joblib.load(args.modello)
+            versione = hash_file(args.modello)[:LUNGHEZZA_VERSIONE]
+    except (ErroreRegistro, OSError) as e:
+        print(f"[ERRORE] Impossibile caricare il modello: {e}")
+        return 4
+
+    tabella = tabella_per_modello(modello, versione, args.cartella, registro)
+    print(f"📂 Tabella della versione {versione}: {tabella.probabilita.nbytes / 1024 ** 2:.1f} MB di probabilità")
+
+    if args.prove:
+        r = confronta_con_modello(tabella, modello, args.prove)
+        print(f"⚡ Latenza per predizione: tabella {r['latenza_tabella_us']:.2f} µs, "
+              f"modello {r['latenza_modello_us']:.0f} µs ({r['latenza_modello_us'] / r['latenza_tabella_us']:,.0f}x)")
+        print(f"✅ Concordanza con il modello su {r['prove']:,} risposte: {r['concordanza_etichette']:.4%} "
+              f"(max deviazione probabilità {r['max_deviazione_probabilita']:.2e})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())